@@ -5,13 +5,20 @@ Run with: `python -m app.cli` or `python -m app.cli --scenario <id>`
 from __future__ import annotations
 
 import argparse
+import csv
+import json
 import pathlib
 import sys
-import yaml
 from typing import Dict, List
 
-from app.services.scenario_loader import load_scenarios
-from app.services.simulation import SimulationEngine
+from app.services.content_cache import parse_yaml
+from app.services.montecarlo import make_policy, run_batch
+from app.services.content_library import ContentLibrary
+from app.services.script_runner import run_scripts
+from app.services.simulation import SimulationEngine, apply_state_delta
+from app.services.sweep import Sweep, format_table
+from app.services.team_loader import load_roster
+from app.services.team_optimizer import optimize_team
 from app.config import settings
 
 
@@ -20,8 +27,7 @@ DATA_DIR = pathlib.Path(__file__).resolve().parent / "data"
 
 def load_roster_as_raw() -> Dict[str, Dict]:
     path = DATA_DIR / "team_roster.yaml"
-    with path.open("r", encoding="utf-8") as handle:
-        payload = yaml.safe_load(handle)
+    payload = parse_yaml(path)
     roster: Dict[str, Dict] = {}
     for entry in payload.get("members", []):
         roster[entry.get("id", entry.get("name"))] = entry
@@ -127,6 +133,8 @@ def print_fired_banner(reason: str, final_state: Dict) -> None:
 
 def run_text_ui(scenario, roster_raw: Dict[str, Dict], team_members: List[Dict]) -> None:
     engine = SimulationEngine(scenario, team_members)
+    # Kept current from each decision's delta, the way the web client does.
+    state = engine.state_snapshot()
 
     finished = False
     while not finished:
@@ -136,7 +144,7 @@ def run_text_ui(scenario, roster_raw: Dict[str, Dict], team_members: List[Dict])
         challenge = presentable["challenges"][0]
         print(f"\n{challenge.title}\n{challenge.prompt}\n")
         for i, opt in enumerate(challenge.options, start=1):
-            prob = getattr(opt, "probability", None)
+            prob = presentable["probabilities"].get(opt.id)
             prob_str = f" (chance: {prob}%)" if prob is not None else ""
             print(f"{i}. {opt.label}{prob_str}\n   {opt.narrative}\n")
 
@@ -155,7 +163,7 @@ def run_text_ui(scenario, roster_raw: Dict[str, Dict], team_members: List[Dict])
 
         result = engine.apply_option(option.id)
         outcome_text = result.get('outcome')
-        final_state = result.get("state", {})
+        final_state = apply_state_delta(state, result["state"])
         print(f"\nOutcome: {outcome_text}")
         print_state(final_state)
         finished = result.get("finished", False)
@@ -164,43 +172,125 @@ def run_text_ui(scenario, roster_raw: Dict[str, Dict], team_members: List[Dict])
         if finished and (final_state.get('budget', 1) <= 0 or final_state.get('reputation', 1) <= 0):
             print_fired_banner(outcome_text, final_state)
             print("\nGame History:")
-            for h in engine.state.history:
+            for h in state["history"]:
                 print(f"- Stage: {h.get('stage')} | Option: {h.get('option')} -> {h.get('outcome')}")
             return
 
     # Normal game end (max rounds or explicit end action)
     if finished:
         print("\n=== Scenario Complete ===")
-        print(f"Final Budget: {engine.state.budget}")
-        print(f"Final Reputation: {engine.state.reputation}")
-        print(f"Final Risk: {engine.state.risk}")
+        print(f"Final Budget: {state['budget']}")
+        print(f"Final Reputation: {state['reputation']}")
+        print(f"Final Risk: {state['risk']}")
         print("\nGame History:")
-        for h in engine.state.history:
+        for h in state["history"]:
             print(f"- Stage: {h.get('stage')} | Option: {h.get('option')} -> {h.get('outcome')}")
 
 
+def run_monte_carlo(scenario, team_members: List[Dict], args) -> None:
+    script = [s.strip() for s in (args.script or "").split(",") if s.strip()]
+    policy = make_policy(args.policy, script)
+    report = run_batch(
+        scenario,
+        team_members,
+        games=args.monte_carlo,
+        policy=policy,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    print(json.dumps(report.summary(), indent=2))
+
+
+def run_batch_scripts(path: str, workers: int) -> int:
+    """Stream results for every script; exits non-zero if any script failed."""
+    failed = False
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for result in run_scripts(source, workers=workers):
+            failed = failed or "error" in result
+            sys.stdout.write(json.dumps(result, separators=(",", ":")) + "\n")
+            sys.stdout.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 1 if failed else 0
+
+
+def run_sweep(path: str, workers: int, output: str) -> int:
+    """Play every point of a sweep spec and print one row per point."""
+    try:
+        rows = Sweep(parse_yaml(pathlib.Path(path))).run(workers=workers)
+    except ValueError as exc:
+        print(f"Invalid sweep: {exc}", file=sys.stderr)
+        return 1
+    if output == "json":
+        print(json.dumps(rows, indent=2))
+    elif output == "csv":
+        fields = list(dict.fromkeys(name for row in rows for name in row))
+        writer = csv.DictWriter(sys.stdout, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        for row in rows:
+            team = row["team"] if isinstance(row["team"], str) else "+".join(row["team"])
+            members = {"members": "+".join(row["members"])} if "members" in row else {}
+            writer.writerow({**row, "team": team, **members})
+    else:
+        print(format_table(rows))
+    return 0
+
+
 def main(argv: List[str] | None = None) -> int:
     parser = argparse.ArgumentParser(description="ciso-sim terminal interface")
     parser.add_argument("--list-scenarios", action="store_true", help="List available scenarios")
     parser.add_argument("--scenario", help="Scenario id to run")
     parser.add_argument("--auto-team", action="store_true", help="Auto-select default team (first 3)")
+    parser.add_argument("--optimize-team", action="store_true", help="Play with the best team for the scenario (printed first)")
+    parser.add_argument("--monte-carlo", type=int, metavar="N", help="Play N headless games and print a balance report")
+    parser.add_argument("--policy", default="greedy", choices=["random", "greedy", "script"], help="Decision policy for --monte-carlo")
+    parser.add_argument("--script", help="Comma-separated option ids for --policy script")
+    parser.add_argument("--seed", type=int, default=0, help="Base RNG seed for --monte-carlo")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for --monte-carlo, --batch and --sweep")
+    parser.add_argument(
+        "--batch",
+        metavar="PATH",
+        help="Play JSONL decision scripts from PATH ('-' for stdin) and print one JSONL result per game",
+    )
+    parser.add_argument(
+        "--sweep",
+        metavar="SPEC",
+        help="Play a settings sweep from a YAML/JSON spec and print win, fired and finished rates per point",
+    )
+    parser.add_argument("--format", default="table", choices=["table", "csv", "json"], help="Output format for --sweep")
     args = parser.parse_args(argv)
 
-    scenarios = load_scenarios()
+    if args.sweep:
+        return run_sweep(args.sweep, args.workers, args.format)
+    if args.batch:
+        return run_batch_scripts(args.batch, args.workers)
+
+    # Only the chosen pack is built; listing reads headers.
+    library = ContentLibrary()
 
     if args.list_scenarios:
         print("Available scenarios:")
-        for sid, s in scenarios.items():
+        for sid, s in library.catalog.items():
             print(f"- {sid}: {s.name}")
         return 0
 
-    scenario = choose_scenario(scenarios, args.scenario)
+    scenario = library.scenario(choose_scenario(library.catalog, args.scenario).id)
     roster = load_roster_as_raw()
-    if args.auto_team:
+    if args.optimize_team:
+        plan = optimize_team(scenario, load_roster())
+        print(json.dumps(plan, indent=2))
+        by_name = {entry.get("name"): entry for entry in roster.values()}
+        team_members = [by_name[name] for name in plan["team"]]
+    elif args.auto_team or args.monte_carlo:
         team_members = [list(roster.values())[i] for i in range(min(3, len(roster)))]
     else:
         team_members = choose_team(roster)
 
+    if args.monte_carlo:
+        run_monte_carlo(scenario, team_members, args)
+        return 0
     run_text_ui(scenario, roster, team_members)
     return 0
 
@@ -11,6 +11,43 @@ class SimulationSettings(BaseModel):
     injection_risk_factor: float = 0.005
     injection_max_chance: float = 0.7
     team_budget: int = 200
+    team_plan_cache_size: int = 64  # optimizer results kept, least recently used first out
+    checkpoint_interval: int = 5  # decisions between engine snapshots used by seek()
+    content_reload: bool = True
+    content_poll_interval: float = 1.0  # seconds; used when watchfiles is unavailable
+    content_workers: int = 0  # processes parsing stale packs in load_scenarios(); 0 = one per CPU
+    scenario_memo_size: int = 64  # fully built scenarios the content library keeps; 0 disables
+    content_preload: bool = False  # build every pack at startup instead of on first use
+    catalog_page_size: int = 50  # scenarios per /api/scenarios page unless ?limit= is given
+    catalog_max_page_size: int = 200
+    roster_page_size: int = 100  # members per /api/roster page unless ?limit= is given
+    roster_max_page_size: int = 500
+    session_idle_ttl: float = 3600.0  # seconds without a request before a game expires; 0 disables
+    session_sweep_interval: float = 30.0
+    max_sessions: int = 10000  # in-memory games; 0 disables
+    max_session_bytes: int = 256 * 1024 * 1024  # estimated in-memory footprint; 0 disables
+    registry_backend: str = "memory"  # memory or sqlite
+    registry_path: str = "ciso_sim.sqlite3"
+    registry_hot_sessions: int = 1000  # sessions kept in memory by the sqlite backend
+    registry_flush_interval: float = 0.05  # seconds between write-behind batches
+    registry_session_ttl: float = 7 * 24 * 3600  # seconds without a decision before a stored game is deleted; 0 disables
+    audit_log_path: str = ""  # every session decision as NDJSON, e.g. "logs/ciso_audit.ndjson"; empty disables
+    audit_queue_size: int = 10000  # decisions waiting for the writer before new ones are dropped
+    audit_max_bytes: int = 64 * 1024 * 1024  # rotate the file once it would grow past this
+    audit_backups: int = 5  # rotated files kept as <path>.1 ... <path>.N
+    audit_flush_interval: float = 0.2  # seconds between batched writes
+    sweep_cache_path: str = "ciso_sweep.sqlite3"  # results of played sweep points; empty disables
+    batch_max_items: int = 1000  # items accepted by one /sessions:batch or /decisions:batch call
+    analytics_max_rooms: int = 1024  # rooms with their own decision analytics, least recently used first out
+    room_max_pending: int = 256  # queued updates per WebSocket subscriber before the oldest is dropped
+    solver_cache_size: int = 32  # solved scenario/team tables kept for /advice, least recently used first out
+    solver_max_states: int = 250_000  # states one solve may hold before advice falls back to success chances
+    solver_workers: int = 1  # background threads solving games for /advice
+    advice_wait: float = 1.0  # seconds /advice waits for a cold solve before answering 202
+    stage_cache_size: int = 4096  # encoded stage payloads kept by the API; 0 disables
+    http_cache_size: int = 512  # encoded roster, catalog and index page responses kept with their ETags; 0 disables
+    gzip_min_size: int = 1024  # bytes; smaller cached bodies are always sent uncompressed
+    static_max_age: int = 365 * 24 * 3600  # seconds browsers keep fingerprinted /static URLs
 
 
 settings = SimulationSettings()
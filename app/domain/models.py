@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Outcome:
     """Resulting impacts for a branch (success or failure)."""
 
@@ -16,7 +16,13 @@ class Outcome:
     action: Optional[str] = None  # Special actions: end, remove-member, reset-team, boost-morale, etc.
 
 
-@dataclass
+# Every Outcome.action the engine knows how to execute.
+OUTCOME_ACTIONS = frozenset(
+    {"end", "remove-member", "reset-team", "boost-morale", "damage-morale", "double-budget", "burn-budget"}
+)
+
+
+@dataclass(frozen=True, slots=True)
 class Option:
     """A decision the player can make for a challenge."""
 
@@ -28,19 +34,24 @@ class Option:
     difficulty: int = 100  # baseline 0-100; higher = harder
     skill: str = "analysis"  # which team ability applies
     action: str = "continue"  # continue, end, or next_stage
+    index: int = -1  # position in Scenario.options, assigned by the loader
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Challenge:
     """Single decision point presented to the player."""
 
     id: str
     title: str
     prompt: str
-    options: List[Option] = field(default_factory=list)
+    options: Tuple[Option, ...] = ()
+    options_by_id: Mapping[str, Option] = field(init=False, repr=False, compare=False)
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "options_by_id", {option.id: option for option in self.options})
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Injection:
     """Unplanned event that can occur mid-scenario."""
 
@@ -48,29 +59,76 @@ class Injection:
     title: str
     prompt: str
     weight: int = 5
-    options: List[Option] = field(default_factory=list)
+    options: Tuple[Option, ...] = ()
+    options_by_id: Mapping[str, Option] = field(init=False, repr=False, compare=False)
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "options_by_id", {option.id: option for option in self.options})
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Stage:
     """Phase of the scenario (e.g., detection, containment)."""
 
     id: str
     title: str
     summary: str
-    challenges: List[Challenge] = field(default_factory=list)
+    challenges: Tuple[Challenge, ...] = ()
+    index: int = -1  # position in Scenario.stage_order, assigned by the loader
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class ScenarioHeader:
+    """What the catalog shows for a scenario, read without building its stages."""
+
+    id: str
+    name: str
+    briefing: str
+    tags: Tuple[str, ...] = ()
+
+
+@dataclass(frozen=True, slots=True)
+class ScenarioGraph:
+    """Indexes over the stage graph, computed once by the loader's compile pass.
+
+    Round counts are stage decisions left before the game ends, including the
+    current one, ignoring injections, firing and the round cap. ``None`` means
+    only the round cap bounds them, because the stage can reach a cycle.
+    """
+
+    successors: Mapping[str, Tuple[str, ...]]  # stages the last challenge can lead to
+    terminal: FrozenSet[str]  # stages the game always ends in
+    reachable: FrozenSet[str]  # stages reachable from the starting stage
+    cycles: Tuple[Tuple[str, ...], ...]  # stage sets that can loop back on themselves
+    min_rounds: Mapping[str, Tuple[Optional[int], ...]]  # per challenge index
+    max_rounds: Mapping[str, Tuple[Optional[int], ...]]  # per challenge index
+
+    def rounds_left(self, stage_id: str, challenge_index: int) -> Tuple[Optional[int], Optional[int]]:
+        return self.min_rounds[stage_id][challenge_index], self.max_rounds[stage_id][challenge_index]
+
+
+@dataclass(frozen=True, slots=True)
 class Scenario:
-    """Top level game definition."""
+    """Top level game definition, compiled and shared read-only by every session."""
 
     id: str
     name: str
     briefing: str
     stages: Dict[str, Stage]
     starting_stage: str
-    injections: List[Injection] = field(default_factory=list)
+    injections: Tuple[Injection, ...] = ()
+    version: str = ""  # content hash; changes whenever the pack is edited
+    graph: Optional[ScenarioGraph] = field(default=None, repr=False, compare=False)  # set by the loader
+    stage_order: Tuple[Stage, ...] = field(init=False, repr=False, compare=False)
+    options: Tuple[Option, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, "stage_order", tuple(sorted(self.stages.values(), key=lambda stage: stage.index))
+        )
+        challenges = [c for stage in self.stage_order for c in stage.challenges]
+        options = [o for c in [*challenges, *self.injections] for o in c.options]
+        object.__setattr__(self, "options", tuple(sorted(options, key=lambda option: option.index)))
 
 
 @dataclass
@@ -88,6 +146,10 @@ class PlayerState:
     team_size: int = 0
 
 
+# StatBlock fields, in the order stat columns and totals use.
+SKILLS = ("analysis", "comms", "engineering", "leadership")
+
+
 @dataclass
 class StatBlock:
     """Skill stats for a character (0-100 scale)."""
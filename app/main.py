@@ -1,8 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
-from app.routes import api, ui
+from app.config import settings
+from app.routes import api, metrics, ui
+from app.services import audit_log
 
 app = FastAPI(title="CISO Simulation")
 
@@ -13,13 +14,39 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
+
+@app.on_event("startup")
+async def start_content_reload() -> None:
+    if settings.content_preload:
+        api.library.preload()
+    if settings.content_reload:
+        api.library.start_watching()
+
+
+@app.on_event("shutdown")
+async def stop_content_reload() -> None:
+    api.library.stop_watching()
+
+
+@app.on_event("startup")
+async def start_registry_sweeper() -> None:
+    api.registry.start_sweeper()
+
+
+@app.on_event("shutdown")
+async def close_registry() -> None:
+    api.registry.close()
+
+
+@app.on_event("shutdown")
+async def close_audit_log() -> None:
+    # After the registry, so nothing decides anything once the log is closed.
+    audit_log.sink.close()
+
 
 app.include_router(ui.router)
 app.include_router(api.router)
-
-app.mount(
-    "/static",
-    StaticFiles(directory="app/static"),
-    name="static",
-)
+app.include_router(metrics.router)
 
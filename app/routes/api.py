@@ -1,22 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import uuid
-from dataclasses import asdict
-from typing import Dict
+from typing import Dict, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
 
 from app.config import settings
-from app.services.scenario_loader import load_scenarios
-from app.services.simulation import SimulationRegistry
-from app.services.team_loader import load_roster
+from app.domain.models import Scenario
+from app.services.analytics import DecisionAnalytics
+from app.services.content_library import ContentLibrary
+from app.services.http_cache import ResponseCache, respond
+from app.services.rooms import RoomHub
+from app.services.roster_store import RosterStore
+from app.services.simulation import SimulationEngine, create_registry
+from app.services.single_flight import KeyedLocks
+from app.services.solver import advise
+from app.services.stage_cache import StageCache, encode_json
+from app.services.team_optimizer import optimize_team
 
 router = APIRouter(prefix="/api")
-registry = SimulationRegistry()
-scenarios = load_scenarios()
-roster = load_roster()
-roster_map = {member.name: member for member in roster}
+registry = create_registry()
+stage_cache = StageCache()
+responses = ResponseCache()
+rooms = RoomHub()
+# Expired and evicted sessions stop reporting to their room.
+registry.on_discard = rooms.detach
+analytics = DecisionAnalytics()
+# Scenarios and roster are read from the library on every request so edits to
+# app/data are picked up without a restart.
+library = ContentLibrary()
+session_locks = KeyedLocks()
 
 
 class CreateSessionPayload(BaseModel):
@@ -25,12 +41,32 @@ class CreateSessionPayload(BaseModel):
         default_factory=list,
         description="List of characters with stats. Example: [{name, role, stats:{analysis, comms, engineering, leadership}}]",
     )
+    seed: Optional[int] = Field(default=None, description="Replay a game by reusing its seed.")
+    room_id: Optional[str] = Field(default=None, description="Facilitation room that receives this session's updates.")
 
 
-@router.get("/roster")
-async def list_roster():
+def cached_json(request: Request, key: tuple, build) -> Response:
+    """``build()`` encoded once per content reload, served with an ETag."""
+    return respond(
+        request, responses.get((library.generation, *key), lambda: (encode_json(build()), "application/json"))
+    )
+
+
+def get_scenario(scenario_id: str) -> Scenario:
+    scenario = library.scenario(scenario_id)
+    if scenario is None:
+        error = library.load_error(scenario_id)
+        if error:
+            # Listed in the catalog, but the pack cannot be played until it is fixed.
+            raise HTTPException(status_code=500, detail=f"Scenario {scenario_id} failed to load: {error}")
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    return scenario
+
+
+def roster_payload(page: Dict) -> Dict:
     return {
         "budget": settings.team_budget,
+        "next_cursor": page["next_cursor"],
         "members": [
             {
                 "id": member.name,
@@ -44,67 +80,97 @@ async def list_roster():
                     "leadership": member.stats.leadership,
                 },
             }
-            for member in roster
+            for member in page["members"]
         ],
     }
 
 
+@router.get("/roster")
+async def list_roster(
+    request: Request,
+    role: Optional[str] = None,
+    min_cost: Optional[int] = None,
+    max_cost: Optional[int] = None,
+    sort: str = "roster",
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.roster_page_size, ge=1, le=settings.roster_max_page_size),
+):
+    def build() -> Dict:
+        return roster_payload(library.roster.query(role, min_cost, max_cost, sort, cursor, limit))
+
+    try:
+        return cached_json(request, ("roster", role, min_cost, max_cost, sort, cursor, limit), build)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get("/roster/roles")
+async def list_roster_roles(request: Request):
+    return cached_json(request, ("roster-roles",), library.roster.roles_count)
+
+
+@router.get("/roster/optimize")
+def get_optimized_team(scenario_id: str, budget: Optional[int] = None):
+    # Plain def: a cold search is CPU-bound, so it runs on the threadpool.
+    scenario = get_scenario(scenario_id)
+    # Never search past the configured budget; it also bounds the distinct plans a caller can request.
+    budget = settings.team_budget if budget is None else max(0, min(budget, settings.team_budget))
+    return optimize_team(scenario, library.roster, budget)
+
+
 class DecisionPayload(BaseModel):
     option_id: str
+    since: Optional[int] = Field(
+        default=None,
+        description="State version the client holds; the response state is a delta from it. Defaults to the version before this decision.",
+    )
 
 
-def serialize_stage(stage_payload) -> Dict:
-    return {
-        "id": stage_payload["id"],
-        "title": stage_payload["title"],
-        "summary": stage_payload["summary"],
-        "is_injection": stage_payload.get("is_injection", False),
-        "challenges": [
-            {
-                "id": challenge.id,
-                "title": challenge.title,
-                "prompt": challenge.prompt,
-                "options": [
-                    {
-                        "id": option.id,
-                        "label": option.label,
-                        "narrative": option.narrative,
-                        "skill": option.skill,
-                        "difficulty": option.difficulty,
-                        "probability": getattr(option, "probability", None),
-                    }
-                    for option in challenge.options
-                ],
-            }
-            for challenge in stage_payload["challenges"]
-        ],
-    }
+class BatchSessionPayload(BaseModel):
+    sessions: list[CreateSessionPayload] = Field(max_length=settings.batch_max_items)
 
 
-@router.get("/scenarios")
-async def list_scenarios():
-    return [
-        {
-            "id": scenario.id,
-            "name": scenario.name,
-            "briefing": scenario.briefing,
-        }
-        for scenario in scenarios.values()
-    ]
+class BatchDecision(DecisionPayload):
+    session_id: str
 
 
-@router.post("/session")
-async def create_session(payload: CreateSessionPayload):
-    scenario = scenarios.get(payload.scenario_id)
-    if not scenario:
-        raise HTTPException(status_code=404, detail="Scenario not found")
+class BatchDecisionPayload(BaseModel):
+    decisions: list[BatchDecision] = Field(max_length=settings.batch_max_items)
+
+
+def with_stage(payload: Dict, engine: SimulationEngine) -> bytes:
+    """``payload`` encoded with the engine's current stage spliced in from the stage cache."""
+    return encode_json(payload)[:-1] + b',"stage":' + stage_cache.encoded(engine) + b"}"
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
 
-    # Build team from roster (server-authoritative) and enforce cost budget
+
+def room_update(kind: str, engine: SimulationEngine, result: Dict, **extra) -> Dict:
+    """What a room sees of a session: the latest result plus a summary of its stage."""
+    update = {"type": kind, **extra, **result, "stage": None}
+    if "state" in result:
+        # Rooms coalesce updates, so they get whole fields rather than a delta.
+        update["state"] = engine.state_fields()
+    if not result["finished"]:
+        stage = engine.current_presentable()
+        update["stage"] = {
+            "id": stage["id"],
+            "title": stage["title"],
+            "is_injection": stage["is_injection"],
+            "challenge": stage["challenges"][0].id,
+        }
+    return update
+
+
+def validate_team(entries: list[dict], roster: RosterStore) -> list[dict]:
+    """Build the team from the roster (server-authoritative) and enforce the cost budget."""
     validated_team = []
     total_cost = 0
-    for entry in payload.team:
+    for entry in entries:
         name = entry.get("name")
-        member = roster_map.get(name)
+        member = roster.get(name)
         if not member:
             continue
         total_cost += member.cost
@@ -127,28 +193,217 @@ async def create_session(payload: CreateSessionPayload):
             status_code=400,
             detail=f"Team over budget: {total_cost} > {settings.team_budget}",
         )
+    return validated_team
+
 
+def open_session(payload: CreateSessionPayload, scenario: Scenario, team: list[dict]) -> bytes:
     session_id = uuid.uuid4().hex
-    engine = registry.create(session_id, scenario, validated_team)
-    stage = engine.current_presentable()
-    return {
-        "session_id": session_id,
-        "state": asdict(engine.state),
-        "stage": serialize_stage(stage),
-    }
+    engine = registry.create(session_id, scenario, team, seed=payload.seed)
+    if payload.room_id:
+        rooms.attach(session_id, payload.room_id)
+        rooms.publish(session_id, room_update("joined", engine, {"round": 0, "finished": False}))
+    return with_stage(
+        {
+            "session_id": session_id,
+            "seed": engine.seed,
+            "state": engine.state_snapshot(),
+            "rounds_remaining": engine.rounds_remaining(),
+        },
+        engine,
+    )
 
 
-@router.post("/session/{session_id}/decision")
-async def submit_decision(session_id: str, payload: DecisionPayload):
+def decide(session_id: str, option_id: str, since: Optional[int] = None) -> bytes:
+    # Decisions run on threadpool threads; one session's engine must never apply two options at once.
+    with session_locks.hold(session_id):
+        return _decide(session_id, option_id, since)
+
+
+def _decide(session_id: str, option_id: str, since: Optional[int]) -> bytes:
     engine = registry.get(session_id)
     if not engine:
+        rooms.detach(session_id)
         raise HTTPException(status_code=404, detail="Session not found")
+    if since is not None and not 0 <= since <= engine.round:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Unknown state version {since}; fetch /api/session/{session_id}/state to resync",
+        )
 
-    result = engine.apply_option(payload.option_id)
+    stage_id, _ = engine.location()
+    try:
+        result = engine.apply_option(option_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if since is not None and since != engine.round - 1:
+        result["state"] = engine.state_delta(since)
+    room_id = rooms.room_of(session_id)
+    analytics.record(engine.scenario.id, stage_id, option_id, result["success"], engine.state_fields(), room_id)
+    if room_id is not None:
+        rooms.publish(session_id, room_update("decision", engine, result, option_id=option_id))
     if not result["finished"]:
-        result["stage"] = serialize_stage(engine.current_presentable())
-    else:
-        registry.delete(session_id)
-        result["stage"] = None
-    return result
+        registry.save(session_id, engine)
+        return with_stage(result, engine)
+    registry.delete(session_id)
+    rooms.detach(session_id)
+    result["stage"] = None
+    return encode_json(result)
+
+
+def batch_response(run_items) -> Response:
+    """Run each item independently; failures are reported per item, not for the batch."""
+    results = []
+    for index, run in enumerate(run_items):
+        try:
+            body = run()
+        except HTTPException as exc:
+            results.append(encode_json({"index": index, "status": exc.status_code, "detail": exc.detail}))
+            continue
+        except (ValueError, TypeError) as exc:
+            results.append(encode_json({"index": index, "status": 400, "detail": str(exc)}))
+            continue
+        results.append(b'{"index":%d,"status":200,' % index + body[1:])
+    return json_response(b'{"results":[' + b",".join(results) + b"]}")
+
+
+@router.get("/registry")
+async def registry_stats():
+    return registry.stats()
+
+
+@router.get("/analytics")
+async def decision_analytics():
+    return analytics.snapshot()
+
+
+@router.get("/rooms/{room_id}/analytics")
+async def room_analytics(room_id: str):
+    return analytics.snapshot(room_id)
+
+
+@router.delete("/rooms/{room_id}/analytics")
+async def reset_room_analytics(room_id: str):
+    analytics.clear(room_id)
+    return {"room_id": room_id}
+
+
+@router.get("/scenarios")
+async def list_scenarios(
+    request: Request,
+    q: str = "",
+    tag: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.catalog_page_size, ge=1, le=settings.catalog_max_page_size),
+):
+    def build() -> Dict:
+        page = library.index.search(q, tag, cursor, limit)
+        page["items"] = [
+            {"id": header.id, "name": header.name, "briefing": header.briefing, "tags": list(header.tags)}
+            for header in page["items"]
+        ]
+        return page
+
+    try:
+        return cached_json(request, ("scenarios", q, tag, cursor, limit), build)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get("/scenarios/tags")
+async def list_scenario_tags(request: Request):
+    return cached_json(request, ("tags",), library.index.tags)
+
+
+@router.post("/session")
+def create_session(payload: CreateSessionPayload):
+    # Plain def: the first session of a pack builds it, which must not block the event loop.
+    scenario = get_scenario(payload.scenario_id)
+    team = validate_team(payload.team, library.roster)
+    return json_response(open_session(payload, scenario, team))
+
+
+@router.post("/sessions:batch")
+def create_sessions(payload: BatchSessionPayload):
+    # Plain def: up to batch_max_items items, possibly with cold scenario builds, run on the threadpool.
+    roster = library.roster
+    # Workshops open many sessions with the same few teams; validate each once.
+    teams: Dict[tuple, list[dict]] = {}
+
+    def run(item: CreateSessionPayload) -> bytes:
+        scenario = get_scenario(item.scenario_id)
+        names = tuple(entry.get("name") for entry in item.team)
+        if names not in teams:
+            teams[names] = validate_team(item.team, roster)
+        return open_session(item, scenario, teams[names])
+
+    return batch_response(functools.partial(run, item) for item in payload.sessions)
+
 
+@router.post("/session/{session_id}/decision")
+def submit_decision(session_id: str, payload: DecisionPayload):
+    # Plain def: the session lock may be held by a batch, and must never be waited on in the event loop.
+    return json_response(decide(session_id, payload.option_id, payload.since))
+
+
+@router.post("/decisions:batch")
+def submit_decisions(payload: BatchDecisionPayload):
+    # Plain def, like create_sessions and submit_decision.
+    return batch_response(
+        functools.partial(decide, item.session_id, item.option_id, item.since) for item in payload.decisions
+    )
+
+
+@router.websocket("/rooms/{room_id}/ws")
+async def room_socket(websocket: WebSocket, room_id: str):
+    await websocket.accept()
+    subscriber = rooms.subscribe(room_id, websocket.send_text)
+    sender = asyncio.create_task(subscriber.run())
+    try:
+        # Clients only listen; reading is how a disconnect is noticed.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        rooms.unsubscribe(room_id, subscriber)
+        await sender
+
+
+@router.get("/session/{session_id}/state")
+async def get_state(session_id: str):
+    engine = registry.get(session_id)
+    if not engine:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return engine.state_snapshot()
+
+
+@router.get("/session/{session_id}/advice")
+def get_advice(session_id: str):
+    # Plain def: it may wait up to advice_wait for a background solve.
+    engine = registry.get(session_id)
+    if not engine:
+        raise HTTPException(status_code=404, detail="Session not found")
+    advice = advise(engine)
+    if advice is None:
+        response = json_response(encode_json({"status": "solving"}))
+        response.status_code = 202
+        response.headers["Retry-After"] = "1"
+        return response
+    return advice
+
+
+@router.get("/session/{session_id}/timeline")
+async def get_timeline(session_id: str, round: int):
+    engine = registry.get(session_id)
+    if not engine:
+        raise HTTPException(status_code=404, detail="Session not found")
+    try:
+        past = engine.seek(round)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {
+        "round": round,
+        "rounds": len(engine.events),
+        "events": engine.events[:round],
+        "state": past.state_snapshot(),
+    }
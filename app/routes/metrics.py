@@ -0,0 +1,97 @@
+"""Prometheus scrape endpoint and per-route request timing."""
+from __future__ import annotations
+
+import time
+from typing import Dict, Tuple
+
+from fastapi import APIRouter, Response
+from starlette.routing import Mount
+
+from app.routes import api
+from app.services import audit_log, metrics, solver, team_optimizer
+
+router = APIRouter()
+
+REQUEST_DURATION = metrics.registry.histogram(
+    "ciso_http_request_duration_seconds", "Time to serve a request, by route.", ("method", "route")
+)
+REQUESTS = metrics.registry.counter(
+    "ciso_http_requests_total", "Requests served, by route and status.", ("method", "route", "status")
+)
+
+
+def _stat_gauge(name: str, help: str, stats) -> None:
+    metrics.registry.gauge(
+        name, help, lambda: {(key,): value for key, value in stats().items()}, ("stat",)
+    )
+
+
+metrics.registry.gauge(
+    "ciso_active_sessions", "Sessions held by the registry, stored ones included.", lambda: {(): len(api.registry)}
+)
+_stat_gauge("ciso_registry", "Session registry footprint and eviction counters.", api.registry.stats)
+_stat_gauge("ciso_stage_cache", "Encoded stage payload cache.", api.stage_cache.stats)
+_stat_gauge("ciso_rooms", "Facilitation rooms, subscribers and update delivery.", api.rooms.stats)
+_stat_gauge("ciso_http_cache", "Encoded roster, catalog and index page responses.", api.responses.stats)
+_stat_gauge("ciso_audit_log", "Decisions queued, written and dropped by the audit log.", audit_log.sink.stats)
+_stat_gauge("ciso_solvers", "Solved scenario/team tables held for advice and solves in progress.", solver.stats)
+_stat_gauge("ciso_team_plans", "Cached team optimizer plans and searches in progress.", team_optimizer.stats)
+_stat_gauge("ciso_analytics", "Rooms with their own decision analytics and rooms dropped.", api.analytics.stats)
+_stat_gauge("ciso_content", "Scenario catalog entries and fully built scenarios held.", api.library.stats)
+
+
+class RequestMetricsMiddleware:
+    """Times every HTTP request and labels it with its route template, not its URL."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._routes: Dict[object, str] = {}
+        self._mounts: Tuple[str, ...] = ()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        began = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - began
+            route = self._route(scope)
+            REQUEST_DURATION.observe(elapsed, (scope["method"], route))
+            REQUESTS.inc((scope["method"], route, str(status)))
+
+    def _route(self, scope) -> str:
+        # Routing records the matched endpoint in the scope it was handed.
+        endpoint = scope.get("endpoint")
+        if not self._routes or (endpoint is not None and endpoint not in self._routes):
+            self._refresh(scope.get("app"))
+        route = self._routes.get(endpoint) if endpoint is not None else None
+        if route is not None:
+            return route
+        for mount in self._mounts:
+            if scope["path"].startswith(mount + "/"):
+                return mount
+        return "unmatched"
+
+    def _refresh(self, app) -> None:
+        if app is None:
+            return
+        self._routes = {r.endpoint: r.path for r in app.routes if hasattr(r, "endpoint")}
+        self._mounts = tuple(r.path for r in app.routes if isinstance(r, Mount))
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(
+        content=metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -4,19 +4,29 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
-from app.routes.api import scenarios
+from app.config import settings
+from app.routes.api import library, responses
+from app.services.http_cache import StaticAssets, respond
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
+assets = StaticAssets("app/static")
+templates.env.globals["static_url"] = assets.url
+
+
+def render_home() -> tuple[bytes, str]:
+    # Rendered without the request, so one render serves every client until content reloads.
+    html = templates.get_template("index.html").render(
+        page=library.index.search(limit=settings.catalog_page_size),
+    )
+    return html.encode("utf-8"), "text/html; charset=utf-8"
 
 
 @router.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "scenarios": list(scenarios.values()),
-        },
-    )
+    return respond(request, responses.get((library.generation, "index"), render_home))
+
 
+@router.get("/static/{name:path}", include_in_schema=False)
+async def static_asset(request: Request, name: str):
+    return assets.respond(request, name)
@@ -0,0 +1,145 @@
+"""Live decision statistics across sessions, maintained incrementally.
+
+Every decision updates a handful of counters and running moments in constant
+time, so reading the aggregate never touches session objects or their
+history. Stats are kept per scope: ``None`` for everything the server has
+seen, plus one scope per facilitation room. Room scopes are capped; the room
+least recently decided in or read is dropped first.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+METRICS = ("budget", "reputation", "risk")
+
+
+@dataclass(slots=True)
+class RunningStats:
+    """Count, mean and variance of a stream of numbers (Welford's method)."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def summary(self) -> Dict[str, float]:
+        stdev = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {"mean": round(self.mean, 2), "stdev": round(stdev, 2)}
+
+
+@dataclass(slots=True)
+class OptionStats:
+    picks: int = 0
+    successes: int = 0
+
+
+@dataclass(slots=True)
+class StageStats:
+    decisions: int = 0
+    options: Dict[str, OptionStats] = field(default_factory=dict)
+    # State after the decisions taken at this stage.
+    metrics: Dict[str, RunningStats] = field(
+        default_factory=lambda: {metric: RunningStats() for metric in METRICS}
+    )
+
+
+Stages = Dict[Tuple[str, str], StageStats]  # (scenario, stage or injection) -> counters
+
+
+class DecisionAnalytics:
+    """Counters keyed by (scope, scenario, stage or injection, option)."""
+
+    def __init__(self, max_rooms: Optional[int] = None) -> None:
+        self.max_rooms = settings.analytics_max_rooms if max_rooms is None else max_rooms
+        self._stages: Stages = {}  # the server-wide scope
+        self._rooms: "OrderedDict[str, Stages]" = OrderedDict()
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def _scope(self, room_id: Optional[str], create: bool) -> Optional[Stages]:
+        # Caller holds self._lock.
+        if room_id is None:
+            return self._stages
+        stages = self._rooms.get(room_id)
+        if stages is None:
+            if not create or self.max_rooms <= 0:
+                return None
+            stages = self._rooms[room_id] = {}
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+                self._evicted += 1
+        self._rooms.move_to_end(room_id)
+        return stages
+
+    def record(
+        self,
+        scenario_id: str,
+        stage_id: str,
+        option_id: str,
+        success: bool,
+        state: Dict,
+        room_id: Optional[str] = None,
+    ) -> None:
+        """Count one decision taken at ``stage_id``; ``state`` is the result that followed."""
+        with self._lock:
+            scopes = [self._stages]
+            if room_id is not None:
+                scopes.append(self._scope(room_id, create=True))
+            for stages in scopes:
+                if stages is None:
+                    continue
+                stats = stages.get((scenario_id, stage_id))
+                if stats is None:
+                    stats = stages[(scenario_id, stage_id)] = StageStats()
+                stats.decisions += 1
+                option = stats.options.get(option_id)
+                if option is None:
+                    option = stats.options[option_id] = OptionStats()
+                option.picks += 1
+                option.successes += success
+                for metric in METRICS:
+                    stats.metrics[metric].add(state[metric])
+
+    def snapshot(self, room_id: Optional[str] = None) -> Dict:
+        """Per scenario and stage: decision counts, option shares and success rates."""
+        scenarios: Dict[str, Dict] = {}
+        with self._lock:
+            stages = self._scope(room_id, create=False) or {}
+            for (scenario_id, stage_id), stats in stages.items():
+                scenario = scenarios.setdefault(scenario_id, {"decisions": 0, "stages": {}})
+                scenario["decisions"] += stats.decisions
+                scenario["stages"][stage_id] = {
+                    "decisions": stats.decisions,
+                    **{metric: stats.metrics[metric].summary() for metric in METRICS},
+                    "options": {
+                        option_id: {
+                            "picks": option.picks,
+                            "share": round(100 * option.picks / stats.decisions, 1),
+                            "success_rate": round(100 * option.successes / option.picks, 1),
+                        }
+                        for option_id, option in stats.options.items()
+                    },
+                }
+        return scenarios
+
+    def clear(self, room_id: Optional[str] = None) -> None:
+        with self._lock:
+            if room_id is None:
+                self._stages.clear()
+            else:
+                self._rooms.pop(room_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"rooms": len(self._rooms), "evicted_rooms": self._evicted}
@@ -0,0 +1,159 @@
+"""Append-only NDJSON audit log of every decision made in a session.
+
+``SimulationEngine.apply_option`` hands each decision to ``sink.record``,
+which only appends a dict to a bounded in-memory queue. A writer thread wakes
+when the queue stops being empty. It drains the whole queue, encodes it, and
+writes it to the file in one call, then waits ``audit_flush_interval`` so the
+next batch can build up. When the file would grow past ``audit_max_bytes``
+it is rotated to ``<path>.1`` and older files shift up, keeping
+``audit_backups`` of them. The request path never touches the file. If the
+writer falls behind by ``audit_queue_size`` decisions, new ones are dropped
+and counted rather than blocking the game.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import pathlib
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """NDJSON file fed through a bounded queue; the writer thread starts on first use."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_queue: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        backups: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+    ) -> None:
+        path = settings.audit_log_path if path is None else path
+        self.path = pathlib.Path(path) if path else None
+        self.max_queue = settings.audit_queue_size if max_queue is None else max_queue
+        self.max_bytes = settings.audit_max_bytes if max_bytes is None else max_bytes
+        self.backups = settings.audit_backups if backups is None else backups
+        self.flush_interval = settings.audit_flush_interval if flush_interval is None else flush_interval
+        self._queue: Deque[Dict] = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._file = None
+        self._size = 0
+        self._written = 0
+        self._dropped = 0
+        self._rotations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None and not self._closed
+
+    def record(self, entry: Dict) -> None:
+        """Queue one decision; never blocks on I/O. ``entry`` must not be changed afterwards."""
+        with self._lock:
+            if not self.enabled or len(self._queue) >= self.max_queue:
+                self._dropped += 1
+                return
+            self._queue.append(entry)
+            first = len(self._queue) == 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+        if first:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Write every queued decision now."""
+        with self._write_lock:
+            self._write_batch()
+
+    def close(self) -> None:
+        """Stop the writer and flush what is queued; later decisions are dropped."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        with self._write_lock:
+            self._write_batch()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "written": self._written,
+                "dropped": self._dropped,
+                "rotations": self._rotations,
+                "file_bytes": self._size,
+            }
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            with self._write_lock:
+                self._write_batch()
+            # Let further decisions queue up before the next batch.
+            if not self._closed:
+                time.sleep(self.flush_interval)
+
+    def _write_batch(self) -> None:
+        with self._lock:
+            batch, self._queue = self._queue, deque()
+        if not batch or self.path is None:
+            return
+        try:
+            data = "".join(
+                json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in batch
+            ).encode("utf-8")
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "ab")
+                self._size = self._file.tell()
+            if self._size and self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+        except Exception:
+            logger.exception("Failed to write %d audit entries to %s", len(batch), self.path)
+            with self._lock:
+                self._dropped += len(batch)
+            return
+        with self._lock:
+            self._size += len(data)
+            self._written += len(batch)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._file = open(self.path, "ab")
+        self._size = 0
+        self._rotations += 1
+
+
+# Shared by every engine in the process; inert until a session decides something.
+sink = AuditLog()
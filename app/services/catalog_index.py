@@ -0,0 +1,167 @@
+"""Search index over the scenario catalog.
+
+Headers are indexed by tag and by the words of their name and briefing. A
+query matches headers that have every one of its words; the last word also
+matches as a prefix, so partial input finds results while typing. A selective
+query filters its smallest posting set; a broad one walks the catalog in order
+and stops once the page is full, so neither grows with the catalog. Results
+are ordered by scenario id, and a cursor names the last id of the previous
+page, so paging stays stable while packs are added or removed between requests.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import bisect
+import itertools
+import re
+import threading
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.domain.models import ScenarioHeader
+
+_WORD = re.compile(r"[^\W_]+")
+_EMPTY: FrozenSet[str] = frozenset()
+# Match sets up to this size are filtered and sorted; larger ones are found by walking the ids.
+_DRIVER_LIMIT = 2048
+
+# (matching ids, or None when too many words share a prefix to union cheaply; count; membership test)
+Term = Tuple[Optional[Set[str]], int, Callable[[str], bool]]
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+
+def encode_cursor(scenario_id: str) -> str:
+    return base64.urlsafe_b64encode(scenario_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+class CatalogIndex:
+    """Headers by id, with tag and word postings; updated one header at a time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._headers: Dict[str, ScenarioHeader] = {}
+        self._ids: List[str] = []  # sorted
+        self._words: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []  # sorted keys of _words, for prefix lookups
+        self._tags: Dict[str, Set[str]] = {}
+        self._indexed: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {}  # id -> (words, tags)
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def put(self, header: ScenarioHeader) -> None:
+        words = frozenset(tokenize(header.name) + tokenize(header.briefing))
+        tags = frozenset(tag.casefold() for tag in header.tags)
+        with self._lock:
+            if header.id in self._headers:
+                self._unindex(header.id)
+            else:
+                bisect.insort(self._ids, header.id)
+            self._headers[header.id] = header
+            self._indexed[header.id] = (words, tags)
+            for word in words:
+                ids = self._words.get(word)
+                if ids is None:
+                    ids = self._words[word] = set()
+                    bisect.insort(self._vocabulary, word)
+                ids.add(header.id)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(header.id)
+
+    def remove(self, scenario_id: str) -> None:
+        with self._lock:
+            if scenario_id not in self._headers:
+                return
+            self._unindex(scenario_id)
+            del self._headers[scenario_id]
+            del self._indexed[scenario_id]
+            del self._ids[bisect.bisect_left(self._ids, scenario_id)]
+
+    def tags(self) -> Dict[str, int]:
+        """Scenarios per tag."""
+        with self._lock:
+            return {tag: len(ids) for tag, ids in sorted(self._tags.items())}
+
+    def search(
+        self, q: str = "", tag: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50
+    ) -> Dict:
+        """One page of matching headers in id order; raises ValueError for a bad cursor."""
+        after = decode_cursor(cursor) if cursor else None
+        words = tokenize(q)
+        with self._lock:
+            terms: List[Term] = []
+            if tag:
+                terms.append(_term(self._tags.get(tag.casefold(), _EMPTY)))
+            for word in words[:-1]:
+                terms.append(_term(self._words.get(word, _EMPTY)))
+            if words:
+                terms.append(self._prefix_term(words[-1]))
+
+            start = bisect.bisect_right(self._ids, after) if after is not None else 0
+            if not terms:
+                found = self._ids[start : start + limit + 1]
+            else:
+                driver = min(terms, key=lambda term: term[1])
+                if driver[0] is not None and driver[1] <= _DRIVER_LIMIT:
+                    # Few candidates: filter them and sort.
+                    tests = [term[2] for term in terms if term is not driver]
+                    found = sorted(i for i in driver[0] if all(test(i) for test in tests))
+                    begin = bisect.bisect_right(found, after) if after is not None else 0
+                    found = found[begin : begin + limit + 1]
+                else:
+                    # Most of the catalog matches: walk it in order until the page is full.
+                    tests = [term[2] for term in terms]
+                    found = []
+                    for scenario_id in itertools.islice(self._ids, start, None):
+                        if all(test(scenario_id) for test in tests):
+                            found.append(scenario_id)
+                            if len(found) > limit:
+                                break
+            page = [self._headers[scenario_id] for scenario_id in found[:limit]]
+        return {
+            "items": page,
+            "next_cursor": encode_cursor(page[-1].id) if len(found) > limit else None,
+        }
+
+    def _prefix_term(self, prefix: str) -> Term:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff")
+        if end - start <= 1:
+            return _term(self._words[self._vocabulary[start]] if end > start else _EMPTY)
+        postings = [self._words[word] for word in self._vocabulary[start:end]]
+        count = sum(len(ids) for ids in postings)
+        indexed = self._indexed
+
+        def test(scenario_id: str) -> bool:
+            return any(word.startswith(prefix) for word in indexed[scenario_id][0])
+
+        return (set().union(*postings) if count <= _DRIVER_LIMIT else None), count, test
+
+    def _unindex(self, scenario_id: str) -> None:
+        words, tags = self._indexed[scenario_id]
+        for word in words:
+            ids = self._words[word]
+            ids.discard(scenario_id)
+            if not ids:
+                del self._words[word]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+        for tag in tags:
+            ids = self._tags[tag]
+            ids.discard(scenario_id)
+            if not ids:
+                del self._tags[tag]
+
+
+def _term(ids) -> Term:
+    return ids, len(ids), ids.__contains__
@@ -0,0 +1,140 @@
+"""On-disk cache for objects built from YAML content packs.
+
+Each cache entry is a pickle of whatever a loader built from one file, stored
+with a fingerprint of every file it was built from: modification time, size and
+SHA-256 of the bytes. Files whose mtime and size still match are trusted
+without being read; otherwise the hash decides, so a ``touch`` or a fresh
+checkout does not force a rebuild. Anything unreadable is treated as a miss.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import pickle
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+CACHE_DIR = pathlib.Path(__file__).resolve().parent.parent / "data" / ".cache"
+# Bump whenever the pickled domain models change shape.
+CACHE_VERSION = 4
+
+# (path, mtime_ns, size, sha256); all None for a file that does not exist.
+Fingerprint = Tuple[str, Optional[int], Optional[int], Optional[str]]
+
+
+def parse_yaml(path: pathlib.Path) -> Any:
+    """Parse a YAML file with the libyaml C loader when it is available."""
+    with path.open("r", encoding="utf-8") as handle:
+        return yaml.load(handle, Loader=SafeLoader)
+
+
+# Returned by cached_value() when the entry is missing or stale.
+MISSING = object()
+
+
+def load_cached(
+    kind: str,
+    path: pathlib.Path,
+    build: Callable[[], Any],
+    depends_on: Sequence[pathlib.Path] = (),
+) -> Any:
+    """Return ``build()`` for ``path``, from the cache while no source has changed.
+
+    ``kind`` names the loader so two loaders reading the same file keep
+    separate entries.
+    """
+    value = cached_value(kind, path, depends_on)
+    if value is not MISSING:
+        return value
+
+    # Fingerprint before building so an edit made mid-build is caught next time.
+    fingerprints = [_fingerprint(source) for source in [path, *depends_on]]
+    value = build()
+    _write_entry(_entry_path(kind, path), fingerprints, value)
+    return value
+
+
+def cached_value(kind: str, path: pathlib.Path, depends_on: Sequence[pathlib.Path] = ()) -> Any:
+    """The cached value for ``path`` while no source has changed, else ``MISSING``."""
+    entry_path = _entry_path(kind, path)
+    entry = _read_entry(entry_path)
+    if entry is None:
+        return MISSING
+    fingerprints = _revalidate(entry["sources"], [path, *depends_on])
+    if fingerprints is None:
+        return MISSING
+    if fingerprints != entry["sources"]:
+        _write_entry(entry_path, fingerprints, entry["value"])
+    return entry["value"]
+
+
+def _entry_path(kind: str, path: pathlib.Path) -> pathlib.Path:
+    digest = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:12]
+    return CACHE_DIR / f"{kind}-{path.stem}-{digest}.pickle"
+
+
+def _fingerprint(path: pathlib.Path) -> Fingerprint:
+    try:
+        stat = path.stat()
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return (str(path), None, None, None)
+    return (str(path), stat.st_mtime_ns, stat.st_size, digest)
+
+
+def _revalidate(
+    cached: List[Fingerprint], sources: Sequence[pathlib.Path]
+) -> Optional[List[Fingerprint]]:
+    """Current fingerprints if every source still has the cached content, else None."""
+    if [entry[0] for entry in cached] != [str(source) for source in sources]:
+        return None
+    current = []
+    for (name, mtime, size, digest), source in zip(cached, sources):
+        try:
+            stat = source.stat()
+        except FileNotFoundError:
+            if digest is not None:
+                return None
+            current.append((name, None, None, None))
+            continue
+        if digest is None or stat.st_size != size:
+            return None
+        if stat.st_mtime_ns != mtime:
+            fresh = _fingerprint(source)
+            if fresh[3] != digest:
+                return None
+            current.append(fresh)
+        else:
+            current.append((name, mtime, size, digest))
+    return current
+
+
+def _read_entry(entry_path: pathlib.Path) -> Optional[dict]:
+    try:
+        with entry_path.open("rb") as handle:
+            entry = pickle.load(handle)
+    except Exception:
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+        return None
+    return entry
+
+
+def _write_entry(entry_path: pathlib.Path, fingerprints: List[Fingerprint], value: Any) -> None:
+    entry = {"version": CACHE_VERSION, "sources": fingerprints, "value": value}
+    tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as handle:
+            pickle.dump(entry, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+    except OSError:
+        # Read-only installs simply run without a cache.
+        tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,228 @@
+"""Live view of the content packs that reloads itself when YAML files change.
+
+``ContentLibrary`` keeps the scenario catalog and roster and, while watching,
+re-reads only the files whose mtime or size changed. Every reload builds fresh
+dicts and swaps them in with a single assignment, so readers always see a
+consistent catalog. The catalog holds headers only, so startup cost and memory
+grow with the number of packs, not their size; full scenarios are built when a
+session first needs them. Running sessions keep the ``Scenario`` object they
+were created with and are unaffected by later edits.
+"""
+from __future__ import annotations
+
+import logging
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from app.config import settings
+from app.domain.models import Scenario, ScenarioHeader
+from app.services import scenario_loader, team_loader
+from app.services.catalog_index import CatalogIndex
+from app.services.roster_store import RosterStore
+from app.services.single_flight import KeyedLocks
+
+try:
+    from watchfiles import watch
+except ImportError:  # fall back to polling
+    watch = None
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) per YAML file.
+Snapshot = Dict[pathlib.Path, Tuple[int, int]]
+
+
+class ContentLibrary:
+    """Scenario catalog and roster, hot-reloaded from ``app/data``.
+
+    Only pack headers are read up front. Full scenarios are built on first use
+    by ``scenario()`` and memoized, least recently used first out.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._snapshot: Snapshot = {}
+        self._headers: Dict[pathlib.Path, Optional[ScenarioHeader]] = {}
+        self._paths: Dict[str, pathlib.Path] = {}
+        self._built: "OrderedDict[pathlib.Path, Scenario]" = OrderedDict()
+        # Built packs edited since, and packs that failed to build since their last edit.
+        self._stale: Set[pathlib.Path] = set()
+        self._broken: Dict[pathlib.Path, str] = {}  # why each one failed
+        self._building = KeyedLocks()
+        self.catalog: Dict[str, ScenarioHeader] = {}
+        self.index = CatalogIndex()
+        self.roster = RosterStore(())
+        self.generation = 0  # bumped by every reload that changed anything
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Reload whatever changed on disk; returns True if anything did."""
+        with self._lock:
+            snapshot = _snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            if not changed:
+                return False
+
+            if team_loader.ROSTER_PATH in changed:
+                try:
+                    roster = team_loader.load_roster()
+                except Exception:
+                    logger.exception("Failed to reload %s", team_loader.ROSTER_PATH)
+                else:
+                    self.roster = roster
+
+            if scenario_loader.INJECTIONS_PATH in changed:
+                # Global injections are baked into every built scenario.
+                self._stale.update(self._built)
+                self._broken.clear()
+            headers = {path: header for path, header in self._headers.items() if path in snapshot}
+            for path in sorted(changed & snapshot.keys()):
+                try:
+                    headers[path] = scenario_loader.read_header(path)
+                except Exception:
+                    # Usually a half-saved file: keep serving the previous
+                    # version and retry on the next change.
+                    logger.exception("Failed to reload %s", path)
+                    if path in self._snapshot:
+                        snapshot[path] = self._snapshot[path]
+                    else:
+                        del snapshot[path]
+                else:
+                    self._stale.add(path)
+                    self._broken.pop(path, None)
+            for path in [path for path in self._built if path not in snapshot]:
+                del self._built[path]
+            self._stale &= self._built.keys()
+            self._broken = {path: error for path, error in self._broken.items() if path in snapshot}
+
+            self._headers = headers
+            paths = {header.id: path for path, header in sorted(headers.items()) if header is not None}
+            self._paths = paths
+            catalog = {scenario_id: headers[path] for scenario_id, path in paths.items()}
+            # Re-index only headers that were re-read; unchanged packs keep their header object.
+            for scenario_id in self.catalog.keys() - catalog.keys():
+                self.index.remove(scenario_id)
+            for scenario_id, header in catalog.items():
+                if self.catalog.get(scenario_id) is not header:
+                    self.index.put(header)
+            self.catalog = catalog
+            self._snapshot = snapshot
+            self.generation += 1
+            return True
+
+    def scenario(self, scenario_id: str) -> Optional[Scenario]:
+        """Full scenario for a catalog entry, built on first use and memoized.
+
+        A pack that fails to build after an edit keeps serving its previous
+        version, and is not retried until it changes again.
+        """
+        with self._lock:
+            path = self._paths.get(scenario_id)
+            if path is None:
+                return None
+            if not self._needs_build(path):
+                return self._memoize(path, self._built.get(path), scenario_id)
+        # Built outside the library lock, so other packs and reloads are not held up;
+        # concurrent requests for the same pack wait for one build.
+        with self._building.hold(path):
+            with self._lock:
+                if not self._needs_build(path):
+                    return self._memoize(path, self._built.get(path), scenario_id)
+                generation = self.generation
+            try:
+                scenario = scenario_loader.load_scenario(path)
+                error = None
+            except Exception as exc:
+                logger.exception("Failed to load %s", path)
+                scenario, error = None, str(exc)
+            with self._lock:
+                if self.generation != generation:
+                    # Files changed during the build: use it for now, rebuild on next use.
+                    self._stale.add(path)
+                else:
+                    self._stale.discard(path)
+                    if error is not None:
+                        self._broken[path] = error
+                if scenario is None:
+                    scenario = self._built.get(path)
+                return self._memoize(path, scenario, scenario_id)
+
+    def _needs_build(self, path: pathlib.Path) -> bool:
+        return (path not in self._built or path in self._stale) and path not in self._broken
+
+    def _memoize(self, path: pathlib.Path, scenario: Optional[Scenario], scenario_id: str) -> Optional[Scenario]:
+        # Caller holds self._lock.
+        if scenario is None or scenario.id != scenario_id:
+            return None
+        self._built[path] = scenario
+        self._built.move_to_end(path)
+        while len(self._built) > settings.scenario_memo_size:
+            evicted, _ = self._built.popitem(last=False)
+            self._stale.discard(evicted)
+        return scenario
+
+    def load_error(self, scenario_id: str) -> Optional[str]:
+        """Why a catalog entry's pack failed to build, while it has no version to serve."""
+        with self._lock:
+            path = self._paths.get(scenario_id)
+            if path is None or path in self._built:
+                return None
+            return self._broken.get(path)
+
+    def preload(self) -> None:
+        """Build every pack now, parsing stale ones in parallel, and memoize as many as fit."""
+        try:
+            scenarios = scenario_loader.load_scenarios()
+        except Exception:
+            logger.exception("Preloading scenarios failed; packs will be built on first use")
+            return
+        with self._lock:
+            for scenario_id, path in list(self._paths.items())[: settings.scenario_memo_size]:
+                scenario = scenarios.get(scenario_id)
+                if scenario is not None:
+                    self._built[path] = scenario
+                    self._stale.discard(path)
+
+    def stats(self) -> Dict[str, int]:
+        return {"catalog": len(self.catalog), "built": len(self._built)}
+
+    def start_watching(self) -> None:
+        """Reload in a background thread whenever the data directory changes."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="content-reload", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _watch(self) -> None:
+        if watch is not None:
+            for _ in watch(scenario_loader.DATA_DIR, stop_event=self._stop):
+                self.refresh()
+        else:
+            while not self._stop.wait(settings.content_poll_interval):
+                self.refresh()
+
+
+def _snapshot() -> Snapshot:
+    snapshot: Snapshot = {}
+    for path in scenario_loader.scenario_paths():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
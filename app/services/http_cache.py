@@ -0,0 +1,163 @@
+"""ETags, conditional requests and precompressed bodies for cacheable responses.
+
+The roster, catalog pages and the rendered index page change only when the
+content library reloads, and the static assets never change while the server
+runs. Each is encoded once into a ``CachedBody`` that carries a content-hash
+ETag and, when it is worth it, a gzip variant. A request whose If-None-Match
+names the ETag gets an empty 304. Otherwise the client gets the stored bytes
+without rendering, encoding or compressing anything again.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import pathlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class CachedBody:
+    """An encoded response body with its validators and optional gzip variant."""
+
+    body: bytes
+    media_type: str
+    etag: str  # strong and quoted; the gzip variant's ETag adds a -gz suffix
+    gzipped: Optional[bytes] = None
+
+    @classmethod
+    def build(cls, body: bytes, media_type: str) -> "CachedBody":
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        gzipped = None
+        if len(body) >= settings.gzip_min_size:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) >= len(body):
+                gzipped = None
+        return cls(body=body, media_type=media_type, etag=f'"{digest}"', gzipped=gzipped)
+
+    @property
+    def version(self) -> str:
+        """Short content hash, used to fingerprint static URLs."""
+        return self.etag[1:13]
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as RFC 9110 prescribes for If-None-Match."""
+    if not if_none_match:
+        return False
+    opaque = etag[:-1]  # without the closing quote, so the -gz variant matches too
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag or candidate == f'{opaque}-gz"':
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            quality = params.strip().lower()
+            return not (quality.startswith("q=") and quality[2:].strip("0.") == "")
+    return False
+
+
+def respond(request: Request, cached: CachedBody, cache_control: str = "no-cache") -> Response:
+    """``cached`` as a full response, or a 304 if the client already holds it."""
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control}
+    if cached.gzipped is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    body = cached.body
+    if cached.gzipped is not None and accepts_gzip(request.headers.get("accept-encoding")):
+        body = cached.gzipped
+        headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = f'{cached.etag[:-1]}-gz"'
+    return Response(content=body, media_type=cached.media_type, headers=headers)
+
+
+class ResponseCache:
+    """LRU of encoded responses; keys include the content generation they were built from."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self.max_entries = settings.http_cache_size if max_entries is None else max_entries
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], Tuple[bytes, str]]) -> CachedBody:
+        """Cached body for ``key``; ``build`` returns (body, media type) on a miss."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+
+        cached = CachedBody.build(*build())
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = cached
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return cached
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(cached.size for cached in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+class StaticAssets:
+    """Every file under a directory, read, hashed and gzipped once at startup."""
+
+    def __init__(self, directory: str) -> None:
+        root = pathlib.Path(directory)
+        self._assets: Dict[str, CachedBody] = {}
+        for path in sorted(root.rglob("*")):
+            if path.is_file():
+                media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+                if media_type.startswith("text/") or media_type.endswith("javascript"):
+                    media_type += "; charset=utf-8"
+                self._assets[path.relative_to(root).as_posix()] = CachedBody.build(path.read_bytes(), media_type)
+
+    def url(self, name: str) -> str:
+        """Fingerprinted URL of an asset; it changes whenever the file does."""
+        return f"/static/{name}?v={self._assets[name].version}"
+
+    def respond(self, request: Request, name: str) -> Response:
+        cached = self._assets.get(name)
+        if cached is None:
+            return Response(status_code=404)
+        if request.query_params.get("v") == cached.version:
+            # The URL names this exact content, so it can never go stale.
+            cache_control = f"public, max-age={settings.static_max_age}, immutable"
+        else:
+            cache_control = "no-cache"
+        return respond(request, cached, cache_control)
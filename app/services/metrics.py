@@ -0,0 +1,213 @@
+"""Process metrics exposed in the Prometheus text format.
+
+Counters and histograms accumulate per thread: each thread only ever writes
+its own cell, so recording takes no lock and never contends with other
+threads or with a scrape. A scrape sums the cells of every thread that has
+recorded anything. Gauges are callbacks evaluated at scrape time.
+"""
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+Labels = Tuple[str, ...]
+
+# Seconds; suits request latencies from tens of microseconds to seconds.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        raise NotImplementedError
+
+    def _labels(self, labelnames: Sequence[str], values: Labels) -> str:
+        if not labelnames:
+            return ""
+        pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, values))
+        return "{" + pairs + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, value in self.samples():
+            names = self.labelnames + (("le",) if suffix == "_bucket" else ())
+            lines.append(f"{self.name}{suffix}{self._labels(names, values)} {_number(value)}")
+        return lines
+
+
+class _ThreadCells(_Metric):
+    """Metric whose state is a dict of label values per recording thread."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._local = threading.local()
+        self._cells: List[Dict] = []
+        self._cells_lock = threading.Lock()
+
+    def _cell(self) -> Dict:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell: Dict = {}
+            with self._cells_lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def _all_cells(self) -> List[Dict]:
+        with self._cells_lock:
+            return list(self._cells)
+
+
+class Counter(_ThreadCells):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        cell = self._cell()
+        cell[labels] = cell.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return sum(cell.get(labels, 0) for cell in self._all_cells())
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        totals: Dict[Labels, float] = {}
+        for cell in self._all_cells():
+            for labels, value in list(cell.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        for labels in sorted(totals):
+            yield "_total", labels, totals[labels]
+
+    def render(self) -> List[str]:
+        # The 0.0.4 text format types the sample name itself, _total included.
+        name = self.name if self.name.endswith("_total") else self.name + "_total"
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} counter"]
+        for _, values, value in self.samples():
+            lines.append(f"{name}{self._labels(self.labelnames, values)} {_number(value)}")
+        return lines
+
+
+class Histogram(_ThreadCells):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        cell = self._cell()
+        series = cell.get(labels)
+        if series is None:
+            # Per-bucket counts (last slot is +Inf), then sum.
+            series = cell[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        merged: Dict[Labels, List[float]] = {}
+        for cell in self._all_cells():
+            for labels, series in list(cell.items()):
+                total = merged.setdefault(labels, [0] * len(series))
+                for index, value in enumerate(series):
+                    total[index] += value
+        for labels in sorted(merged):
+            series = merged[labels]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                yield "_bucket", (*labels, _number(bound)), cumulative
+            yield "_sum", labels, series[-1]
+            yield "_count", labels, cumulative
+
+
+class Gauge(_Metric):
+    """Values read from ``collect`` at scrape time, keyed by label values."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Mapping[Labels, float]],
+        labelnames: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterable[Tuple[str, Labels, float]]:
+        for labels, value in sorted(self.collect().items()):
+            yield "", labels, value
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Mapping[Labels, float]],
+        labelnames: Sequence[str] = (),
+    ) -> Gauge:
+        return self.register(Gauge(name, help, collect, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide registry served at /metrics.
+registry = MetricsRegistry()
@@ -0,0 +1,224 @@
+"""Headless Monte Carlo runner used to balance scenario content.
+
+Plays many complete games of a scenario with a decision policy and aggregates
+the outcomes. Games are split into fixed-size chunks; every chunk seeds its own
+RNG from ``(seed, chunk_index)`` so results are reproducible regardless of how
+many worker processes the chunks are spread over.
+"""
+from __future__ import annotations
+
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.config import settings
+from app.domain.models import Scenario
+from app.services.simulation import SimulationEngine
+
+CHUNK_SIZE = 1000
+METRICS = ("budget", "reputation", "risk")
+
+
+class Policy:
+    """Chooses an option id for the challenge currently presented."""
+
+    name = "policy"
+
+    def reset(self) -> None:
+        """Called before every game."""
+
+    def choose(self, presentable: Dict, rng: random.Random) -> Optional[str]:
+        raise NotImplementedError
+
+
+class RandomPolicy(Policy):
+    name = "random"
+
+    def choose(self, presentable: Dict, rng: random.Random) -> Optional[str]:
+        return rng.choice(presentable["challenges"][0].options).id
+
+
+class GreedyPolicy(Policy):
+    """Always picks the option with the highest success probability."""
+
+    name = "greedy"
+
+    def choose(self, presentable: Dict, rng: random.Random) -> Optional[str]:
+        options = presentable["challenges"][0].options
+        probabilities = presentable["probabilities"]
+        return max(options, key=lambda opt: probabilities[opt.id]).id
+
+
+class ScriptPolicy(Policy):
+    """Plays a fixed sequence of option ids.
+
+    Scripted ids are consumed in order when offered; challenges the script does
+    not cover (e.g. injections) get their first option. The game is abandoned
+    once the script runs out.
+    """
+
+    name = "script"
+
+    def __init__(self, option_ids: Sequence[str]) -> None:
+        self.option_ids = list(option_ids)
+        self._cursor = 0
+
+    def reset(self) -> None:
+        self._cursor = 0
+
+    def choose(self, presentable: Dict, rng: random.Random) -> Optional[str]:
+        if self._cursor >= len(self.option_ids):
+            return None
+        options = presentable["challenges"][0].options
+        wanted = self.option_ids[self._cursor]
+        if any(opt.id == wanted for opt in options):
+            self._cursor += 1
+            return wanted
+        return options[0].id
+
+
+def make_policy(name: str, script: Sequence[str] = ()) -> Policy:
+    if name == "random":
+        return RandomPolicy()
+    if name == "greedy":
+        return GreedyPolicy()
+    if name == "script":
+        return ScriptPolicy(script)
+    raise ValueError(f"Unknown policy '{name}'")
+
+
+@dataclass
+class BatchReport:
+    """Aggregated results of a batch; chunk reports merge into one."""
+
+    games: int = 0
+    wins: int = 0
+    fired: int = 0
+    finished: int = 0
+    distributions: Dict[str, Counter] = field(
+        default_factory=lambda: {metric: Counter() for metric in METRICS}
+    )
+
+    def record(self, state, finished: bool) -> None:
+        fired = state.budget <= 0 or state.reputation <= 0
+        self.games += 1
+        self.finished += finished
+        self.fired += fired
+        self.wins += finished and not fired
+        for metric in METRICS:
+            self.distributions[metric][getattr(state, metric)] += 1
+
+    def merge(self, other: "BatchReport") -> None:
+        self.games += other.games
+        self.wins += other.wins
+        self.fired += other.fired
+        self.finished += other.finished
+        for metric in METRICS:
+            self.distributions[metric].update(other.distributions[metric])
+
+    def summary(self) -> Dict:
+        games = max(1, self.games)
+        return {
+            "games": self.games,
+            "win_rate": self.wins / games,
+            "fired_rate": self.fired / games,
+            "finished_rate": self.finished / games,
+            "distributions": {
+                metric: _describe(self.distributions[metric]) for metric in METRICS
+            },
+        }
+
+
+def _describe(histogram: Counter) -> Dict:
+    total = sum(histogram.values())
+    if not total:
+        return {}
+    values = sorted(histogram)
+    mean = sum(value * count for value, count in histogram.items()) / total
+    variance = sum(count * (value - mean) ** 2 for value, count in histogram.items()) / total
+    summary = {"min": values[0], "max": values[-1], "mean": mean, "stdev": variance ** 0.5}
+    for label, q in (("p10", 0.10), ("p50", 0.50), ("p90", 0.90)):
+        target = q * (total - 1)
+        seen = 0
+        for value in values:
+            seen += histogram[value]
+            if seen > target:
+                summary[label] = value
+                break
+    return summary
+
+
+def play_game(scenario: Scenario, team_members: List[Dict], policy: Policy, rng: random.Random):
+    """Play one game to completion; returns (final_state, finished)."""
+    engine = SimulationEngine(scenario, team_members, seed=rng.getrandbits(64))
+    policy.reset()
+    max_decisions = settings.max_rounds + len(scenario.injections) + 1
+    for _ in range(max_decisions):
+        option_id = policy.choose(engine.current_presentable(), rng)
+        if option_id is None:
+            return engine.state, False
+        if engine.apply_option(option_id)["finished"]:
+            return engine.state, True
+    return engine.state, False
+
+
+def run_chunk(
+    scenario: Scenario,
+    team_members: List[Dict],
+    policy: Policy,
+    seed: int,
+    chunk_index: int,
+    games: int,
+) -> BatchReport:
+    # Engine seeds and policy choices both come from the chunk's stream.
+    rng = random.Random(f"{seed}:{chunk_index}")
+    report = BatchReport()
+    for _ in range(games):
+        state, finished = play_game(scenario, team_members, policy, rng)
+        report.record(state, finished)
+    return report
+
+
+_worker_args: tuple = ()
+
+
+def _init_worker(scenario: Scenario, team_members: List[Dict], policy: Policy, seed: int) -> None:
+    global _worker_args
+    _worker_args = (scenario, team_members, policy, seed)
+
+
+def _run_worker_chunk(chunk: tuple) -> BatchReport:
+    chunk_index, games = chunk
+    return run_chunk(*_worker_args, chunk_index, games)
+
+
+def _chunks(games: int) -> Iterable[tuple]:
+    for chunk_index, start in enumerate(range(0, games, CHUNK_SIZE)):
+        yield chunk_index, min(CHUNK_SIZE, games - start)
+
+
+def run_batch(
+    scenario: Scenario,
+    team_members: List[Dict],
+    games: int,
+    policy: Policy,
+    seed: int = 0,
+    workers: int = 1,
+) -> BatchReport:
+    """Run ``games`` complete games and return the merged report."""
+    report = BatchReport()
+    if workers <= 1:
+        for chunk_index, size in _chunks(games):
+            report.merge(run_chunk(scenario, team_members, policy, seed, chunk_index, size))
+        return report
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(scenario, team_members, policy, seed),
+    ) as pool:
+        for chunk_report in pool.map(_run_worker_chunk, _chunks(games)):
+            report.merge(chunk_report)
+    return report
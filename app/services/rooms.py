@@ -0,0 +1,141 @@
+"""Facilitation rooms: push session updates to WebSocket subscribers.
+
+A room groups one facilitator and any number of team sessions. Each update is
+encoded once and offered to every subscriber's bounded outbox without waiting
+on the network; every subscriber drains its own outbox on its own task, so a
+slow client only ever falls behind itself. Updates are keyed by session: a
+newer update replaces one still queued for the same session, and when the
+outbox is full of other sessions the oldest update is dropped and counted.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+
+
+class Subscriber:
+    """One connected client and the updates it has not been sent yet."""
+
+    def __init__(self, send: Callable[[str], Awaitable[None]], max_pending: int) -> None:
+        self.max_pending = max_pending
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._send = send
+        self.loop = asyncio.get_running_loop()
+        self._pending: "OrderedDict[str, str]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self._closed = False
+
+    def offer(self, key: str, message: str) -> None:
+        """Queue ``message``, replacing any queued message with the same key.
+
+        Must run on ``self.loop``; ``RoomHub.publish`` takes care of that.
+        """
+        if self._pending.pop(key, None) is not None:
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[key] = message
+        self._wake.set()
+
+    async def run(self) -> None:
+        """Send queued messages until closed or the connection fails."""
+        try:
+            while not self._closed:
+                await self._wake.wait()
+                self._wake.clear()
+                while self._pending and not self._closed:
+                    _, message = self._pending.popitem(last=False)
+                    await self._send(message)
+                    self.sent += 1
+        except Exception:
+            # The receive loop notices the disconnect and unsubscribes us.
+            self._closed = True
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+
+
+class RoomHub:
+    """Rooms, their subscribers and which room each session reports to."""
+
+    def __init__(self, max_pending: Optional[int] = None) -> None:
+        self.max_pending = settings.room_max_pending if max_pending is None else max_pending
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._sessions: Dict[str, str] = {}
+        # Sessions attach and detach from threadpool threads and the registry; sockets subscribe on the loop.
+        self._lock = threading.Lock()
+
+    def attach(self, session_id: str, room_id: str) -> None:
+        with self._lock:
+            self._sessions[session_id] = room_id
+
+    def detach(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def room_of(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def sessions(self, room_id: str) -> List[str]:
+        with self._lock:
+            return [session_id for session_id, room in self._sessions.items() if room == room_id]
+
+    def subscribe(self, room_id: str, send: Callable[[str], Awaitable[None]]) -> Subscriber:
+        subscriber = Subscriber(send, self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(room_id, set()).add(subscriber)
+        subscriber.offer(
+            "room", json.dumps({"type": "room", "room_id": room_id, "sessions": self.sessions(room_id)})
+        )
+        return subscriber
+
+    def unsubscribe(self, room_id: str, subscriber: Subscriber) -> None:
+        subscriber.close()
+        with self._lock:
+            subscribers = self._subscribers.get(room_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[room_id]
+
+    def publish(self, session_id: str, payload: Dict) -> None:
+        """Fan ``payload`` out to the room ``session_id`` belongs to, if any."""
+        with self._lock:
+            room_id = self._sessions.get(session_id)
+            subscribers = list(self._subscribers.get(room_id, ())) if room_id is not None else []
+        if not subscribers:
+            return
+        message = json.dumps({"session_id": session_id, **payload})
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        for subscriber in subscribers:
+            if subscriber.loop is current:
+                subscriber.offer(session_id, message)
+            else:
+                subscriber.loop.call_soon_threadsafe(subscriber.offer, session_id, message)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rooms = len(self._subscribers)
+            subscribers = [s for room in self._subscribers.values() for s in room]
+            sessions = len(self._sessions)
+        return {
+            "rooms": rooms,
+            "subscribers": len(subscribers),
+            "sessions": sessions,
+            "sent": sum(s.sent for s in subscribers),
+            "coalesced": sum(s.coalesced for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+        }
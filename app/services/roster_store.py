@@ -0,0 +1,162 @@
+"""Columnar roster for large candidate pools.
+
+Member names and roles are tuples, and cost and each skill live in compact
+integer arrays, one slot per member. A ``Character`` is only built when one
+member is asked for. Indexes are built once per roster:
+
+- members by role;
+- one ordering per sort key, so a cost band is a binary search and the top k
+  of a skill is a slice;
+- each member's rank in every ordering, so a cursor resumes a page in O(1).
+
+A store is immutable; the content library builds a new one when the roster
+file changes.
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import itertools
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.domain.models import SKILLS, Character, StatBlock
+from app.services.catalog_index import decode_cursor, encode_cursor
+
+# "roster" keeps the file's order; skills sort from the highest stat down.
+SORTS = ("roster", "name", "cost", *SKILLS)
+
+# (name, role, cost, stats in SKILLS order)
+Row = Tuple[str, str, int, Tuple[int, ...]]
+
+
+class RosterStore(Sequence):
+    """Read-only sequence of ``Character`` backed by stat columns."""
+
+    def __init__(self, rows: Iterable[Row]) -> None:
+        rows = list(rows)
+        self.names: Tuple[str, ...] = tuple(row[0] for row in rows)
+        self.roles: Tuple[str, ...] = tuple(row[1] for row in rows)
+        self.costs = array("i", (row[2] for row in rows))
+        self.stats: Tuple[array, ...] = tuple(
+            array("i", (row[3][k] for row in rows)) for k in range(len(SKILLS))
+        )
+        # Later duplicates win, as they did in the name map this replaces.
+        self._rows: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        everyone = range(len(rows))
+        keys = {
+            "roster": None,
+            "name": lambda i: (self.names[i], i),
+            "cost": lambda i: (self.costs[i], self.names[i], i),
+            **{
+                skill: (lambda i, column=self.stats[k]: (-column[i], self.names[i], i))
+                for k, skill in enumerate(SKILLS)
+            },
+        }
+        self._orders: Dict[str, array] = {
+            sort: array("i", everyone if key is None else sorted(everyone, key=key)) for sort, key in keys.items()
+        }
+        self._ranks: Dict[str, array] = {}
+        for sort, order in self._orders.items():
+            rank = array("i", bytes(4 * len(order)))
+            for position, row in enumerate(order):
+                rank[row] = position
+            self._ranks[sort] = rank
+        self._sorted_costs = array("i", (self.costs[row] for row in self._orders["cost"]))
+        self._by_role: Dict[str, array] = {}
+        for row in everyone:
+            self._by_role.setdefault(self.roles[row].casefold(), array("i")).append(row)
+        digest = hashlib.blake2b(digest_size=16)
+        for row in rows:
+            digest.update(repr(row).encode("utf-8"))
+        self.version = digest.hexdigest()  # changes whenever any member does
+
+    @classmethod
+    def from_characters(cls, members: Iterable[Character]) -> "RosterStore":
+        return cls(
+            (m.name, m.role, m.cost, tuple(getattr(m.stats, skill) for skill in SKILLS)) for m in members
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.character(row) for row in range(len(self))[index]]
+        return self.character(range(len(self))[index])
+
+    def __iter__(self) -> Iterator[Character]:
+        return map(self.character, range(len(self)))
+
+    def character(self, row: int) -> Character:
+        return Character(
+            name=self.names[row],
+            role=self.roles[row],
+            cost=self.costs[row],
+            stats=StatBlock(*(column[row] for column in self.stats)),
+        )
+
+    def get(self, name: str) -> Optional[Character]:
+        row = self._rows.get(name)
+        return None if row is None else self.character(row)
+
+    def totals(self, names: Iterable[str]) -> Dict[str, int]:
+        """Skill totals of the named members, summed column by column; unknown names count nothing."""
+        rows = [self._rows[name] for name in names if name in self._rows]
+        return {skill: sum(column[row] for row in rows) for skill, column in zip(SKILLS, self.stats)}
+
+    def roles_count(self) -> Dict[str, int]:
+        return {role: len(rows) for role, rows in sorted(self._by_role.items())}
+
+    def top(self, skill: str, k: int) -> List[Character]:
+        """The ``k`` members with the highest ``skill``."""
+        return [self.character(row) for row in self._orders[skill][:k]]
+
+    def query(
+        self,
+        role: Optional[str] = None,
+        min_cost: Optional[int] = None,
+        max_cost: Optional[int] = None,
+        sort: str = "roster",
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Dict:
+        """One page of members matching every filter; raises ValueError for a bad sort or cursor.
+
+        The cursor names the last member of the previous page.
+        """
+        if sort not in self._orders:
+            raise ValueError(f"Unknown sort {sort!r}; expected one of {', '.join(SORTS)}")
+        order, rank = self._orders[sort], self._ranks[sort]
+        start = 0
+        if cursor:
+            row = self._rows.get(decode_cursor(cursor))
+            if row is None:
+                raise ValueError("Invalid cursor")
+            start = rank[row] + 1
+
+        low = -(2**31) if min_cost is None else min_cost
+        high = 2**31 - 1 if max_cost is None else max_cost
+        if role is not None:
+            positions = sorted(rank[row] for row in self._by_role.get(role.casefold(), ()))
+            candidates: Iterable[int] = (order[p] for p in positions[bisect.bisect_left(positions, start) :])
+        elif sort == "cost":
+            # Already in cost order: the band is a contiguous slice.
+            begin = max(start, bisect.bisect_left(self._sorted_costs, low))
+            candidates = order[begin : bisect.bisect_right(self._sorted_costs, high)]
+        else:
+            candidates = itertools.islice(order, start, None)
+
+        costs = self.costs
+        found: List[int] = []
+        for row in candidates:
+            if low <= costs[row] <= high:
+                found.append(row)
+                if len(found) > limit:
+                    break
+        page = [self.character(row) for row in found[:limit]]
+        return {
+            "members": page,
+            "next_cursor": encode_cursor(page[-1].name) if len(found) > limit else None,
+        }
@@ -1,78 +1,203 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import itertools
+import logging
+import os
 import pathlib
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import yaml
 
+from app.config import settings
 from app.domain.models import (
+    OUTCOME_ACTIONS,
     Challenge,
     Injection,
     Option,
     Outcome,
     Scenario,
+    ScenarioGraph,
+    ScenarioHeader,
     Stage,
 )
+from app.services.content_cache import MISSING, SafeLoader, cached_value, load_cached, parse_yaml
 
 DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / "data"
+INJECTIONS_PATH = DATA_DIR / "injections.yaml"
 
+logger = logging.getLogger(__name__)
 
-def _load_global_injections() -> Dict[str, Injection]:
-    """Load global injections from injections.yaml that apply to all scenarios."""
-    injections_path = DATA_DIR / "injections.yaml"
-    if not injections_path.exists():
-        return {}
-    
-    with injections_path.open("r", encoding="utf-8") as handle:
-        payload = yaml.safe_load(handle)
-    
+# Top-level keys read_header() extracts.
+HEADER_FIELDS = ("id", "name", "briefing")
+
+
+class ScenarioError(ValueError):
+    """A scenario pack whose stage graph cannot be played."""
+
+
+def _load_global_injections() -> List[Dict]:
+    """Load global injection payloads from injections.yaml that apply to all scenarios.
+
+    Payloads are built per scenario so that option indexes stay scenario-local.
+    """
+    if not INJECTIONS_PATH.exists():
+        return []
+
+    payload = parse_yaml(INJECTIONS_PATH)
     if not payload or "injections" not in payload:
-        return {}
-    
-    global_injections = {}
-    for injection_payload in payload["injections"]:
-        injection = _build_injection(injection_payload)
-        global_injections[injection.id] = injection
-    
-    return global_injections
-
-
-def load_scenarios() -> Dict[str, Scenario]:
-    """Load all scenario definitions from YAML files (skips non-scenario YAML like roster)."""
-    global_injections = _load_global_injections()
+        return []
+
+    # Later entries with the same id replace earlier ones.
+    return list({entry["id"]: entry for entry in payload["injections"]}.values())
+
+
+def load_scenarios(workers: Optional[int] = None) -> Dict[str, Scenario]:
+    """Load all scenario definitions from YAML files (skips non-scenario YAML like roster
+    and packs that fail to build).
+
+    Built scenarios come from the content cache while neither the pack nor
+    injections.yaml has changed. Stale packs are parsed across ``workers``
+    processes (``settings.content_workers`` by default; 0 means one per CPU).
+    """
+    paths = scenario_paths()
+    packs: Dict[pathlib.Path, Optional[Scenario]] = {}
+    stale = []
+    for yaml_path in paths:
+        pack = cached_value("scenario", yaml_path, [INJECTIONS_PATH])
+        if pack is MISSING:
+            stale.append(yaml_path)
+        else:
+            packs[yaml_path] = pack
+
+    workers = settings.content_workers if workers is None else workers
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    # A pack that fails to build is logged and left out; the others still load.
+    if workers > 1:
+        # Each worker parses injections.yaml once and writes its own cache entries.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(yaml_path, pool.submit(load_scenario, yaml_path)) for yaml_path in stale]
+            for yaml_path, future in futures:
+                try:
+                    packs[yaml_path] = future.result()
+                except Exception:
+                    logger.exception("Failed to load %s", yaml_path)
+                    packs[yaml_path] = None
+    else:
+        # Parsed at most once, and only if some pack misses the cache.
+        global_injections = functools.cache(_load_global_injections)
+        for yaml_path in stale:
+            try:
+                packs[yaml_path] = load_scenario(yaml_path, global_injections)
+            except Exception:
+                logger.exception("Failed to load %s", yaml_path)
+                packs[yaml_path] = None
+
     scenarios: Dict[str, Scenario] = {}
-    for yaml_path in DATA_DIR.glob("*.yaml"):
-        with yaml_path.open("r", encoding="utf-8") as handle:
-            payload = yaml.safe_load(handle)
-        if not payload or "stages" not in payload:
-            continue
-        scenario = _build_scenario(payload, global_injections)
-        scenarios[scenario.id] = scenario
+    for yaml_path in paths:
+        scenario = packs[yaml_path]
+        if scenario is not None:
+            scenarios[scenario.id] = scenario
     return scenarios
 
 
-def _build_scenario(payload: Dict, global_injections: Dict[str, Injection]) -> Scenario:
+def read_header(yaml_path: pathlib.Path) -> Optional[ScenarioHeader]:
+    """Catalog entry for a pack, or None for YAML that is not a scenario.
+
+    Streams the top-level mapping and stops at ``stages`` once id, name and
+    briefing are known, so the stages of a well-ordered pack are never parsed.
+    Optional ``tags`` are only seen when they come before ``stages``.
+    """
+    fields: Dict[str, str] = {}
+    tags: List[str] = []
+    is_scenario = False
+    depth = 0
+    key = None  # top-level key whose value is being read
+    with yaml_path.open("r", encoding="utf-8") as handle:
+        for event in yaml.parse(handle, Loader=SafeLoader):
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                if depth == 1 and key == "stages":
+                    is_scenario = True
+                    if len(fields) == len(HEADER_FIELDS):
+                        break
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+                if depth == 1:
+                    key = None
+            elif depth == 2 and key == "tags" and isinstance(event, yaml.ScalarEvent):
+                tags.append(event.value)
+            elif depth == 1 and isinstance(event, (yaml.ScalarEvent, yaml.AliasEvent)):
+                if key is None:
+                    key = event.value
+                    continue
+                if key == "stages":
+                    is_scenario = True
+                elif key in HEADER_FIELDS and isinstance(event, yaml.ScalarEvent):
+                    fields[key] = event.value
+                key = None
+    if not is_scenario:
+        return None
+    missing = [name for name in HEADER_FIELDS if name not in fields]
+    if missing:
+        raise ScenarioError(f"{yaml_path.name}: missing {', '.join(missing)}")
+    return ScenarioHeader(**fields, tags=tuple(tags))
+
+
+def scenario_paths() -> List[pathlib.Path]:
+    """Every YAML file that may hold a scenario, in load order."""
+    return sorted(DATA_DIR.glob("*.yaml"))
+
+
+def load_scenario(
+    yaml_path: pathlib.Path,
+    global_injections: Callable[[], List[Dict]] = _load_global_injections,
+) -> Optional[Scenario]:
+    """Load a single pack; returns None for YAML that is not a scenario."""
+    return load_cached(
+        "scenario",
+        yaml_path,
+        functools.partial(_parse_scenario, yaml_path, global_injections),
+        depends_on=[INJECTIONS_PATH],
+    )
+
+
+def _parse_scenario(
+    yaml_path: pathlib.Path, global_injections: Callable[[], List[Dict]]
+) -> Optional[Scenario]:
+    payload = parse_yaml(yaml_path)
+    if not payload or "stages" not in payload:
+        return None
+    digest = hashlib.sha256(yaml_path.read_bytes())
+    if INJECTIONS_PATH.exists():
+        digest.update(INJECTIONS_PATH.read_bytes())
+    return _build_scenario(payload, global_injections(), digest.hexdigest()[:12])
+
+
+def _build_scenario(payload: Dict, global_injections: List[Dict], version: str = "") -> Scenario:
+    # Options are numbered scenario-wide so sessions can keep per-option tables in lists.
+    option_index = itertools.count()
     stages = {}
-    for stage_payload in payload["stages"]:
+    for stage_index, stage_payload in enumerate(payload["stages"]):
         stage = Stage(
             id=stage_payload["id"],
             title=stage_payload["title"],
             summary=stage_payload["summary"],
-            challenges=[
-                _build_challenge(challenge_payload)
+            challenges=tuple(
+                _build_challenge(challenge_payload, option_index)
                 for challenge_payload in stage_payload["challenges"]
-            ],
+            ),
+            index=stage_index,
         )
         stages[stage.id] = stage
 
-    # Build scenario-specific injections
-    scenario_injections = [
-        _build_injection(injection_payload)
-        for injection_payload in payload.get("injections", [])
-    ]
-    
-    # Combine global and scenario-specific injections
-    all_injections = list(global_injections.values()) + scenario_injections
+    # Global injections first, then scenario-specific ones
+    all_injections = tuple(
+        _build_injection(injection_payload, option_index)
+        for injection_payload in [*global_injections, *payload.get("injections", [])]
+    )
 
     return Scenario(
         id=payload["id"],
@@ -81,15 +206,213 @@ def _build_scenario(payload: Dict, global_injections: Dict[str, Injection]) -> S
         stages=stages,
         starting_stage=payload["starting_stage"],
         injections=all_injections,
+        version=version,
+        graph=_compile_graph(payload["id"], stages, payload["starting_stage"], all_injections),
+    )
+
+
+def _compile_graph(
+    scenario_id: str, stages: Dict[str, Stage], starting_stage: str, injections: Sequence[Injection]
+) -> ScenarioGraph:
+    """Validate the stage graph and precompute its indexes.
+
+    Anything that would fail mid-game raises ScenarioError: an unknown starting
+    stage, a ``next_stage`` the engine would follow that does not exist, an
+    unknown action, or a stage or challenge with nothing to choose. Only the
+    last challenge of a stage leads anywhere; packs use ``next_stage`` on
+    earlier challenges and on injections as a note, so those are not checked.
+    Unreachable stages and cycles still play, so they are only logged.
+    """
+    errors: List[str] = []
+    if starting_stage not in stages:
+        errors.append(f"starting_stage '{starting_stage}' does not exist")
+    # (where, options, whether their next_stage is followed)
+    choices = [
+        (f"stage {stage.id} challenge {challenge.id}", challenge.options, challenge is stage.challenges[-1])
+        for stage in stages.values()
+        for challenge in stage.challenges
+    ]
+    choices.extend((f"injection {injection.id}", injection.options, False) for injection in injections)
+    for stage in stages.values():
+        if not stage.challenges:
+            errors.append(f"stage {stage.id} has no challenges")
+    for where, options, followed in choices:
+        if not options:
+            errors.append(f"{where} has no options")
+        for option in options:
+            for outcome in (option.success, option.failure):
+                if outcome is None:
+                    continue
+                if followed and outcome.next_stage is not None and outcome.next_stage not in stages:
+                    errors.append(f"{where} option {option.id}: next_stage '{outcome.next_stage}' does not exist")
+                if outcome.action is not None and outcome.action not in OUTCOME_ACTIONS:
+                    errors.append(f"{where} option {option.id}: unknown action '{outcome.action}'")
+    if errors:
+        raise ScenarioError(f"Scenario {scenario_id}: " + "; ".join(errors))
+
+    order = sorted(stages, key=lambda stage_id: stages[stage_id].index)
+    successors = {
+        stage_id: tuple(
+            sorted(
+                {
+                    next_stage
+                    for option in stages[stage_id].challenges[-1].options
+                    for ends, next_stage in _branches(option)
+                    if not ends and next_stage is not None
+                },
+                key=lambda next_id: stages[next_id].index,
+            )
+        )
+        for stage_id in order
+    }
+
+    reachable = {starting_stage}
+    todo = [starting_stage]
+    while todo:
+        for next_stage in successors[todo.pop()]:
+            if next_stage not in reachable:
+                reachable.add(next_stage)
+                todo.append(next_stage)
+
+    min_rounds: Dict[str, Tuple[Optional[int], ...]] = {}
+    max_rounds: Dict[str, Tuple[Optional[int], ...]] = {}
+    cycles = []
+    # Sinks first, so every stage's successors outside its own component are done.
+    for component in reversed(_components(order, successors)):
+        members = set(component)
+        if len(component) > 1 or component[0] in successors[component[0]]:
+            cycles.append(tuple(sorted(component, key=lambda stage_id: stages[stage_id].index)))
+            for stage_id in component:
+                max_rounds[stage_id] = _stage_rounds(stages[stage_id], max_rounds, _most, unbounded=members)
+            # Shortest way out of the loop: relax until nothing improves.
+            while True:
+                fresh = {stage_id: _stage_rounds(stages[stage_id], min_rounds, _fewest) for stage_id in component}
+                if all(min_rounds.get(stage_id) == rounds for stage_id, rounds in fresh.items()):
+                    break
+                min_rounds.update(fresh)
+        else:
+            stage = stages[component[0]]
+            min_rounds[stage.id] = _stage_rounds(stage, min_rounds, _fewest)
+            max_rounds[stage.id] = _stage_rounds(stage, max_rounds, _most)
+
+    unreachable = [stage_id for stage_id in order if stage_id not in reachable]
+    if unreachable:
+        logger.warning("Scenario %s: stages never reached from %s: %s", scenario_id, starting_stage, ", ".join(unreachable))
+    for cycle in cycles:
+        logger.warning("Scenario %s: stages %s can loop; only the round cap ends games there", scenario_id, ", ".join(cycle))
+
+    return ScenarioGraph(
+        successors=successors,
+        terminal=frozenset(stage_id for stage_id in order if not successors[stage_id]),
+        reachable=frozenset(reachable),
+        cycles=tuple(cycles),
+        min_rounds=min_rounds,
+        max_rounds=max_rounds,
     )
 
 
-def _build_challenge(payload: Dict) -> Challenge:
+def _branches(option: Option) -> Tuple[Tuple[bool, Optional[str]], ...]:
+    """(ends the game, next stage) for each way the option can resolve.
+
+    Without a failure branch the engine fails towards the success branch's
+    next stage, without its action (see SimulationEngine._pick_failure).
+    """
+    success = (option.success.action == "end", option.success.next_stage)
+    if option.failure is None:
+        return success, (False, option.success.next_stage)
+    return success, (option.failure.action == "end", option.failure.next_stage)
+
+
+def _components(order: List[str], successors: Dict[str, Tuple[str, ...]]) -> List[List[str]]:
+    """Strongly connected components, sources first (Kosaraju, iterative for long chains)."""
+    finished: List[str] = []
+    seen = set()
+    for root in order:
+        if root in seen:
+            continue
+        seen.add(root)
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child not in seen:
+                    seen.add(child)
+                    stack.append((child, iter(successors[child])))
+                    break
+            else:
+                stack.pop()
+                finished.append(node)
+
+    predecessors: Dict[str, List[str]] = {stage_id: [] for stage_id in order}
+    for stage_id, next_stages in successors.items():
+        for next_stage in next_stages:
+            predecessors[next_stage].append(stage_id)
+    components = []
+    assigned = set()
+    for root in reversed(finished):
+        if root in assigned:
+            continue
+        assigned.add(root)
+        component = []
+        todo = [root]
+        while todo:
+            node = todo.pop()
+            component.append(node)
+            for previous in predecessors[node]:
+                if previous not in assigned:
+                    assigned.add(previous)
+                    todo.append(previous)
+        components.append(component)
+    return components
+
+
+def _fewest(values: Iterable[Optional[int]]) -> Optional[int]:
+    known = [value for value in values if value is not None]
+    return min(known) if known else None
+
+
+def _most(values: Iterable[Optional[int]]) -> Optional[int]:
+    values = list(values)
+    return None if None in values else max(values)
+
+
+def _stage_rounds(
+    stage: Stage,
+    entry: Dict[str, Tuple[Optional[int], ...]],
+    combine: Callable[[Iterable[Optional[int]]], Optional[int]],
+    unbounded: Iterable[str] = (),
+) -> Tuple[Optional[int], ...]:
+    """Rounds left at each challenge of a stage, given them at the start of its successors.
+
+    Stages missing from ``entry``, or listed in ``unbounded``, count as None.
+    """
+    unbounded = set(unbounded)
+    rounds: List[Optional[int]] = [None] * len(stage.challenges)
+    later: Optional[int] = None
+    for index in range(len(stage.challenges) - 1, -1, -1):
+        last = index == len(stage.challenges) - 1
+        values = []
+        for option in stage.challenges[index].options:
+            for ends, next_stage in _branches(option):
+                if ends or (last and next_stage is None):
+                    then: Optional[int] = 0
+                elif not last:
+                    then = later
+                elif next_stage in unbounded or next_stage not in entry:
+                    then = None
+                else:
+                    then = entry[next_stage][0]
+                values.append(None if then is None else then + 1)
+        rounds[index] = later = combine(values)
+    return tuple(rounds)
+
+
+def _build_challenge(payload: Dict, option_index: Iterator[int]) -> Challenge:
     return Challenge(
         id=payload["id"],
         title=payload["title"],
         prompt=payload["prompt"],
-        options=[
+        options=tuple(
             Option(
                 id=option_payload["id"],
                 label=option_payload["label"],
@@ -98,19 +421,20 @@ def _build_challenge(payload: Dict) -> Challenge:
                 failure=_build_outcome(option_payload.get("failure")) if option_payload.get("failure") else None,
                 difficulty=option_payload.get("difficulty", 100),
                 skill=option_payload.get("skill", "analysis"),
+                index=next(option_index),
             )
             for option_payload in payload["options"]
-        ],
+        ),
     )
 
 
-def _build_injection(payload: Dict) -> Injection:
+def _build_injection(payload: Dict, option_index: Iterator[int]) -> Injection:
     return Injection(
         id=payload["id"],
         title=payload["title"],
         prompt=payload["prompt"],
         weight=payload.get("weight", 5),
-        options=[
+        options=tuple(
             Option(
                 id=option_payload["id"],
                 label=option_payload["label"],
@@ -119,9 +443,10 @@ def _build_injection(payload: Dict) -> Injection:
                 failure=_build_outcome(option_payload.get("failure")) if option_payload.get("failure") else None,
                 difficulty=option_payload.get("difficulty", 50),
                 skill=option_payload.get("skill", "analysis"),
+                index=next(option_index),
             )
             for option_payload in payload["options"]
-        ],
+        ),
     )
 
 
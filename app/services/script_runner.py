@@ -0,0 +1,142 @@
+"""Play scripted games from a stream of JSONL decision scripts.
+
+Each script line names a scenario, a team, a seed and the option ids to play:
+
+    {"id": "run-1", "scenario_id": "cloud-ransom", "team": ["intel-analyst"], "seed": 7, "options": ["a", "b"]}
+
+Team entries are roster ids or member names. Options are applied in order
+and must be offered by the challenge presented at that point, injections
+included. Given the seed, the injections a script meets are deterministic,
+the same way a replay works. A game stops when it finishes, when the script
+runs out, or at the first option that is not offered.
+
+Every script yields one result dict. Errors are reported on the result and
+do not stop the stream. Lines are read lazily and at most a few games are in
+flight per worker, so memory stays flat however many scripts are piped
+through.
+"""
+from __future__ import annotations
+
+import json
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.content_library import ContentLibrary
+from app.services.simulation import SimulationEngine
+from app.services.team_loader import raw_members
+
+# Scripts queued per worker process, so the pool never starves or buffers the input.
+IN_FLIGHT_PER_WORKER = 4
+
+
+class ScriptRunner:
+    """Plays scripts against one content library; each worker process owns one."""
+
+    def __init__(self, library: Optional[ContentLibrary] = None) -> None:
+        self.library = library or ContentLibrary()
+        self.members = raw_members()
+
+    def run_line(self, number: int, line: str) -> Dict:
+        try:
+            script = json.loads(line)
+            if not isinstance(script, dict):
+                raise ValueError("A script must be a JSON object")
+        except ValueError as exc:
+            return {"line": number, "error": f"Invalid script: {exc}"}
+        try:
+            return {"line": number, **self.run(script)}
+        except ValueError as exc:
+            return {"line": number, "id": script.get("id"), "error": str(exc)}
+
+    def run(self, script: Dict) -> Dict:
+        """Play one script; raises ValueError when it cannot be started."""
+        scenario = self.library.scenario(str(script.get("scenario_id")))
+        if scenario is None:
+            raise ValueError(f"Scenario {script.get('scenario_id')!r} not found")
+        team = []
+        for key in _strings(script, "team"):
+            member = self.members.get(key)
+            if member is None:
+                raise ValueError(f"Unknown team member {key!r}")
+            team.append(member)
+        cost = sum(int(member.get("cost", 50)) for member in team)
+        if cost > settings.team_budget:
+            raise ValueError(f"Team over budget: {cost} > {settings.team_budget}")
+
+        seed = script.get("seed")
+        if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+            raise ValueError(f"Seed must be an integer, not {seed!r}")
+
+        engine = SimulationEngine(scenario, team, seed=seed)
+        result = {"finished": False}
+        error = None
+        for option_id in _strings(script, "options"):
+            stage_id, _ = engine.location()
+            try:
+                result = engine.apply_option(option_id)
+            except ValueError:
+                error = f"Option {option_id!r} is not offered at {stage_id}"
+                break
+            if result["finished"]:
+                break
+        state = engine.state
+        return {
+            "id": script.get("id"),
+            "scenario_id": scenario.id,
+            "seed": engine.seed,
+            "finished": result["finished"],
+            "fired": state.budget <= 0 or state.reputation <= 0,
+            "rounds": engine.round,
+            "budget": state.budget,
+            "reputation": state.reputation,
+            "risk": state.risk,
+            "events": engine.events,
+            **({"error": error} if error else {}),
+        }
+
+
+def _strings(script: Dict, field: str) -> List[str]:
+    values = script.get(field, [])
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError(f"{field} must be a list of strings, not {values!r}")
+    return values
+
+
+_runner: Optional[ScriptRunner] = None
+
+
+def _init_worker() -> None:
+    global _runner
+    _runner = ScriptRunner()
+
+
+def _run_worker_line(item: Tuple[int, str]) -> Dict:
+    return _runner.run_line(*item)
+
+
+def run_scripts(lines: Iterable[str], workers: int = 1) -> Iterator[Dict]:
+    """Results of every non-blank script line, each as soon as its game finishes.
+
+    With one worker, results come in input order; with more, in completion order,
+    so use ``line`` to match results to scripts.
+    """
+    numbered = ((number, line) for number, line in enumerate(lines, start=1) if line.strip())
+    if workers <= 1:
+        runner = ScriptRunner()
+        for number, line in numbered:
+            yield runner.run_line(number, line)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        for item in numbered:
+            pending.add(pool.submit(_run_worker_line, item))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
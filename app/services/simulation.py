@@ -1,27 +1,80 @@
 from __future__ import annotations
 
+import copy
 import random
-from dataclasses import asdict
-from typing import Dict, Optional
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, List, Optional, Tuple
 
 from app.config import settings
 from app.domain.models import (
-    Challenge,
+    SKILLS,
     Character,
+    Injection,
     Option,
     PlayerState,
     Scenario,
     StatBlock,
     Team,
 )
+from app.services import audit_log, metrics
+
+DECISIONS = metrics.registry.counter(
+    "ciso_decisions_total", "Options applied, by scenario and result.", ("scenario", "result")
+)
+FIRINGS = metrics.registry.counter(
+    "ciso_firings_total", "Games lost by running out of budget or reputation.", ("scenario", "reason")
+)
+INJECTIONS_FIRED = metrics.registry.counter(
+    "ciso_injections_fired_total", "Injections surfaced mid-game.", ("scenario",)
+)
+ACTIONS = metrics.registry.counter(
+    "ciso_actions_total", "Special outcome actions executed.", ("action",)
+)
+
+# PlayerState fields sent whole in state deltas; history is sent as appended entries.
+STATE_FIELDS = tuple(f.name for f in fields(PlayerState) if f.name != "history")
+
+
+def apply_state_delta(state: Dict, delta: Dict) -> Dict:
+    """Bring a client copy of the state (``state_snapshot()`` output) up to ``delta``'s version."""
+    if delta["since"] != state["version"]:
+        raise ValueError(f"Delta since version {delta['since']} does not apply to version {state['version']}")
+    state.update(delta["changes"])
+    state["history"].extend(delta["history"])
+    state["version"] = delta["version"]
+    return state
+
+
+def success_chance(stat_total: int, difficulty: int) -> float:
+    """Probability that a team with ``stat_total`` in the option's skill succeeds."""
+    base = 0.5
+    delta = (stat_total - difficulty) / 200
+    return min(0.95, max(0.05, base + delta))
 
 
 class SimulationEngine:
-    """Mutable simulation runtime."""
+    """Mutable simulation runtime.
 
-    def __init__(self, scenario: Scenario, team_members: list[dict]) -> None:
+    Every game draws from its own RNG, seeded at creation, and records each
+    decision in an append-only event log. Given the seed, the team and the
+    log, a game can be replayed exactly. A snapshot is kept every
+    ``settings.checkpoint_interval`` decisions so ``seek`` only has to replay
+    the last few.
+    """
+
+    def __init__(
+        self, scenario: Scenario, team_members: list[dict], seed: Optional[int] = None
+    ) -> None:
         self.scenario = scenario
+        self.seed = secrets.randbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
         self.team = self._build_team(team_members)
+        self.initial_members = tuple(self.team.members)
         self.state = PlayerState(
             budget=settings.default_budget,
             reputation=settings.base_reputation,
@@ -34,35 +87,200 @@ class SimulationEngine:
         )
         self.round = 0
         self.pending_injections = list(scenario.injections)
-        self.active_injection: Optional[Challenge] = None
+        self.active_injection: Optional[Injection] = None
+        # Success chance per option, indexed by Option.index; depends only on the team.
+        self.chances = self._chance_table()
+        self.events: List[Dict] = []
+        # Replays re-apply decisions that were already counted once.
+        self.metered = True
+        # Set by the registry; only decisions in sessions go to the audit log.
+        self.session_id: Optional[str] = None
+        # Snapshots keyed by the number of events applied when they were taken.
+        # History is left out; a checkpoint at n events has the first n entries of the live history.
+        self.checkpoints: Dict[int, Dict] = {0: self._checkpoint()}
+
+    def journal(self) -> Dict:
+        """Seed, team and decision log: everything ``replay`` needs."""
+        return {
+            "scenario_id": self.scenario.id,
+            "scenario_version": self.scenario.version,
+            "seed": self.seed,
+            "team": [asdict(member) for member in self.initial_members],
+            "events": list(self.events),
+        }
+
+    @classmethod
+    def replay(cls, scenario: Scenario, journal: Dict) -> "SimulationEngine":
+        """Rebuild a game from ``journal()`` output by re-applying its decisions."""
+        engine = cls(scenario, journal["team"], seed=journal["seed"])
+        engine.metered = False
+        for event in journal["events"]:
+            engine.apply_option(event["option_id"])
+        engine.metered = True
+        return engine
+
+    def seek(self, round_number: int) -> "SimulationEngine":
+        """Return a separate copy of this game as it stood after ``round_number`` decisions."""
+        if not 0 <= round_number <= len(self.events):
+            raise ValueError(f"Round {round_number} is outside 0..{len(self.events)}")
+        base = max(count for count in self.checkpoints if count <= round_number)
+        engine = self.restore(self.scenario, self.checkpoints[base])
+        engine.state.history = self.state.history[:base]
+        engine.metered = False
+        engine.seed = self.seed
+        engine.events = self.events[:base]
+        engine.checkpoints = {k: v for k, v in self.checkpoints.items() if k <= base}
+        for event in self.events[base:round_number]:
+            engine.apply_option(event["option_id"])
+        return engine
+
+    def snapshot(self, history: bool = True) -> Dict:
+        """Plain-data copy of the game state at this point, RNG included.
+
+        With ``history=False`` the state's history is left empty.
+        """
+        injections = self.scenario.injections
+        pending = {id(inj) for inj in self.pending_injections}
+        return {
+            "scenario_id": self.scenario.id,
+            "scenario_version": self.scenario.version,
+            "members": [asdict(member) for member in self.team.members],
+            "initial_members": [asdict(member) for member in self.initial_members],
+            "team_score": self.team.team_score,
+            "state": asdict(self.state) if history else _without_history(self.state),
+            "round": self.round,
+            "pending_injections": [i for i, inj in enumerate(injections) if id(inj) in pending],
+            "active_injection": next(
+                (i for i, inj in enumerate(injections) if inj is self.active_injection), None
+            ),
+            "rng_state": self.rng.getstate(),
+        }
+
+    def _checkpoint(self) -> Dict:
+        """``snapshot()`` without history, its RNG words packed into an array (a tenth of the tuple's size)."""
+        checkpoint = self.snapshot(history=False)
+        version, internal, gauss_next = checkpoint["rng_state"]
+        checkpoint["rng_state"] = (version, array("I", internal), gauss_next)
+        return checkpoint
+
+    @classmethod
+    def restore(cls, scenario: Scenario, snapshot: Dict) -> "SimulationEngine":
+        """Rebuild an engine from ``snapshot()`` output against the same scenario version.
+
+        The result carries no event log or checkpoints of its own.
+        """
+        engine = cls.__new__(cls)
+        engine.scenario = scenario
+        engine.seed = None
+        engine.rng = random.Random()
+        version, internal, gauss_next = snapshot["rng_state"]
+        engine.rng.setstate((version, tuple(internal), gauss_next))
+        engine.events = []
+        engine.metered = True
+        engine.session_id = None
+        engine.checkpoints = {}
+        engine.team = engine._build_team(snapshot["members"])
+        engine.team.team_score = snapshot["team_score"]
+        engine.initial_members = tuple(engine._build_team(snapshot["initial_members"]).members)
+        # The snapshot may be a stored checkpoint; never let the engine mutate it.
+        engine.state = PlayerState(**copy.deepcopy(snapshot["state"]))
+        engine.round = snapshot["round"]
+        engine.pending_injections = [scenario.injections[i] for i in snapshot["pending_injections"]]
+        active = snapshot["active_injection"]
+        engine.active_injection = scenario.injections[active] if active is not None else None
+        engine.chances = engine._chance_table()
+        return engine
 
     def current_presentable(self):
         """Return the current stage or an active injection as a stage-like payload."""
         if self.active_injection:
             challenge = self.active_injection
-            self._annotate_probabilities([challenge])
             return {
                 "id": f"injection-{challenge.id}",
                 "title": f"Injection: {challenge.title}",
                 "summary": "Unplanned event disrupts your plan.",
                 "challenges": [challenge],
+                "probabilities": self._probabilities(challenge),
                 "is_injection": True,
             }
         stage = self.scenario.stages[self.state.current_stage]
         challenge = stage.challenges[self.state.current_challenge_index]
-        self._annotate_probabilities([challenge])
         return {
             "id": stage.id,
             "title": stage.title,
             "summary": stage.summary,
             "challenges": [challenge],
+            "probabilities": self._probabilities(challenge),
             "is_injection": False,
         }
+
+    def state_fields(self) -> Dict:
+        """Current value of every state field except history."""
+        return {name: getattr(self.state, name) for name in STATE_FIELDS}
+
+    def state_snapshot(self) -> Dict:
+        """The whole state at its current version, for clients starting or resyncing.
+
+        The version is the number of decisions applied, which is also the length of history.
+        """
+        return {"version": self.round, **self.state_fields(), "history": list(self.state.history)}
+
+    def state_delta(self, since: int, previous: Optional[Dict] = None) -> Dict:
+        """Fields changed and history appended since version ``since``.
+
+        ``previous`` holds the fields as they were at ``since``; without it every field is sent.
+        """
+        if not 0 <= since <= self.round:
+            raise ValueError(f"State version {since} is outside 0..{self.round}")
+        current = self.state_fields()
+        if previous is not None:
+            current = {name: value for name, value in current.items() if previous[name] != value}
+        return {
+            "version": self.round,
+            "since": since,
+            "changes": current,
+            "history": self.state.history[since:],
+        }
+
+    def location(self) -> Tuple[str, int]:
+        """Id of the stage or injection being presented, and its challenge index."""
+        if self.active_injection:
+            return f"injection-{self.active_injection.id}", 0
+        return self.state.current_stage, self.state.current_challenge_index
+
+    def rounds_remaining(self) -> Dict[str, int]:
+        """Fewest and most decisions left, from the scenario graph and the round cap.
+
+        An injection being presented counts; injections yet to fire and firing do not.
+        """
+        injection = 1 if self.active_injection else 0
+        cap = max(1, settings.max_rounds - self.round - injection)
+        low, high = self.scenario.graph.rounds_left(self.state.current_stage, self.state.current_challenge_index)
+        return {
+            "min": (cap if low is None else min(low, cap)) + injection,
+            "max": (cap if high is None else min(high, cap)) + injection,
+        }
+
+    def presentable_key(self) -> tuple:
+        """Everything ``current_presentable()`` depends on; equal keys render the same."""
+        totals = self.team.team_totals
+        return (
+            self.scenario.id,
+            self.scenario.version,
+            *self.location(),
+            totals.get("analysis"),
+            totals.get("comms"),
+            totals.get("engineering"),
+            totals.get("leadership"),
+            self.team.team_score,
+        )
+
     # apply the option and return the outcome
     def apply_option(self, option_id: str) -> Dict:
         presentable = self.current_presentable()
         option = self._find_option(presentable, option_id)
-        success = self._resolve_success(option)
+        previous = self.state_fields()
+        success, odds, roll = self._resolve_success(option)
         outcome = option.success if success else self._pick_failure(option)
         self.round += 1
 
@@ -97,12 +315,15 @@ class SimulationEngine:
 
         # If budget or reputation fall to zero or below, the CISO is fired — immediate game over.
         firing_message = None
+        firing_reason = None
         if self.state.budget <= 0:
+            firing_reason = "budget"
             firing_message = (
                 "Your budget has been exhausted. The board has lost confidence and you have been fired for mismanagement."
             )
             finished = True
         elif self.state.reputation <= 0:
+            firing_reason = "reputation"
             firing_message = (
                 "Your organization's reputation has collapsed. The board holds leadership accountable — you have been fired for mismanagement."
             )
@@ -122,25 +343,63 @@ class SimulationEngine:
                 # Advance within the current stage; defer stage transition until the last challenge.
                 self.state.current_challenge_index += 1
 
+        injected = False
         # Randomly surface an injection if available and none active (weighted by injection weight, risk-aware trigger).
         if not presentable.get("is_injection") and self.pending_injections:
             chance = settings.injection_base_chance + (
                 self.state.risk * settings.injection_risk_factor
             )
             chance = min(chance, settings.injection_max_chance)
-            if random.random() < chance:
+            if self.rng.random() < chance:
                 weights = [inj.weight for inj in self.pending_injections]
-                chosen = random.choices(self.pending_injections, weights=weights, k=1)[0]
+                chosen = self.rng.choices(self.pending_injections, weights=weights, k=1)[0]
                 self.pending_injections.remove(chosen)
                 self.active_injection = chosen
+                injected = True
 
         if not presentable.get("is_injection"):
             finished = finished or self.round >= settings.max_rounds
 
+        self.events.append({"option_id": option.id, "success": success})
+        if len(self.events) % settings.checkpoint_interval == 0:
+            self.checkpoints[len(self.events)] = self._checkpoint()
+
+        if self.metered:
+            scenario_id = self.scenario.id
+            DECISIONS.inc((scenario_id, "success" if success else "failure"))
+            if firing_reason is not None:
+                FIRINGS.inc((scenario_id, firing_reason))
+            if injected:
+                INJECTIONS_FIRED.inc((scenario_id,))
+            if outcome.action:
+                ACTIONS.inc((outcome.action,))
+
         outcome_text = firing_message if firing_message is not None else outcome.description
+        if self.metered and self.session_id is not None and audit_log.sink.enabled:
+            state = self.state_fields()
+            audit_log.sink.record(
+                {
+                    "ts": time.time(),
+                    "session_id": self.session_id,
+                    "scenario_id": self.scenario.id,
+                    "scenario_version": self.scenario.version,
+                    "round": self.round,
+                    "stage": presentable["id"],
+                    "option_id": option.id,
+                    "success": success,
+                    "chance": odds,
+                    "roll": roll,
+                    "deltas": {metric: state[metric] - previous[metric] for metric in ("budget", "reputation", "risk")},
+                    "action": outcome.action,
+                    "outcome": outcome_text,
+                    "finished": finished,
+                    "state": state,
+                }
+            )
         return {
-            "state": asdict(self.state),
+            "state": self.state_delta(self.round - 1, previous),
             "round": self.round,
+            "rounds_remaining": {"min": 0, "max": 0} if finished else self.rounds_remaining(),
             "finished": finished,
             "outcome": outcome_text,
             "success": success,
@@ -153,7 +412,7 @@ class SimulationEngine:
             if self.team.members:
                 removed = self.team.members.pop(0)
                 self.state.team_size = len(self.team.members)
-                self._recalculate_team_stats()
+                self._recalculate_team_stats(removed)
         elif action == "reset-team":
             # Reset all team members' mental state (could represent stress recovery)
             # In future, could tie to team morale or stress metrics
@@ -161,9 +420,11 @@ class SimulationEngine:
         elif action == "boost-morale":
             # Improve team morale/cohesion
             self.team.team_score = min(100, self.team.team_score + 10)
+            self.chances = self._chance_table()
         elif action == "damage-morale":
             # Reduce team morale/cohesion
             self.team.team_score = max(0, self.team.team_score - 10)
+            self.chances = self._chance_table()
         elif action == "double-budget":
             # Grant emergency budget
             self.state.budget += settings.default_budget // 2
@@ -171,52 +432,63 @@ class SimulationEngine:
             # Emergency expenditure
             self.state.budget = max(0, self.state.budget - settings.default_budget // 2)
 
-    def _recalculate_team_stats(self) -> None:
-        """Recalculate team totals after team composition changes."""
-        totals = {
-            "analysis": sum(m.stats.analysis for m in self.team.members) if self.team.members else 0,
-            "comms": sum(m.stats.comms for m in self.team.members) if self.team.members else 0,
-            "engineering": sum(m.stats.engineering for m in self.team.members) if self.team.members else 0,
-            "leadership": sum(m.stats.leadership for m in self.team.members) if self.team.members else 0,
-        }
+    def _recalculate_team_stats(self, removed: Optional[Character] = None) -> None:
+        """Recalculate team totals after team composition changes.
+
+        With ``removed``, its stats are subtracted from the current totals
+        instead of summing the remaining members again.
+        """
+        if removed is not None:
+            totals = {skill: self.team.team_totals[skill] - getattr(removed.stats, skill) for skill in SKILLS}
+        else:
+            totals = _skill_totals(self.team.members)
+        # A new dict, never mutated in place: state deltas compare against the previous one.
         self.team.team_totals = totals
         self.state.team_totals = totals
         self.team.team_score = int(sum(totals.values()) / (4 * max(1, len(self.team.members))))
         self.state.team_score = self.team.team_score
+        self.chances = self._chance_table()
 
     def _find_option(self, presentable, option_id: str) -> Option:
         for challenge in presentable["challenges"]:
-            for option in challenge.options:
-                if option.id == option_id:
-                    return option
+            option = challenge.options_by_id.get(option_id)
+            if option is not None:
+                return option
         raise ValueError(f"Option {option_id} not found in stage {presentable['id']}")
 
-    def _resolve_success(self, option: Option) -> bool:
+    def _resolve_success(self, option: Option) -> Tuple[bool, float, float]:
+        """Whether the option succeeds, with the chance and the roll that decided it."""
         chance = self._compute_chance(option)
-        return random.random() < chance
+        roll = self.rng.random()
+        return roll < chance, chance, roll
 
-    def _pick_failure(self, option: Option):
+    @staticmethod
+    def _pick_failure(option: Option):
         if option.failure:
             return option.failure
         # derive a default failure if not provided
         return type(option.success)(
             description=f"Failed: {option.success.description}",
-            budget_delta=int(-abs(option.success.budget_delta) or -2),
-            reputation_delta=int(-abs(option.success.reputation_delta) or -2),
-            risk_delta=abs(option.success.risk_delta) + 2,
+            budget_delta=int(-abs(option.success.budget_delta or 0) or -2),
+            reputation_delta=int(-abs(option.success.reputation_delta or 0) or -2),
+            risk_delta=abs(option.success.risk_delta or 0) + 2,
             next_stage=option.success.next_stage,
         )
 
     def _compute_chance(self, option: Option) -> float:
-        stat_total = self.team.team_totals.get(option.skill, self.team.team_score)
-        base = 0.5
-        delta = (stat_total - option.difficulty) / 200
-        return min(0.95, max(0.05, base + delta))
+        return self.chances[option.index]
 
-    def _annotate_probabilities(self, challenges):
-        for challenge in challenges:
-            for opt in challenge.options:
-                opt.probability = round(self._compute_chance(opt) * 100)
+    def _chance_table(self) -> list[float]:
+        totals = self.team.team_totals
+        score = self.team.team_score
+        return [
+            success_chance(totals.get(option.skill, score), option.difficulty)
+            for option in self.scenario.options
+        ]
+
+    def _probabilities(self, challenge) -> Dict[str, int]:
+        """Success chance of each option as a whole percentage, for display."""
+        return {option.id: round(self.chances[option.index] * 100) for option in challenge.options}
 
     def _build_team(self, raw_members: list[dict]) -> Team:
         members: list[Character] = []
@@ -236,12 +508,7 @@ class SimulationEngine:
                 )
             )
         # Compute team totals and aggregate score.
-        totals = {
-            "analysis": sum(m.stats.analysis for m in members) if members else 0,
-            "comms": sum(m.stats.comms for m in members) if members else 0,
-            "engineering": sum(m.stats.engineering for m in members) if members else 0,
-            "leadership": sum(m.stats.leadership for m in members) if members else 0,
-        }
+        totals = _skill_totals(members)
         team_score = int(sum(totals.values()) / (4 * max(1, len(members))))
         team = Team(members=members)
         team.team_totals = totals  # type: ignore[attr-defined]
@@ -249,20 +516,194 @@ class SimulationEngine:
         return team
 
 
+def _skill_totals(members: List[Character]) -> Dict[str, int]:
+    """Per-skill sums of the members' stats, one column at a time."""
+    columns = zip(*((m.stats.analysis, m.stats.comms, m.stats.engineering, m.stats.leadership) for m in members))
+    return {**dict.fromkeys(SKILLS, 0), **dict(zip(SKILLS, map(sum, columns)))}
+
+
+def _without_history(state: PlayerState) -> Dict:
+    return {**copy.deepcopy({name: getattr(state, name) for name in STATE_FIELDS}), "history": []}
+
+
+# Rough heap cost of an engine, of one history entry and of one checkpoint,
+# measured with tracemalloc; strings shared with the scenario are not counted.
+ENGINE_BYTES = 2048
+HISTORY_ENTRY_BYTES = 280
+CHECKPOINT_BYTES = 6144
+
+
+@dataclass(slots=True)
+class _Session:
+    engine: SimulationEngine
+    last_used: float
+    footprint: int
+
+
+def _footprint(engine: SimulationEngine) -> int:
+    return (
+        ENGINE_BYTES
+        + HISTORY_ENTRY_BYTES * len(engine.state.history)
+        + CHECKPOINT_BYTES * len(engine.checkpoints)
+    )
+
+
 class SimulationRegistry:
-    """In-memory store for active games (swap with DB/cache later)."""
+    """In-memory store for active games, bounded by idle TTL and size caps.
+
+    Games are kept in least-recently-used order, so expiry and eviction only
+    ever look at the front of the map. Expired games are dropped on access
+    and by a background sweeper; the least recently used games are evicted
+    whenever a new game would exceed ``max_sessions`` or ``max_bytes``.
+    See ``create_registry`` for the configurable backends.
+    """
 
-    def __init__(self) -> None:
-        self._games: Dict[str, SimulationEngine] = {}
+    def __init__(
+        self,
+        idle_ttl: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.idle_ttl = settings.session_idle_ttl if idle_ttl is None else idle_ttl
+        self.max_sessions = settings.max_sessions if max_sessions is None else max_sessions
+        self.max_bytes = settings.max_session_bytes if max_bytes is None else max_bytes
+        self._clock = clock
+        self._games: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._expired = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        # Called with the id of every game expired or evicted (not deleted), under
+        # the registry lock; it must be quick and must not call back into the registry.
+        self.on_discard: Optional[Callable[[str], None]] = None
 
-    def create(self, game_id: str, scenario: Scenario, team_members: list[dict]) -> SimulationEngine:
-        engine = SimulationEngine(scenario, team_members)
-        self._games[game_id] = engine
+    def create(
+        self,
+        game_id: str,
+        scenario: Scenario,
+        team_members: list[dict],
+        seed: Optional[int] = None,
+    ) -> SimulationEngine:
+        engine = SimulationEngine(scenario, team_members, seed=seed)
+        engine.session_id = game_id
+        with self._lock:
+            self._pop(game_id)
+            self._expire(self._clock())
+            self._make_room(ENGINE_BYTES)
+            footprint = _footprint(engine)
+            self._games[game_id] = _Session(engine, self._clock(), footprint)
+            self._bytes += footprint
         return engine
 
     def get(self, game_id: str) -> Optional[SimulationEngine]:
-        return self._games.get(game_id)
+        with self._lock:
+            session = self._games.get(game_id)
+            if session is None:
+                return None
+            now = self._clock()
+            if self.idle_ttl and now - session.last_used > self.idle_ttl:
+                self._discard(game_id)
+                self._expired += 1
+                return None
+            session.last_used = now
+            self._games.move_to_end(game_id)
+            return session.engine
+
+    def save(self, game_id: str, engine: SimulationEngine) -> None:
+        """Record that ``engine`` changed so its footprint stays current."""
+        with self._lock:
+            session = self._games.get(game_id)
+            if session is None:
+                return
+            footprint = _footprint(engine)
+            self._bytes += footprint - session.footprint
+            session.footprint = footprint
+            session.last_used = self._clock()
+            self._games.move_to_end(game_id)
 
     def delete(self, game_id: str) -> None:
-        self._games.pop(game_id, None)
+        with self._lock:
+            self._pop(game_id)
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def stats(self) -> Dict[str, int]:
+        """Current footprint and eviction counters, for sizing the host."""
+        with self._lock:
+            return {
+                "sessions": len(self._games),
+                "bytes": self._bytes,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+    def sweep(self) -> int:
+        """Drop every game idle for longer than the TTL; returns how many."""
+        with self._lock:
+            return self._expire(self._clock())
+
+    def start_sweeper(self) -> None:
+        """Sweep expired games every ``settings.session_sweep_interval`` seconds."""
+        if self._sweeper is not None or not self.idle_ttl:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="registry-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def close(self) -> None:
+        """Release resources held by the backend."""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(settings.session_sweep_interval):
+            self.sweep()
+
+    def _pop(self, game_id: str) -> None:
+        session = self._games.pop(game_id, None)
+        if session is not None:
+            self._bytes -= session.footprint
+
+    def _expire(self, now: float) -> int:
+        if not self.idle_ttl:
+            return 0
+        expired = 0
+        while self._games:
+            game_id, session = next(iter(self._games.items()))
+            if now - session.last_used <= self.idle_ttl:
+                break
+            self._discard(game_id)
+            expired += 1
+        self._expired += expired
+        return expired
+
+    def _make_room(self, incoming: int) -> None:
+        while self._games and (
+            (self.max_sessions and len(self._games) >= self.max_sessions)
+            or (self.max_bytes and self._bytes + incoming > self.max_bytes)
+        ):
+            self._discard(next(iter(self._games)))
+            self._evicted += 1
+
+    def _discard(self, game_id: str) -> None:
+        self._pop(game_id)
+        if self.on_discard is not None:
+            self.on_discard(game_id)
+
+
+def create_registry() -> SimulationRegistry:
+    """Build the registry backend selected by ``settings.registry_backend``."""
+    if settings.registry_backend == "sqlite":
+        from app.services.sqlite_registry import SQLiteSimulationRegistry
+
+        return SQLiteSimulationRegistry(settings.registry_path)
+    if settings.registry_backend != "memory":
+        raise ValueError(f"Unknown registry backend '{settings.registry_backend}'")
+    return SimulationRegistry()
 
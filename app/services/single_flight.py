@@ -0,0 +1,101 @@
+"""Per-key locking, so work on one key never waits on work for another."""
+from __future__ import annotations
+
+import contextlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Generic, Hashable, Iterator, List, TypeVar
+
+V = TypeVar("V")
+
+
+class KeyedLocks:
+    """One lock per key, kept only while some thread holds or waits for it."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, List] = {}  # key -> [lock, holders and waiters]
+
+    @contextlib.contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+
+class SingleFlightCache(Generic[V]):
+    """LRU of expensive results; concurrent misses on one key compute it once.
+
+    ``max_size`` is read on every insert, so a settings change applies without a restart.
+    """
+
+    def __init__(self, max_size: Callable[[], int]) -> None:
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._values: "OrderedDict[Hashable, V]" = OrderedDict()
+        self._computing = KeyedLocks()
+        self._queued: Dict[Hashable, Future] = {}
+
+    def get(self, key: Hashable, compute: Callable[[], V]) -> V:
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+        with self._computing.hold(key):
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            value = compute()
+            with self._lock:
+                self._values[key] = value
+                while len(self._values) > max(1, self.max_size()):
+                    self._values.popitem(last=False)
+            return value
+
+    def submit(self, executor: Executor, key: Hashable, compute: Callable[[], V]) -> "Future[V]":
+        """Like ``get``, but computed on ``executor``; callers for one key share a future."""
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                future: "Future[V]" = Future()
+                future.set_result(self._values[key])
+                return future
+            future = self._queued.get(key)
+            if future is None:
+                future = self._queued[key] = executor.submit(self._fill, key, compute)
+            return future
+
+    def _fill(self, key: Hashable, compute: Callable[[], V]) -> V:
+        try:
+            return self.get(key, compute)
+        finally:
+            with self._lock:
+                self._queued.pop(key, None)
+
+    def computing(self) -> int:
+        """Keys being computed or waited for right now."""
+        return len(self._computing)
+
+    def pending(self) -> int:
+        """Keys submitted to an executor and not finished yet, queued or running."""
+        with self._lock:
+            return len(self._queued)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._values)
@@ -0,0 +1,514 @@
+"""Exact expected-value solver for scenario graphs.
+
+A scenario, a team and the injection weights form a finite stochastic game.
+``ScenarioSolver`` mirrors ``SimulationEngine.apply_option`` transition by
+transition and evaluates it with a memoized transposition table keyed by the
+full game state. The value of a state is the probability of finishing the game
+without being fired (budget and reputation both above zero) under optimal play.
+
+The search stays exact but skips most of the raw state space:
+
+* budget and reputation are clamped once nothing left in the game can move
+  them across zero, and risk is dropped once no further injection matters;
+* states whose outcome no longer depends on play are valued directly;
+* certain wins are found first by a search that ignores probabilities (and so
+  risk) entirely, since every roll in the game can go either way;
+* an option's failure branch is skipped when it cannot beat the best so far.
+
+Some settings still make the state space explode, so a solve gives up past
+``solver_max_states`` states and advice falls back to success chances alone.
+Solves run on a background pool; ``advise`` returns None while one is going.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.domain.models import SKILLS, Character, Option, Outcome, Scenario
+from app.services.simulation import SimulationEngine, success_chance
+from app.services.single_flight import SingleFlightCache
+
+# (stage, challenge index, active injection, budget, reputation, risk,
+#  pending injection bitmask, round, removed members, team score)
+StateKey = Tuple[str, int, int, int, int, int, int, int, int, int]
+
+# (budget loss, reputation loss, reputation gain) over some stretch of play.
+Swing = Tuple[int, int, int]
+
+# Settings the game's values depend on; solved tables are cached per combination.
+SOLVER_SETTINGS = (
+    "max_rounds",
+    "default_budget",
+    "base_reputation",
+    "injection_base_chance",
+    "injection_risk_factor",
+    "injection_max_chance",
+)
+
+
+class _TooLarge(Exception):
+    """The game has more states than the solver is allowed to hold."""
+
+
+def _outcomes(option: Option) -> Tuple[Outcome, Outcome]:
+    return option.success, SimulationEngine._pick_failure(option)
+
+
+def _swing(options: Sequence[Option]) -> Swing:
+    """Worst single-step swing over every outcome of ``options``, upkeep excluded."""
+    budget_loss = reputation_loss = reputation_gain = 0
+    for option in options:
+        for outcome in _outcomes(option):
+            loss = max(0, -(outcome.budget_delta or 0))
+            if outcome.action == "burn-budget":
+                loss += settings.default_budget // 2
+            budget_loss = max(budget_loss, loss)
+            reputation_loss = max(reputation_loss, -(outcome.reputation_delta or 0))
+            reputation_gain = max(reputation_gain, outcome.reputation_delta or 0)
+    return budget_loss, reputation_loss, reputation_gain
+
+
+class ScenarioSolver:
+    """Optimal policy and per-option survival probabilities for one scenario and team."""
+
+    def __init__(self, scenario: Scenario, members: Sequence[Character]) -> None:
+        self.scenario = scenario
+        self.members = tuple(members)
+        self.injections = tuple(scenario.injections)
+        self.max_states = settings.solver_max_states
+        self.exhausted = False  # gave up past max_states; the tables are dropped
+        # The tables are filled lazily, and _chain marks entries in progress.
+        self._lock = threading.RLock()
+        self.table: Dict[StateKey, float] = {}
+        self._sure: Dict[StateKey, bool] = {}
+        self._option_table: Dict[StateKey, Dict[str, float]] = {}
+        self._teams: Dict[int, Dict[str, int]] = {}
+        self._chains: Dict[Tuple[str, int], Tuple[int, Swing]] = {}
+        self._positions: Dict[tuple, Tuple[int, Swing]] = {}
+
+        options = [
+            option
+            for stage in scenario.stages.values()
+            for challenge in stage.challenges
+            for option in challenge.options
+        ]
+        options.extend(option for injection in self.injections for option in injection.options)
+        self._step_swing = _swing(options)
+        self._boosts = any(
+            outcome.action == "boost-morale" for option in options for outcome in _outcomes(option)
+        )
+        self._injection_swings = [_swing(injection.options) for injection in self.injections]
+        # Highest team score reachable by removing members, from each removal count.
+        scores = [self._team_score(removed) for removed in range(len(self.members) + 1)]
+        self._score_ceiling = [max(scores[removed:]) for removed in range(len(scores))]
+
+    def initial_key(self) -> StateKey:
+        return self._canonical(
+            (
+                self.scenario.starting_stage,
+                0,
+                -1,
+                settings.default_budget,
+                settings.base_reputation,
+                50,
+                (1 << len(self.injections)) - 1,
+                0,
+                0,
+                self._team_score(0),
+            )
+        )
+
+    def key_for(self, engine: SimulationEngine) -> StateKey:
+        """Transposition-table key of a live engine."""
+        pending_ids = {id(inj) for inj in engine.pending_injections}
+        active = -1
+        pending = 0
+        for i, inj in enumerate(self.injections):
+            if inj is engine.active_injection:
+                active = i
+            if id(inj) in pending_ids:
+                pending |= 1 << i
+        return self._canonical(
+            (
+                engine.state.current_stage,
+                engine.state.current_challenge_index,
+                active,
+                engine.state.budget,
+                engine.state.reputation,
+                engine.state.risk,
+                pending,
+                engine.round,
+                len(self.members) - len(engine.team.members),
+                engine.team.team_score,
+            )
+        )
+
+    def solve(self) -> Optional[float]:
+        """Fill the table for every state reachable from the start; returns its value.
+
+        Returns None, and marks the solver exhausted, if that takes more than ``max_states`` states.
+        """
+        try:
+            return self.value(self.initial_key())
+        except _TooLarge:
+            self.exhausted = True
+            for table in (self.table, self._sure, self._option_table, self._positions, self._chains):
+                table.clear()
+            return None
+
+    def _reserve(self) -> None:
+        if len(self.table) + len(self._sure) >= self.max_states:
+            raise _TooLarge
+
+    def value(self, key: StateKey) -> float:
+        """Survival probability of a canonical state under optimal play."""
+        result = self.table.get(key)
+        if result is None:
+            result = self._settled(key)
+        if result is None:
+            if self._certain(key):
+                result = 1.0
+            else:
+                result = 0.0
+                options = sorted(self._options(key), key=lambda opt: -self._chance(key, opt))
+                for option in options:
+                    result = max(result, self._option_value(key, option, result))
+            self._reserve()
+            self.table[key] = result
+        return result
+
+    def option_values(self, key: StateKey) -> Dict[str, float]:
+        """Survival probability of each option offered in a state.
+
+        Options the optimal policy would not pick may lead into states the
+        solve pruned; those are filled in on first request and then cached.
+        """
+        result = self._option_table.get(key)
+        if result is None:
+            result = {option.id: self._option_value(key, option) for option in self._options(key)}
+            self._option_table[key] = result
+        return result
+
+    def advise(self, engine: SimulationEngine) -> Dict:
+        key = self.key_for(engine)
+        with self._lock:
+            option_values = self.option_values(key)
+            expected = self.value(key)
+        best = max(option_values, key=option_values.get) if option_values else None
+        return {
+            "exact": True,
+            "best_option": best,
+            "expected_survival": _probability(expected),
+            "options": [
+                {"id": option_id, "survival": _probability(survival)}
+                for option_id, survival in option_values.items()
+            ],
+        }
+
+    def _options(self, key: StateKey) -> List[Option]:
+        stage_id, index, active = key[0], key[1], key[2]
+        if active >= 0:
+            return self.injections[active].options
+        return self.scenario.stages[stage_id].challenges[index].options
+
+    def _team_totals(self, removed: int) -> Dict[str, int]:
+        totals = self._teams.get(removed)
+        if totals is None:
+            remaining = self.members[removed:]
+            totals = {skill: sum(getattr(m.stats, skill) for m in remaining) for skill in SKILLS}
+            self._teams[removed] = totals
+        return totals
+
+    def _team_score(self, removed: int) -> int:
+        size = len(self.members) - removed
+        return int(sum(self._team_totals(removed).values()) / (4 * max(1, size)))
+
+    def _chance(self, key: StateKey, option: Option) -> float:
+        removed, team_score = key[8], key[9]
+        stat_total = self._team_totals(removed).get(option.skill, team_score)
+        return success_chance(stat_total, option.difficulty)
+
+    def _chain(self, stage_id: str, index: int) -> Tuple[int, Swing]:
+        """Most challenges left from (stage, index), inclusive, and their worst swing."""
+        cached = self._chains.get((stage_id, index))
+        if cached is not None:
+            return cached
+        # A stage graph with a cycle is only bounded by max_rounds.
+        cap = (settings.max_rounds, tuple(settings.max_rounds * x for x in self._step_swing))
+        self._chains[(stage_id, index)] = cap
+        stage = self.scenario.stages[stage_id]
+        options = stage.challenges[index].options
+        if index < len(stage.challenges) - 1:
+            tails = [self._chain(stage_id, index + 1)]
+        else:
+            targets = {
+                outcome.next_stage
+                for option in options
+                for outcome in _outcomes(option)
+                if outcome.next_stage in self.scenario.stages
+            }
+            tails = [self._chain(target, 0) for target in targets] or [(0, (0, 0, 0))]
+        here = _swing(options)
+        chain = (
+            min(cap[0], 1 + max(count for count, _ in tails)),
+            tuple(
+                min(cap[1][i], here[i] + max(swing[i] for _, swing in tails)) for i in range(3)
+            ),
+        )
+        self._chains[(stage_id, index)] = chain
+        return chain
+
+    def _bounds(self, key: StateKey) -> Tuple[int, Swing]:
+        """Most challenges left, and the worst budget loss, reputation loss and
+        reputation gain the rest of the game can bring.
+        """
+        position = key[:3] + key[6:]
+        cached = self._positions.get(position)
+        if cached is not None:
+            return cached
+        stage_id, index, active, pending, rnd, removed, team_score = position
+        # Every decision advances the round and the first challenge played at
+        # max_rounds ends the game.
+        steps = max(1, settings.max_rounds - rnd + 1)
+        challenges, swing = self._chain(stage_id, index)
+        if challenges > steps - 1:
+            challenges = max(1, steps - 1)
+            swing = tuple(min(x, challenges * y) for x, y in zip(swing, self._step_swing))
+
+        # At most one injection is drawn per challenge, and draws after the
+        # last challenge no longer matter.
+        draws = [i for i in range(len(self.injections)) if pending >> i & 1]
+        if active >= 0:
+            draws.append(active)
+        injections = min(len(draws), challenges - 1 + (active >= 0))
+        budget_loss, reputation_loss, reputation_gain = (
+            total
+            + sum(sorted((self._injection_swings[i][column] for i in draws), reverse=True)[:injections])
+            for column, total in enumerate(swing)
+        )
+
+        score = max(team_score, self._score_ceiling[removed])
+        if self._boosts:
+            score = max(score, min(100, score + 10 * steps))
+        budget_loss += (challenges + injections) * int(score * 0.1)
+        bounds = (challenges, (budget_loss, reputation_loss, reputation_gain))
+        self._positions[position] = bounds
+        return bounds
+
+    def _canonical(self, key: StateKey) -> StateKey:
+        stage_id, index, active, budget, reputation, risk, pending, rnd, removed, team_score = key
+        challenges, (budget_loss, reputation_loss, reputation_gain) = self._bounds(key)
+        budget = min(budget, budget_loss + 1)
+        reputation = max(min(reputation, reputation_loss + 1), -reputation_gain)
+        if not pending or challenges <= 1:
+            risk = 0
+        return (stage_id, index, active, budget, reputation, risk, pending, rnd, removed, team_score)
+
+    def _settled(self, key: StateKey) -> Optional[float]:
+        """Value of a state whose outcome no longer depends on play, else None."""
+        budget, reputation = key[3], key[4]
+        _, (budget_loss, reputation_loss, reputation_gain) = self._bounds(key)
+        if reputation + reputation_gain <= 0:
+            return 0.0
+        if budget > budget_loss and reputation > reputation_loss:
+            return 1.0
+        return None
+
+    def _option_value(self, key: StateKey, option: Option, cutoff: float = -1.0) -> float:
+        """Expected survival of picking ``option``.
+
+        If the success branch alone shows the option cannot beat ``cutoff``, the
+        failure branch is skipped and that upper bound is returned instead.
+        """
+        chance = self._chance(key, option)
+        value = chance * self._outcome_value(key, option.success)
+        if value + (1 - chance) <= cutoff:
+            return value + (1 - chance)
+        failure = SimulationEngine._pick_failure(option)
+        return value + (1 - chance) * self._outcome_value(key, failure)
+
+    def _certain(self, key: StateKey) -> bool:
+        """Whether some line of play survives every roll from this state.
+
+        Success and injection chances are always strictly between 0 and 1, so
+        this only depends on which successors exist, never on risk.
+        """
+        key = key[:5] + (0,) + key[6:]
+        result = self._sure.get(key)
+        if result is None:
+            settled = self._settled(key)
+            if settled is not None:
+                result = settled == 1.0
+            else:
+                result = any(
+                    all(
+                        terminal == 1.0
+                        if terminal is not None
+                        else all(self._certain(successor) for _, successor in branches)
+                        for terminal, branches in map(partial(self._step, key), _outcomes(option))
+                    )
+                    for option in self._options(key)
+                )
+            self._reserve()
+            self._sure[key] = result
+        return result
+
+    def _outcome_value(self, key: StateKey, outcome: Outcome) -> float:
+        terminal, branches = self._step(key, outcome)
+        if terminal is not None:
+            return terminal
+        return sum(share * self.value(successor) for share, successor in branches)
+
+    def _step(
+        self, key: StateKey, outcome: Outcome
+    ) -> Tuple[Optional[float], List[Tuple[float, StateKey]]]:
+        """Apply ``outcome`` the way ``SimulationEngine.apply_option`` does.
+
+        Returns the final value if the game ends, otherwise the possible next
+        states with their probabilities.
+        """
+        stage_id, index, active, budget, reputation, risk, pending, rnd, removed, team_score = key
+        is_injection = active >= 0
+        rnd += 1
+
+        budget += outcome.budget_delta or 0
+        budget -= int(team_score * 0.1)
+        reputation += outcome.reputation_delta or 0
+        if outcome.risk_delta is not None:
+            risk = max(0, min(100, risk + outcome.risk_delta))
+
+        finished = False
+        action = outcome.action
+        if action == "end":
+            finished = True
+        elif action == "remove-member":
+            if removed < len(self.members):
+                removed += 1
+                team_score = self._team_score(removed)
+        elif action == "boost-morale":
+            team_score = min(100, team_score + 10)
+        elif action == "damage-morale":
+            team_score = max(0, team_score - 10)
+        elif action == "double-budget":
+            budget += settings.default_budget // 2
+        elif action == "burn-budget":
+            budget = max(0, budget - settings.default_budget // 2)
+
+        if budget <= 0:
+            finished = True
+
+        if is_injection:
+            active = -1
+        else:
+            stage = self.scenario.stages[stage_id]
+            if index >= len(stage.challenges) - 1:
+                if outcome.next_stage and outcome.next_stage in self.scenario.stages:
+                    stage_id, index = outcome.next_stage, 0
+                else:
+                    finished = True
+            else:
+                index += 1
+            finished = finished or rnd >= settings.max_rounds
+
+        if finished:
+            return (1.0 if budget > 0 and reputation > 0 else 0.0), []
+
+        def successor(active_: int, pending_: int) -> StateKey:
+            return self._canonical(
+                (stage_id, index, active_, budget, reputation, risk, pending_, rnd, removed, team_score)
+            )
+
+        if is_injection or not pending:
+            return None, [(1.0, successor(active, pending))]
+
+        chance = min(
+            settings.injection_base_chance + risk * settings.injection_risk_factor,
+            settings.injection_max_chance,
+        )
+        draws = [i for i in range(len(self.injections)) if pending >> i & 1]
+        total_weight = sum(self.injections[i].weight for i in draws)
+        branches = [(1 - chance, successor(-1, pending))]
+        for i in draws:
+            share = chance * self.injections[i].weight / total_weight
+            branches.append((share, successor(i, pending & ~(1 << i))))
+        return None, branches
+
+
+def _probability(value: float) -> float:
+    # Sums of products can land a rounding error outside [0, 1].
+    return min(1.0, max(0.0, value))
+
+
+_solvers: "SingleFlightCache[ScenarioSolver]" = SingleFlightCache(lambda: settings.solver_cache_size)
+_pool = ThreadPoolExecutor(max_workers=max(1, settings.solver_workers), thread_name_prefix="solver")
+
+
+def team_signature(members: Sequence[Character]) -> tuple:
+    return tuple(
+        (m.name, m.stats.analysis, m.stats.comms, m.stats.engineering, m.stats.leadership)
+        for m in members
+    )
+
+
+def _key(scenario: Scenario, members: Sequence[Character]) -> tuple:
+    return (
+        scenario.id,
+        scenario.version,
+        tuple(getattr(settings, name) for name in SOLVER_SETTINGS),
+        team_signature(members),
+    )
+
+
+def _solve(scenario: Scenario, members: Sequence[Character]) -> ScenarioSolver:
+    solver = ScenarioSolver(scenario, members)
+    with solver._lock:
+        solver.solve()
+    return solver
+
+
+def get_solver(scenario: Scenario, members: Sequence[Character]) -> ScenarioSolver:
+    """Return the precomputed solver for a scenario and team, solving it on first use."""
+    return _solvers.get(_key(scenario, members), partial(_solve, scenario, members))
+
+
+def solve_in_background(scenario: Scenario, members: Sequence[Character]) -> "Future[ScenarioSolver]":
+    """Like ``get_solver``, but a cold solve runs on the solver pool instead of the caller."""
+    return _solvers.submit(_pool, _key(scenario, members), partial(_solve, scenario, members))
+
+
+def stats() -> Dict[str, int]:
+    return {"solvers": len(_solvers), "solving": _solvers.computing(), "pending": _solvers.pending()}
+
+
+def advise(engine: SimulationEngine, wait: Optional[float] = None) -> Optional[Dict]:
+    """Optimal choice and per-option survival probabilities for a live session.
+
+    Waits up to ``wait`` seconds (default ``advice_wait``) for a cold solve and
+    returns None if it is still running.
+    """
+    future = solve_in_background(engine.scenario, engine.initial_members)
+    try:
+        solver = future.result(timeout=settings.advice_wait if wait is None else wait)
+    except TimeoutError:
+        return None
+    if not solver.exhausted:
+        try:
+            return solver.advise(engine)
+        except _TooLarge:
+            pass
+    return _fallback(engine)
+
+
+def _fallback(engine: SimulationEngine) -> Dict:
+    """Options ranked by success chance alone, for games too large to solve."""
+    options = engine.current_presentable()["challenges"][0].options
+    chances = {option.id: engine.chances[option.index] for option in options}
+    return {
+        "exact": False,
+        "best_option": max(chances, key=chances.get) if chances else None,
+        "expected_survival": None,
+        "options": [{"id": option_id, "success": chance} for option_id, chance in chances.items()],
+    }
@@ -0,0 +1,351 @@
+"""SQLite-backed session registry with an in-memory hot tier.
+
+Recently used engines live in an LRU map and are served without touching the
+database. A session is stored as its journal (seed, team and the option ids
+chosen so far) and rebuilt by replaying it. Every change is serialized on the
+caller's thread and queued; a writer thread drains the queue in batches, one
+transaction per batch, keeping only the latest journal of each session. The
+decision path therefore never waits on disk. Sessions evicted from the hot
+tier, or left over from a previous process, are restored from the database on
+their next access.
+
+Scenarios are stored once per (id, version) so a restored session resumes
+against the exact content it started with, even after packs were edited.
+Stored sessions without a decision for ``registry_session_ttl`` seconds are
+deleted by the sweeper.
+
+The hot tier makes the file private to one process: a second server process
+would serve its own stale copies of the same games. Opening a registry takes
+an exclusive lock on ``<path>.lock`` and fails if another process holds it.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.domain.models import Scenario
+from app.services.simulation import SimulationEngine, SimulationRegistry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    snapshot TEXT NOT NULL,
+    updated REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (id, version)
+);
+"""
+
+
+class SQLiteSimulationRegistry(SimulationRegistry):
+    """Durable registry: LRU hot tier in front of a write-behind SQLite file."""
+
+    def __init__(
+        self,
+        path: str,
+        hot_sessions: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        session_ttl: Optional[float] = None,
+    ) -> None:
+        # The hot tier is bounded by hot_sessions alone, not by idle time or bytes.
+        super().__init__(idle_ttl=0, max_sessions=0, max_bytes=0)
+        self._hot: "OrderedDict[str, SimulationEngine]" = OrderedDict()
+        self._hot_sessions = hot_sessions or settings.registry_hot_sessions
+        self._flush_interval = flush_interval or settings.registry_flush_interval
+        self._session_ttl = settings.registry_session_ttl if session_ttl is None else session_ttl
+        # Latest queued snapshot per session; None queues a delete.
+        self._dirty: Dict[str, Optional[str]] = {}
+        # Batch being written right now, still visible to readers until committed.
+        self._inflight: Dict[str, Optional[str]] = {}
+        self._new_scenarios: Dict[Tuple[str, str], Scenario] = {}
+        self._scenarios: Dict[Tuple[str, str], Scenario] = {}
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self._path = path
+        self._lock_file = _lock_exclusively(path)
+        # One reader connection per thread, so cold reads never queue behind each other.
+        self._local = threading.local()
+        self._readers = []
+        self._reader().executescript(SCHEMA)
+        columns = {row[1] for row in self._reader().execute("PRAGMA table_info(sessions)")}
+        if "updated" not in columns:
+            # Files from before idle expiry: their sessions count as used now.
+            with self._reader():
+                self._reader().execute("ALTER TABLE sessions ADD COLUMN updated REAL NOT NULL DEFAULT 0")
+                self._reader().execute("UPDATE sessions SET updated = ?", (time.time(),))
+        # Rows in the sessions table, kept current by the writer so len() never touches disk.
+        self._stored = self._reader().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        self._writer = self._connect(path)
+        self._thread = threading.Thread(target=self._run, name="registry-writer", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def create(
+        self,
+        game_id: str,
+        scenario: Scenario,
+        team_members: list[dict],
+        seed: Optional[int] = None,
+    ) -> SimulationEngine:
+        engine = SimulationEngine(scenario, team_members, seed=seed)
+        engine.session_id = game_id
+        key = (scenario.id, scenario.version)
+        with self._lock:
+            if key not in self._scenarios:
+                self._scenarios[key] = scenario
+                self._new_scenarios[key] = scenario
+        self._remember(game_id, engine)
+        self.save(game_id, engine)
+        return engine
+
+    def get(self, game_id: str) -> Optional[SimulationEngine]:
+        with self._lock:
+            engine = self._hot.get(game_id)
+            if engine is not None:
+                self._hot.move_to_end(game_id)
+                return engine
+            snapshot = self._dirty.get(game_id, self._inflight.get(game_id, ""))
+        if snapshot is None:
+            return None
+        # Disk reads and the replay run unlocked; the lock only publishes the result.
+        if not snapshot:
+            row = self._reader().execute("SELECT snapshot FROM sessions WHERE id = ?", (game_id,)).fetchone()
+            if row is None:
+                return None
+            snapshot = row[0]
+        data = json.loads(snapshot)
+        scenario = self._scenario(data["scenario_id"], data["scenario_version"])
+        if scenario is None:
+            return None
+        engine = SimulationEngine.replay(scenario, data)
+        engine.session_id = game_id
+        with self._lock:
+            # Another request may have restored or deleted the session meanwhile.
+            current = self._hot.get(game_id)
+            if current is not None:
+                self._hot.move_to_end(game_id)
+                return current
+            if self._dirty.get(game_id, "") is None:
+                return None
+            self._insert_hot(game_id, engine)
+        return engine
+
+    def save(self, game_id: str, engine: SimulationEngine) -> None:
+        snapshot = json.dumps(engine.journal(), separators=(",", ":"))
+        with self._lock:
+            self._dirty[game_id] = snapshot
+        self._wake.set()
+
+    def delete(self, game_id: str) -> None:
+        with self._lock:
+            self._hot.pop(game_id, None)
+            self._dirty[game_id] = None
+        self._wake.set()
+
+    def __len__(self) -> int:
+        """Stored sessions, as of the last committed batch."""
+        with self._lock:
+            return self._stored
+
+    def stats(self) -> Dict[str, int]:
+        """Hot-tier size and evictions; stored sessions are counted by len()."""
+        with self._lock:
+            return {
+                "sessions": len(self._hot),
+                "queued_writes": len(self._dirty),
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
+
+    def sweep(self) -> int:
+        """Delete stored sessions idle for longer than the TTL; returns how many."""
+        if not self._session_ttl:
+            return 0
+        cutoff = time.time() - self._session_ttl
+        with self._write_lock:
+            with self._writer:
+                expired = [
+                    row[0]
+                    for row in self._writer.execute("SELECT id FROM sessions WHERE updated < ?", (cutoff,))
+                ]
+                self._writer.executemany("DELETE FROM sessions WHERE id = ?", [(game_id,) for game_id in expired])
+            with self._lock:
+                self._stored -= len(expired)
+                self._expired += len(expired)
+                for game_id in expired:
+                    # A save queued since would bring the session back; let it.
+                    if game_id not in self._dirty:
+                        self._hot.pop(game_id, None)
+                        if self.on_discard is not None:
+                            self.on_discard(game_id)
+        return len(expired)
+
+    def start_sweeper(self) -> None:
+        """Sweep expired stored sessions every ``settings.session_sweep_interval`` seconds."""
+        if self._sweeper is not None or not self._session_ttl:
+            return
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="registry-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def flush(self) -> None:
+        """Write every queued change now."""
+        with self._write_lock:
+            self._write_batch()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        super().close()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._lock:
+            readers, self._readers = self._readers, []
+        for reader in readers:
+            reader.close()
+        self._writer.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        try:
+            return self._local.reader
+        except AttributeError:
+            reader = self._local.reader = self._connect(self._path)
+            with self._lock:
+                self._readers.append(reader)
+            return reader
+
+    def _remember(self, game_id: str, engine: SimulationEngine) -> None:
+        with self._lock:
+            self._insert_hot(game_id, engine)
+
+    def _insert_hot(self, game_id: str, engine: SimulationEngine) -> None:
+        # Caller holds self._lock.
+        self._hot[game_id] = engine
+        self._hot.move_to_end(game_id)
+        # Evicted engines are safe to drop: their latest snapshot is queued or stored.
+        while len(self._hot) > self._hot_sessions:
+            self._hot.popitem(last=False)
+            self._evicted += 1
+
+    def _scenario(self, scenario_id: str, version: str) -> Optional[Scenario]:
+        key = (scenario_id, version)
+        with self._lock:
+            scenario = self._scenarios.get(key)
+        if scenario is None:
+            row = self._reader().execute(
+                "SELECT body FROM scenarios WHERE id = ? AND version = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            loaded = pickle.loads(row[0])
+            with self._lock:
+                scenario = self._scenarios.setdefault(key, loaded)
+        return scenario
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            with self._write_lock:
+                written = self._write_batch()
+            if not written:
+                # The batch is queued again; retry after a pause rather than spin on a broken disk.
+                self._wake.set()
+                self._stop.wait(max(1.0, self._flush_interval))
+            # Let further changes coalesce before the next batch.
+            elif not self._closed:
+                time.sleep(self._flush_interval)
+
+    def _write_batch(self) -> bool:
+        """Commit what is queued; on failure log it, queue the batch again and return False."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            scenarios, self._new_scenarios = self._new_scenarios, {}
+            self._inflight = dirty
+        if not dirty and not scenarios:
+            return True
+        try:
+            self._commit(dirty, scenarios)
+        except Exception:
+            logger.exception("Failed to write %d sessions to %s; will retry", len(dirty), self._path)
+            with self._lock:
+                # Changes queued meanwhile are newer than the failed batch.
+                self._dirty = {**dirty, **self._dirty}
+                self._new_scenarios = {**scenarios, **self._new_scenarios}
+            return False
+        finally:
+            with self._lock:
+                self._inflight = {}
+        return True
+
+    def _commit(
+        self, dirty: Dict[str, Optional[str]], scenarios: Dict[Tuple[str, str], Scenario]
+    ) -> None:
+        now = time.time()
+        saved = [(snap, now, game_id) for game_id, snap in dirty.items() if snap is not None]
+        with self._writer:
+            self._writer.executemany(
+                "INSERT OR IGNORE INTO scenarios (id, version, body) VALUES (?, ?, ?)",
+                [(sid, version, pickle.dumps(sc)) for (sid, version), sc in scenarios.items()],
+            )
+            # Update first, so the insert's row count is the number of new sessions.
+            self._writer.executemany("UPDATE sessions SET snapshot = ?, updated = ? WHERE id = ?", saved)
+            added = self._writer.executemany(
+                "INSERT OR IGNORE INTO sessions (snapshot, updated, id) VALUES (?, ?, ?)", saved
+            ).rowcount
+            removed = self._writer.executemany(
+                "DELETE FROM sessions WHERE id = ?",
+                [(game_id,) for game_id, snap in dirty.items() if snap is None],
+            ).rowcount
+        with self._lock:
+            self._stored += added - removed
+
+
+def _lock_exclusively(path: str):
+    """Hold an exclusive lock on ``<path>.lock`` for as long as the returned file is open."""
+    if path == ":memory:":
+        return None
+    handle = open(path + ".lock", "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        raise RuntimeError(
+            f"{path} is in use by another process; the sqlite registry supports a single server process"
+        ) from None
+    return handle
@@ -0,0 +1,95 @@
+"""Bounded cache of stage payloads already encoded as JSON.
+
+A stage render depends only on the scenario version, the current stage or
+injection, the challenge index and the team totals behind the success
+probabilities (see ``SimulationEngine.presentable_key``). Sessions at the same
+point with the same team share one encoded payload, so most renders are a
+dictionary lookup instead of rebuilding and re-encoding nested dicts.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from app.config import settings
+from app.services.simulation import SimulationEngine
+
+
+def serialize_stage(stage_payload) -> Dict:
+    return {
+        "id": stage_payload["id"],
+        "title": stage_payload["title"],
+        "summary": stage_payload["summary"],
+        "is_injection": stage_payload.get("is_injection", False),
+        "challenges": [
+            {
+                "id": challenge.id,
+                "title": challenge.title,
+                "prompt": challenge.prompt,
+                "options": [
+                    {
+                        "id": option.id,
+                        "label": option.label,
+                        "narrative": option.narrative,
+                        "skill": option.skill,
+                        "difficulty": option.difficulty,
+                        "probability": stage_payload["probabilities"].get(option.id),
+                    }
+                    for option in challenge.options
+                ],
+            }
+            for challenge in stage_payload["challenges"]
+        ],
+    }
+
+
+def encode_json(payload) -> bytes:
+    """Encode like FastAPI's JSONResponse, so cached and live bodies match."""
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class StageCache:
+    """LRU map from ``presentable_key()`` to the encoded ``serialize_stage`` output."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self.max_entries = settings.stage_cache_size if max_entries is None else max_entries
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def encoded(self, engine: SimulationEngine) -> bytes:
+        """JSON bytes of the stage the engine is currently presenting."""
+        key = engine.presentable_key()
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return body
+            self._misses += 1
+
+        body = encode_json(serialize_stage(engine.current_presentable()))
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = body
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(body) for body in self._entries.values()),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
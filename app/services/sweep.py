@@ -0,0 +1,321 @@
+"""Parameter sweeps over ``SimulationSettings`` for game balancing.
+
+A sweep spec names the settings to vary, the scenarios and the teams. Every
+combination of a settings point, a scenario and a team is one sweep point:
+
+    {
+      "grid": {"injection_base_chance": [0.1, 0.15, 0.2], "default_budget": [80, 100]},
+      "scenarios": ["cloud-ransom"],
+      "teams": ["optimal", ["intel-analyst", "Priya Singh"]],
+      "games": 2000, "policy": "greedy", "seed": 0
+    }
+
+``grid`` takes every combination of the listed values. ``sample`` instead
+draws ``count`` points uniformly from ``[low, high]`` ranges with its own
+``seed``. A team is a list of roster ids or names, or ``"optimal"`` for the
+optimizer's pick under the point's ``team_budget``.
+
+Each point plays ``games`` Monte Carlo games in a worker process, with the
+point's overrides applied to the process-wide settings while it runs. Every
+point uses the same game seed, so two points differ only by their settings.
+Results are stored in a sqlite file keyed by the effective settings, the
+scenario and roster versions and the team. A re-run only plays points it has
+not seen, and editing a pack or the roster replays only the points it touches.
+"""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import itertools
+import json
+import random
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.config import SimulationSettings, settings
+from app.services.content_library import ContentLibrary
+from app.services.montecarlo import make_policy, run_batch
+from app.services.team_loader import raw_members
+from app.services.team_optimizer import optimize_team
+
+# Settings that change how a game plays out; anything else is rejected.
+SWEEP_FIELDS = (
+    "max_rounds",
+    "default_budget",
+    "base_reputation",
+    "injection_base_chance",
+    "injection_risk_factor",
+    "injection_max_chance",
+    "team_budget",
+)
+OPTIMAL = "optimal"
+# Bump when stored results may no longer match what a point would play.
+RESULTS_VERSION = 2
+COLUMNS = ("win_rate", "fired_rate", "finished_rate")
+
+Team = Union[str, Tuple[str, ...]]
+
+
+@dataclass(frozen=True, slots=True)
+class SweepPoint:
+    scenario_id: str
+    team: Team  # OPTIMAL or roster ids/names
+    overrides: Tuple[Tuple[str, Union[int, float]], ...]
+
+
+def _coerce(name: str, value) -> Union[int, float]:
+    if name not in SWEEP_FIELDS:
+        raise ValueError(f"Cannot sweep {name!r}; expected one of {', '.join(SWEEP_FIELDS)}")
+    kind = SimulationSettings.model_fields[name].annotation
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} values must be numbers, not {value!r}")
+    if kind is int and value != int(value):
+        raise ValueError(f"{name} takes whole numbers, not {value!r}")
+    return int(value) if kind is int else float(value)
+
+
+def grid(space: Dict[str, Sequence]) -> List[Dict[str, Union[int, float]]]:
+    """Every combination of the listed values."""
+    names = sorted(space)
+    values = [[_coerce(name, value) for value in space[name]] for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def sample(ranges: Dict[str, Sequence], count: int, seed: int = 0) -> List[Dict[str, Union[int, float]]]:
+    """``count`` points drawn uniformly from ``[low, high]`` ranges; whole numbers for int settings."""
+    rng = random.Random(seed)
+    bounds = {}
+    for name in sorted(ranges):
+        if len(ranges[name]) != 2:
+            raise ValueError(f"{name} range must be [low, high]")
+        low, high = (_coerce(name, value) for value in ranges[name])
+        if low > high:
+            raise ValueError(f"{name} range is empty: {low} > {high}")
+        bounds[name] = (low, high)
+    return [
+        {
+            name: rng.randint(low, high) if isinstance(low, int) else rng.uniform(low, high)
+            for name, (low, high) in bounds.items()
+        }
+        for _ in range(count)
+    ]
+
+
+@contextlib.contextmanager
+def overridden(overrides: Dict[str, Union[int, float]]) -> Iterator[None]:
+    """Apply setting overrides to this process until the block exits."""
+    saved = {name: getattr(settings, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+class SweepCache:
+    """Sweep results in sqlite, one row per point key."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS points (key TEXT PRIMARY KEY, result TEXT NOT NULL)")
+        self._connection.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict]:
+        found: Dict[str, Dict] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, result FROM points WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update((key, json.loads(result)) for key, result in rows)
+        return found
+
+    def put(self, key: str, result: Dict) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO points (key, result) VALUES (?, ?)", (key, json.dumps(result))
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class Sweep:
+    """Resolves a spec into points and plays the ones missing from the cache."""
+
+    def __init__(self, spec: Dict, library: Optional[ContentLibrary] = None) -> None:
+        self.library = library or ContentLibrary()
+        unknown = set(spec) - {"grid", "sample", "scenarios", "teams", "games", "policy", "seed"}
+        if unknown:
+            raise ValueError(f"Unknown sweep keys: {', '.join(sorted(unknown))}")
+        if "grid" in spec and "sample" in spec:
+            raise ValueError("A sweep takes either grid or sample, not both")
+        if "sample" in spec:
+            drawn = spec["sample"]
+            points = sample(drawn.get("ranges", {}), int(drawn.get("count", 10)), int(drawn.get("seed", 0)))
+        else:
+            points = grid(spec.get("grid", {}))
+        self.settings_points = points
+
+        self.scenario_ids: List[str] = list(spec.get("scenarios") or self.library.catalog)
+        for scenario_id in self.scenario_ids:
+            if scenario_id not in self.library.catalog:
+                raise ValueError(f"Scenario {scenario_id!r} not found")
+        members = raw_members()
+        self.teams: List[Team] = []
+        for team in spec.get("teams") or [OPTIMAL]:
+            if team == OPTIMAL:
+                self.teams.append(OPTIMAL)
+                continue
+            if isinstance(team, str) or not team:
+                raise ValueError(f"A team is {OPTIMAL!r} or a list of roster ids or names, not {team!r}")
+            for key in team:
+                if key not in members:
+                    raise ValueError(f"Unknown team member {key!r}")
+            self.teams.append(tuple(team))
+
+        self.games = int(spec.get("games", 1000))
+        self.policy = str(spec.get("policy", "greedy"))
+        if self.policy not in ("random", "greedy"):
+            raise ValueError(f"Sweeps play the random or greedy policy, not {self.policy!r}")
+        self.seed = int(spec.get("seed", 0))
+
+    def points(self) -> List[SweepPoint]:
+        return [
+            SweepPoint(scenario_id, team, tuple(sorted(overrides.items())))
+            for overrides in self.settings_points
+            for scenario_id in self.scenario_ids
+            for team in self.teams
+        ]
+
+    def key(self, point: SweepPoint) -> str:
+        """Cache key: everything that can change a point's result; raises ValueError for an unplayable scenario."""
+        scenario = self.library.scenario(point.scenario_id)
+        if scenario is None:
+            error = self.library.load_error(point.scenario_id)
+            raise ValueError(f"Scenario {point.scenario_id!r} " + (f"failed to load: {error}" if error else "not found"))
+        effective = {name: getattr(settings, name) for name in SWEEP_FIELDS}
+        effective.update(point.overrides)
+        identity = {
+            "version": RESULTS_VERSION,
+            "settings": effective,
+            "scenario": [point.scenario_id, scenario.version],
+            "roster": self.library.roster.version,
+            "team": point.team,
+            "games": self.games,
+            "policy": self.policy,
+            "seed": self.seed,
+        }
+        return hashlib.blake2b(json.dumps(identity, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+    def run(self, workers: int = 1, cache_path: Optional[str] = None) -> List[Dict]:
+        """One row per point, in point order; ``cached`` says whether it was played this run."""
+        cache_path = settings.sweep_cache_path if cache_path is None else cache_path
+        cache = SweepCache(cache_path) if cache_path else None
+        points = self.points()
+        keys = [self.key(point) for point in points]
+        try:
+            results = cache.get_many(keys) if cache else {}
+            cached = set(results)
+            missing = [(key, point) for key, point in zip(keys, points) if key not in results]
+            # The same point may appear twice in a sampled sweep; play it once.
+            missing = list(dict(missing).items())
+            tasks = [(point, self.games, self.policy, self.seed) for _, point in missing]
+            with contextlib.ExitStack() as stack:
+                if workers <= 1 or len(tasks) <= 1:
+                    members = raw_members()
+                    played: Iterator[Dict] = (play_point(self.library, members, *task) for task in tasks)
+                else:
+                    pool = stack.enter_context(
+                        ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker)
+                    )
+                    played = pool.map(_run_point, tasks)
+                for (key, _), result in zip(missing, played):
+                    results[key] = result
+                    if cache:
+                        # Stored as each point lands, so an interrupted sweep resumes.
+                        cache.put(key, result)
+        finally:
+            if cache:
+                cache.close()
+        return [
+            {
+                "scenario_id": point.scenario_id,
+                "team": point.team if point.team == OPTIMAL else list(point.team),
+                **dict(point.overrides),
+                **results[key],
+                "cached": key in cached,
+            }
+            for key, point in zip(keys, points)
+        ]
+
+
+_library: Optional[ContentLibrary] = None
+_members: Dict[str, Dict] = {}
+
+
+def _init_worker() -> None:
+    global _library, _members
+    _library = ContentLibrary()
+    _members = raw_members()
+
+
+def _run_point(task: Tuple[SweepPoint, int, str, int]) -> Dict:
+    return play_point(_library, _members, *task)
+
+
+def play_point(
+    library: ContentLibrary, members: Dict[str, Dict], point: SweepPoint, games: int, policy: str, seed: int
+) -> Dict:
+    """Play one point's games with its overrides applied; rates are None when the team is over budget."""
+    scenario = library.scenario(point.scenario_id)
+    with overridden(dict(point.overrides)):
+        if point.team == OPTIMAL:
+            names = optimize_team(scenario, library.roster)["team"]
+        else:
+            names = point.team
+        team = [members[name] for name in names]
+        cost = sum(int(member.get("cost", 50)) for member in team)
+        if cost > settings.team_budget:
+            return {"team_cost": cost, "games": 0, **{column: None for column in COLUMNS}, "over_budget": True}
+        summary = run_batch(scenario, team, games=games, policy=make_policy(policy), seed=seed).summary()
+    return {
+        "team_cost": cost,
+        **({"members": list(names)} if point.team == OPTIMAL else {}),
+        "games": summary["games"],
+        **{column: summary[column] for column in COLUMNS},
+        **{f"mean_{metric}": stats.get("mean") for metric, stats in summary["distributions"].items()},
+    }
+
+
+def format_table(rows: List[Dict]) -> str:
+    """Fixed-width text table with one line per point."""
+    swept = sorted({name for row in rows for name in row if name in SWEEP_FIELDS})
+    headers = ["scenario", "team", *swept, "games", "win", "fired", "finished", "cached"]
+    lines = []
+    for row in rows:
+        team = row["team"] if row["team"] == OPTIMAL else "+".join(row["team"])
+        if row.get("over_budget"):
+            team += f" (over budget: {row['team_cost']})"
+        rates = ["-" if row[column] is None else f"{row[column]:.3f}" for column in COLUMNS]
+        lines.append(
+            [
+                row["scenario_id"],
+                team,
+                *(f"{row[name]:g}" for name in swept),
+                str(row["games"]),
+                *rates,
+                "yes" if row["cached"] else "no",
+            ]
+        )
+    widths = [max(len(cell) for cell in column) for column in zip(headers, *lines)]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in [headers, *lines])
@@ -3,33 +3,40 @@ from __future__ import annotations
 import pathlib
 from typing import Dict, List
 
-import yaml
-
-from app.domain.models import Character, StatBlock
+from app.domain.models import SKILLS
+from app.services.content_cache import load_cached, parse_yaml
+from app.services.roster_store import RosterStore
 
 DATA_DIR = pathlib.Path(__file__).resolve().parent.parent / "data"
+ROSTER_PATH = DATA_DIR / "team_roster.yaml"
+
+
+def load_roster() -> RosterStore:
+    # The store is immutable, so the cached object can be shared.
+    return load_cached("roster", ROSTER_PATH, lambda: _build_roster(parse_yaml(ROSTER_PATH)))
 
 
-def load_roster() -> List[Character]:
-    path = DATA_DIR / "team_roster.yaml"
-    with path.open("r", encoding="utf-8") as handle:
-        payload = yaml.safe_load(handle)
-    members = []
+def _build_roster(payload: Dict) -> RosterStore:
+    rows = []
     for entry in payload.get("members", []):
         stats = entry.get("stats", {})
-        members.append(
-            Character(
-                name=entry["name"],
-                role=entry["role"],
-                cost=int(entry.get("cost", 50)),
-                stats=StatBlock(
-                    analysis=int(stats.get("analysis", 50)),
-                    comms=int(stats.get("comms", 50)),
-                    engineering=int(stats.get("engineering", 50)),
-                    leadership=int(stats.get("leadership", 50)),
-                ),
+        rows.append(
+            (
+                entry["name"],
+                entry["role"],
+                int(entry.get("cost", 50)),
+                tuple(int(stats.get(skill, 50)) for skill in SKILLS),
             )
         )
+    return RosterStore(rows)
+
+
+def raw_members() -> Dict[str, Dict]:
+    """Roster entries as written in the YAML, keyed by both id and name."""
+    members: Dict[str, Dict] = {}
+    for entry in parse_yaml(ROSTER_PATH).get("members", []):
+        members[entry["name"]] = entry
+        members[entry.get("id", entry["name"])] = entry
     return members
 
 
@@ -40,4 +47,3 @@ def select_team(member_ids: List[str], roster: Dict[str, Dict]) -> List[Dict]:
             continue
         selected.append(roster[member_id])
     return selected
-
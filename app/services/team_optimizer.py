@@ -0,0 +1,308 @@
+"""Search the roster for the team with the best expected outcome in a scenario.
+
+A team is valued by the budget plus reputation it is expected to gain when it
+always plays the option with the best expectation: an expectimax over the
+stage graph, capped at ``max_rounds``, that depends on the team only through
+its skill totals and average stat. The search is a depth-first branch and
+bound over the roster, bounding each partial team by the best any completion
+within the remaining budget could reach.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.domain.models import SKILLS, Character, Option, Outcome, Scenario
+from app.services.roster_store import RosterStore
+from app.services.simulation import SimulationEngine, success_chance
+from app.services.single_flight import SingleFlightCache
+
+Totals = Tuple[int, int, int, int]
+
+# Settings a team's value depends on; plans are cached per combination.
+EVALUATION_SETTINGS = (
+    "max_rounds",
+    "default_budget",
+    "injection_base_chance",
+    "injection_risk_factor",
+    "injection_max_chance",
+)
+
+
+def _standing(outcome: Outcome) -> int:
+    """Budget plus reputation change caused by an outcome."""
+    delta = (outcome.budget_delta or 0) + (outcome.reputation_delta or 0)
+    if outcome.action == "double-budget":
+        delta += settings.default_budget // 2
+    elif outcome.action == "burn-budget":
+        delta -= settings.default_budget // 2
+    return delta
+
+
+def _stats(member: Character) -> Totals:
+    s = member.stats
+    return (s.analysis, s.comms, s.engineering, s.leadership)
+
+
+class TeamOptimizer:
+    def __init__(self, scenario: Scenario, roster: Sequence[Character], budget: Optional[int] = None) -> None:
+        self.scenario = scenario
+        self.budget = settings.team_budget if budget is None else budget
+        # Best value for money first, so good teams are found early and prune the rest.
+        self.candidates = sorted(
+            (member for member in roster if member.cost <= self.budget),
+            key=lambda m: -sum(_stats(m)) / m.cost if m.cost > 0 else float("-inf"),
+        )
+        self._stats = [_stats(member) for member in self.candidates]
+        self._costs = [member.cost for member in self.candidates]
+        # Candidates by value for money in each skill, for the knapsack bound.
+        self._by_skill = [
+            sorted(
+                range(len(self.candidates)),
+                key=lambda i, k=k: -self._stats[i][k] / self._costs[i] if self._costs[i] > 0 else float("-inf"),
+            )
+            for k in range(len(SKILLS))
+        ]
+        # Lowest and highest average stat among candidates[i:]; a completion's
+        # team_score lies between them and the current team's.
+        self._min_average = [float("inf")] * (len(self.candidates) + 1)
+        self._max_average = [float("-inf")] * (len(self.candidates) + 1)
+        for i in range(len(self.candidates) - 1, -1, -1):
+            average = sum(self._stats[i]) / 4
+            self._min_average[i] = min(self._min_average[i + 1], average)
+            self._max_average[i] = max(self._max_average[i + 1], average)
+        # Staff cost per decision is int(team_score * 0.1); level d holds the
+        # teams whose stat sum stays under 40 * (d + 1) per member. For each
+        # level, the candidates that pull a team under it, most pull per cost first.
+        self._levels = range(11)
+        self._dilutors = [
+            sorted(
+                (i for i, stats in enumerate(self._stats) if sum(stats) < 40 * (level + 1)),
+                key=lambda i, level=level: (
+                    -(40 * (level + 1) - sum(self._stats[i])) / self._costs[i]
+                    if self._costs[i] > 0
+                    else float("-inf")
+                ),
+            )
+            for level in self._levels
+        ]
+        self._ceilings: Dict[int, float] = {}
+
+        self._failures = [SimulationEngine._pick_failure(option) for option in scenario.options]
+        self._outcomes = [
+            (_standing(option.success), _standing(failure))
+            for option, failure in zip(scenario.options, self._failures)
+        ]
+        weight = sum(injection.weight for injection in scenario.injections)
+        self._injections = [(injection.weight / weight, injection.options) for injection in scenario.injections if weight]
+        self._injection_chance = min(
+            settings.injection_max_chance,
+            settings.injection_base_chance + 50 * settings.injection_risk_factor,
+        )
+        self._values: Dict[Tuple[Totals, int], float] = {}
+        self.nodes = 0
+
+    def chances(self, totals: Sequence[float], team_score: float) -> List[float]:
+        """Success chance per option index, as the engine's chance table for this team."""
+        by_skill = dict(zip(SKILLS, totals))
+        return [
+            success_chance(by_skill.get(option.skill, team_score), option.difficulty)
+            for option in self.scenario.options
+        ]
+
+    def value(self, totals: Totals, size: int) -> float:
+        """Expected budget plus reputation gained over a game by a team with these totals."""
+        team_score = int(sum(totals) / (4 * max(1, size)))
+        key = (totals, team_score)
+        value = self._values.get(key)
+        if value is None:
+            chances = self.chances(totals, team_score)
+            value = self._values[key] = self._evaluate(chances, chances, int(team_score * 0.1))
+        return value
+
+    def _evaluate(self, low: List[float], high: List[float], cost: int) -> float:
+        """Expectimax value; with ``low != high`` an upper bound over every chance in range."""
+        outcomes = self._outcomes
+        failures = self._failures
+        stages = self.scenario.stages
+
+        def chance_node(option: Option, on_success: float, on_failure: float) -> float:
+            # Linear in the chance, so the best chance in range is an endpoint.
+            p, q = low[option.index], high[option.index]
+            value = p * on_success + (1 - p) * on_failure
+            if q != p:
+                value = max(value, q * on_success + (1 - q) * on_failure)
+            return value
+
+        injection = 0.0
+        for share, options in self._injections:
+            injection += share * max(
+                chance_node(o, *outcomes[o.index]) for o in options
+            )
+        injection = self._injection_chance * (injection - cost)
+
+        memo: Dict[Tuple[str, int, int], float] = {}
+
+        def visit(stage_id: str, index: int, rounds: int) -> float:
+            if rounds == 0:
+                return 0.0
+            key = (stage_id, index, rounds)
+            cached = memo.get(key)
+            if cached is not None:
+                return cached
+            challenges = stages[stage_id].challenges
+            last = index == len(challenges) - 1
+
+            def after(outcome: Outcome) -> float:
+                if outcome.action == "end":
+                    return 0.0
+                if not last:
+                    return visit(stage_id, index + 1, rounds - 1)
+                if outcome.next_stage in stages:
+                    return visit(outcome.next_stage, 0, rounds - 1)
+                return 0.0
+
+            best = float("-inf")
+            for option in challenges[index].options:
+                success_value, failure_value = outcomes[option.index]
+                best = max(
+                    best,
+                    chance_node(
+                        option,
+                        success_value + after(option.success),
+                        failure_value + after(failures[option.index]),
+                    ),
+                )
+            memo[key] = value = best - cost + injection
+            return value
+
+        return visit(self.scenario.starting_stage, 0, settings.max_rounds)
+
+    def _skill_cap(self, skill: int, start: int, budget: int) -> float:
+        """Most of one skill that candidates[start:] can add for ``budget`` (fractional knapsack)."""
+        total = 0.0
+        for i in self._by_skill[skill]:
+            if i < start:
+                continue
+            cost = self._costs[i]
+            if cost <= budget:
+                total += self._stats[i][skill]
+                budget -= cost
+            else:
+                total += self._stats[i][skill] * budget / cost
+                break
+        return total
+
+    def _reaches(self, level: int, start: int, budget: int, total: int, size: int) -> bool:
+        """Whether adding candidates[start:] for ``budget`` could bring the team to ``level``."""
+        limit = 40 * (level + 1)
+        # Stat sum the team must shed, relative to the level, to get under it.
+        excess = total - limit * size
+        if size and excess < 0:
+            return True
+        pull = 0.0
+        for i in self._dilutors[level]:
+            if i < start:
+                continue
+            cost = self._costs[i]
+            slack = limit - sum(self._stats[i])
+            if cost <= budget:
+                pull += slack
+                budget -= cost
+            else:
+                pull += slack * budget / cost
+                break
+            if pull > excess:
+                return True
+        return pull > excess
+
+    def _ceiling(self, level: int) -> float:
+        """Value of a team at this staff cost level that wins every chance the engine allows."""
+        ceiling = self._ceilings.get(level)
+        if ceiling is None:
+            ceiling = self._ceilings[level] = self._evaluate(
+                self.chances((0, 0, 0, 0), 0), self.chances((10**9,) * 4, 10**9), level
+            )
+        return ceiling
+
+    def _bound(self, start: int, spent: int, totals: Totals, size: int, best: float) -> float:
+        remaining = self.budget - spent
+        total = sum(totals)
+        level = next(
+            level for level in self._levels
+            if level == self._levels[-1] or self._reaches(level, start, remaining, total, size)
+        )
+        if self._ceiling(level) <= best:
+            return self._ceiling(level)
+        upper = [totals[k] + self._skill_cap(k, start, remaining) for k in range(len(SKILLS))]
+        lowest, highest = max(self._min_average[start], 10 * level), self._max_average[start]
+        if size:
+            lowest = min(lowest, total / (4 * size))
+            highest = max(highest, total / (4 * size))
+        return self._evaluate(self.chances(totals, int(lowest)), self.chances(upper, highest), level)
+
+    def search(self, max_nodes: int = 200_000) -> Dict:
+        """Best team within budget; stops early, and says so, after ``max_nodes`` teams."""
+        best: Dict = {"value": float("-inf"), "members": (), "cost": 0}
+
+        def consider(members: Tuple[int, ...], spent: int, totals: Totals) -> None:
+            value = self.value(totals, len(members))
+            if value > best["value"] or (value == best["value"] and spent < best["cost"]):
+                best.update(value=value, members=members, cost=spent)
+
+        def expand(start: int, members: Tuple[int, ...], spent: int, totals: Totals) -> None:
+            self.nodes += 1
+            consider(members, spent, totals)
+            if start == len(self.candidates) or self.nodes >= max_nodes:
+                return
+            if self._bound(start, spent, totals, len(members), best["value"]) <= best["value"]:
+                return
+            for i in range(start, len(self.candidates)):
+                if self.nodes >= max_nodes:
+                    return
+                cost = self._costs[i]
+                if spent + cost > self.budget:
+                    continue
+                stats = self._stats[i]
+                expand(
+                    i + 1,
+                    members + (i,),
+                    spent + cost,
+                    tuple(t + s for t, s in zip(totals, stats)),  # type: ignore[arg-type]
+                )
+
+        expand(0, (), 0, (0, 0, 0, 0))
+        team = [self.candidates[i] for i in best["members"]]
+        totals = tuple(sum(_stats(member)[k] for member in team) for k in range(len(SKILLS)))
+        return {
+            "scenario_id": self.scenario.id,
+            "team": [member.name for member in team],
+            "cost": best["cost"],
+            "budget": self.budget,
+            "team_totals": dict(zip(SKILLS, totals)),
+            "team_score": int(sum(totals) / (4 * max(1, len(team)))),
+            "expected_standing": round(best["value"], 2),
+            "teams_searched": self.nodes,
+            "distinct_totals": len(self._values),
+            "exhaustive": self.nodes < max_nodes,
+        }
+
+
+_plans: "SingleFlightCache[Dict]" = SingleFlightCache(lambda: settings.team_plan_cache_size)
+
+
+def optimize_team(scenario: Scenario, roster: Sequence[Character], budget: Optional[int] = None) -> Dict:
+    """Best team for a scenario from ``roster``, cached per scenario version, roster and settings."""
+    budget = settings.team_budget if budget is None else budget
+    key = (
+        scenario.id,
+        scenario.version,
+        budget,
+        tuple(getattr(settings, name) for name in EVALUATION_SETTINGS),
+        roster.version if isinstance(roster, RosterStore) else tuple((m.name, m.cost, *_stats(m)) for m in roster),
+    )
+    return _plans.get(key, lambda: TeamOptimizer(scenario, roster, budget).search())
+
+
+def stats() -> Dict[str, int]:
+    return {"plans": len(_plans), "searching": _plans.computing()}
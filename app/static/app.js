@@ -9,9 +9,60 @@ const statusElements = {
   budget: document.getElementById("budget-value"),
   reputation: document.getElementById("reputation-value"),
   risk: document.getElementById("risk-value"),
+  rounds: document.getElementById("rounds-value"),
 };
 
 let sessionId = null;
+// Full player state, kept current from the deltas decisions return.
+let sessionState = null;
+// Sessions opened from /?room=<id> report to that facilitation room.
+const roomId = new URLSearchParams(window.location.search).get("room");
+
+const scenarioSearch = document.getElementById("scenario-search");
+const scenarioMore = document.getElementById("scenario-more");
+let scenarioQuery = { q: "", tag: "" };
+let searchTimer = null;
+
+// "tag:x" words filter by tag; the rest is matched against name and briefing.
+function parseScenarioQuery(text) {
+  const words = text.trim().split(/\s+/).filter(Boolean);
+  const tag = words.find((word) => word.startsWith("tag:"));
+  return {
+    q: words.filter((word) => word !== tag).join(" "),
+    tag: tag ? tag.slice(4) : "",
+  };
+}
+
+async function loadScenarios(cursor) {
+  const params = new URLSearchParams();
+  if (scenarioQuery.q) params.set("q", scenarioQuery.q);
+  if (scenarioQuery.tag) params.set("tag", scenarioQuery.tag);
+  if (cursor) params.set("cursor", cursor);
+  const response = await fetch(`/api/scenarios?${params}`);
+  if (!response.ok) return;
+  const page = await response.json();
+  if (!cursor) {
+    scenarioSelect.length = 1;
+    scenarioSelect.selectedIndex = 0;
+  }
+  page.items.forEach((scenario) => {
+    const option = new Option(scenario.name, scenario.id);
+    option.dataset.briefing = scenario.briefing;
+    scenarioSelect.add(option);
+  });
+  scenarioMore.dataset.cursor = page.next_cursor || "";
+  scenarioMore.hidden = !page.next_cursor;
+}
+
+scenarioSearch?.addEventListener("input", () => {
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(() => {
+    scenarioQuery = parseScenarioQuery(scenarioSearch.value);
+    loadScenarios(null);
+  }, 150);
+});
+
+scenarioMore?.addEventListener("click", () => loadScenarios(scenarioMore.dataset.cursor));
 
 scenarioSelect?.addEventListener("change", () => {
   const option = scenarioSelect.selectedOptions[0];
@@ -40,13 +91,14 @@ form?.addEventListener("submit", async (event) => {
     const response = await fetch("/api/session", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ scenario_id: scenarioId, team }),
+      body: JSON.stringify({ scenario_id: scenarioId, team, room_id: roomId }),
     });
     if (!response.ok) throw new Error("Failed to start session");
     const payload = await response.json();
     sessionId = payload.session_id;
+    sessionState = payload.state;
     historyList.innerHTML = "";
-    updateStatus(payload.state);
+    updateStatus(sessionState, payload.rounds_remaining);
     renderStage(payload.stage);
     setRosterDisabled(true);
   } catch (error) {
@@ -65,13 +117,21 @@ const tabPanels = document.querySelectorAll(".tab-panel");
 
 async function loadRoster() {
   try {
-    const response = await fetch("/api/roster");
-    const data = await response.json();
-    teamBudget = data.budget ?? 0;
+    // The roster is served in pages; collect them all for the team picker.
+    const members = [];
+    let cursor = "";
+    do {
+      const params = new URLSearchParams(cursor ? { cursor } : {});
+      const response = await fetch(`/api/roster?${params}`);
+      const data = await response.json();
+      teamBudget = data.budget ?? 0;
+      members.push(...data.members);
+      cursor = data.next_cursor;
+    } while (cursor);
     rosterData = Object.fromEntries(
-      data.members.map((member) => [member.name, member])
+      members.map((member) => [member.name, member])
     );
-    renderRoster(data.members);
+    renderRoster(members);
     updateTeamCostDisplay();
   } catch (error) {
     console.error("Failed to load roster", error);
@@ -142,18 +202,28 @@ async function chooseOption(optionId) {
   if (!sessionId) return;
   toggleOptions(true);
   try {
-    const response = await fetch(`/api/session/${sessionId}/decision`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ option_id: optionId }),
-    });
+    let response = await postDecision(optionId);
+    if (response.status === 409) {
+      // The server no longer knows our version: take a full snapshot and retry.
+      await resyncState();
+      response = await postDecision(optionId);
+    }
     if (!response.ok) throw new Error("Decision failed");
     const result = await response.json();
-    updateStatus(result.state);
-    appendHistory(result);
+    if (applyStateDelta(sessionState, result.state)) {
+      appendHistory(result.state.history);
+    } else if (result.finished) {
+      // The server drops finished sessions, so there is nothing to resync from.
+      Object.assign(sessionState, result.state.changes);
+      appendHistory(result.state.history);
+    } else {
+      await resyncState();
+      renderHistory(sessionState.history);
+    }
+    updateStatus(sessionState, result.rounds_remaining);
     if (result.finished) {
       // Check if fired (budget or reputation <= 0)
-      const fired = result.state.budget <= 0 || result.state.reputation <= 0;
+      const fired = sessionState.budget <= 0 || sessionState.reputation <= 0;
       if (fired) {
         renderFiredScreen(result);
       } else {
@@ -172,9 +242,32 @@ async function chooseOption(optionId) {
   }
 }
 
+function postDecision(optionId) {
+  return fetch(`/api/session/${sessionId}/decision`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ option_id: optionId, since: sessionState.version }),
+  });
+}
+
+async function resyncState() {
+  const response = await fetch(`/api/session/${sessionId}/state`);
+  if (!response.ok) throw new Error("State resync failed");
+  sessionState = await response.json();
+}
+
+// Apply a decision's state delta in place; false if it does not follow our version.
+function applyStateDelta(state, delta) {
+  if (!state || delta.since !== state.version) return false;
+  Object.assign(state, delta.changes);
+  state.history.push(...delta.history);
+  state.version = delta.version;
+  return true;
+}
+
 function renderFiredScreen(result) {
   const reason = result.outcome;
-  const state = result.state;
+  const state = sessionState;
   
   stagePanel.innerHTML = `
     <div class="fired-screen">
@@ -252,18 +345,28 @@ function renderStage(stage) {
   });
 }
 
-function updateStatus(state) {
+function updateStatus(state, rounds) {
   statusElements.budget.textContent = state.budget;
   statusElements.reputation.textContent = state.reputation;
   statusElements.risk.textContent = state.risk;
+  if (statusElements.rounds && rounds) {
+    statusElements.rounds.textContent =
+      rounds.min === rounds.max ? rounds.min : `${rounds.min}–${rounds.max}`;
+  }
   updateTeamStats(state.team_totals || {});
 }
 
-function appendHistory(result) {
-  const li = document.createElement("li");
-  const last = result.state.history[result.state.history.length - 1];
-  li.textContent = `${last.stage.toUpperCase()} » ${last.option} → ${last.outcome}`;
-  historyList.prepend(li);
+function renderHistory(entries) {
+  historyList.innerHTML = "";
+  appendHistory(entries);
+}
+
+function appendHistory(entries) {
+  entries.forEach((entry) => {
+    const li = document.createElement("li");
+    li.textContent = `${entry.stage.toUpperCase()} » ${entry.option} → ${entry.outcome}`;
+    historyList.prepend(li);
+  });
 }
 
 function toggleOptions(disabled) {
@@ -0,0 +1,250 @@
+"""End-to-end HTTP load test of the FastAPI app.
+
+Virtual players run the flow the browser does: GET /api/roster, pick a team
+within budget, POST /api/session, then decisions until the game finishes.
+The app is driven in-process over ASGI, through a local uvicorn process, or
+both. The report gives throughput, latency percentiles per endpoint and
+resident memory growth of the serving process, and is saved as JSON so
+releases can be compared; ``--baseline`` fails the run on regressions.
+
+Needs httpx (``pip install httpx``).
+
+    python -m benchmarks.http_load --players 50 --games 500 --output load.json
+    python -m benchmarks.http_load --target uvicorn --baseline load.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROSTER = "GET /api/roster"
+SESSION = "POST /api/session"
+DECISION = "POST /api/session/{id}/decision"
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Current resident set size of ``pid``; None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _pick_team(roster: Dict, rng: random.Random) -> List[Dict]:
+    members = list(roster["members"])
+    rng.shuffle(members)
+    team, cost = [], 0
+    for member in members:
+        if cost + member["cost"] <= roster["budget"]:
+            team.append({"name": member["name"]})
+            cost += member["cost"]
+    return team
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, label: str, request) -> Optional[Dict]:
+        began = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[label] += 1
+            return None
+        self.samples[label].append(time.perf_counter() - began)
+        if response.status_code != 200:
+            self.errors[label] += 1
+            return None
+        return response.json()
+
+
+async def _play(client, recorder: Recorder, scenarios: List[str], rng: random.Random) -> bool:
+    roster = await recorder.call(ROSTER, client.get("/api/roster"))
+    if roster is None:
+        return False
+    payload = {"scenario_id": rng.choice(scenarios), "team": _pick_team(roster, rng)}
+    result = await recorder.call(SESSION, client.post("/api/session", json=payload))
+    if result is None:
+        return False
+    session_id = result["session_id"]
+    while result is not None:
+        stage = result["stage"]
+        if stage is None:
+            return True
+        option = rng.choice(stage["challenges"][0]["options"])
+        result = await recorder.call(
+            DECISION,
+            client.post(f"/api/session/{session_id}/decision", json={"option_id": option["id"]}),
+        )
+    return False
+
+
+async def drive(client, players: int, games: int, seed: int, pid: int) -> Dict:
+    """Play ``games`` games with ``players`` concurrent players against ``client``."""
+    scenarios = [scenario["id"] for scenario in (await client.get("/api/scenarios")).json()["items"]]
+    recorder = Recorder()
+    remaining = games
+    finished = 0
+
+    async def player(index: int) -> None:
+        nonlocal remaining, finished
+        rng = random.Random(f"{seed}:{index}")
+        while remaining > 0:
+            remaining -= 1
+            completed = await _play(client, recorder, scenarios, rng)
+            finished += completed
+
+    rss_start = _rss_bytes(pid)
+    start = time.perf_counter()
+    await asyncio.gather(*(player(index) for index in range(players)))
+    elapsed = time.perf_counter() - start
+    rss_end = _rss_bytes(pid)
+
+    requests = sum(len(samples) for samples in recorder.samples.values())
+    endpoints = {}
+    for label, samples in recorder.samples.items():
+        samples.sort()
+        endpoints[label] = {
+            "count": len(samples),
+            "errors": recorder.errors.get(label, 0),
+            "p50_ms": _percentile(samples, 0.50) * 1e3,
+            "p95_ms": _percentile(samples, 0.95) * 1e3,
+            "p99_ms": _percentile(samples, 0.99) * 1e3,
+            "max_ms": samples[-1] * 1e3,
+        }
+    report = {
+        "games": games,
+        "games_finished": finished,
+        "requests": requests,
+        "errors": sum(recorder.errors.values()),
+        "elapsed_s": elapsed,
+        "requests_per_sec": requests / elapsed,
+        "games_per_sec": finished / elapsed,
+        "endpoints": endpoints,
+    }
+    if rss_start is not None and rss_end is not None:
+        report["rss_mb"] = {
+            "start": rss_start / 2**20,
+            "end": rss_end / 2**20,
+            "growth": (rss_end - rss_start) / 2**20,
+        }
+    return report
+
+
+async def run_asgi(players: int, games: int, seed: int) -> Dict:
+    import httpx
+
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        return await drive(client, players, games, seed, os.getpid())
+
+
+async def run_uvicorn(players: int, games: int, seed: int, startup_timeout: float = 30.0) -> Dict:
+    import httpx
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=players, max_keepalive_connections=players)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            deadline = time.monotonic() + startup_timeout
+            while True:
+                try:
+                    await client.get("/api/scenarios")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise RuntimeError("uvicorn did not start")
+                    await asyncio.sleep(0.1)
+            return await drive(client, players, games, seed, server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def regressions(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Endpoints whose p95 grew, or targets whose throughput fell, beyond ``tolerance``."""
+    found = []
+    for target, current in report["targets"].items():
+        before = baseline.get("targets", {}).get(target)
+        if before is None:
+            continue
+        if current["requests_per_sec"] < before["requests_per_sec"] * (1 - tolerance):
+            found.append(
+                f"{target}: {current['requests_per_sec']:.0f} req/s "
+                f"(baseline {before['requests_per_sec']:.0f})"
+            )
+        for label, stats in current["endpoints"].items():
+            old = before["endpoints"].get(label)
+            if old is not None and stats["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+                found.append(
+                    f"{target} {label}: p95 {stats['p95_ms']:.2f} ms (baseline {old['p95_ms']:.2f} ms)"
+                )
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=["asgi", "uvicorn", "both"], default="asgi")
+    parser.add_argument("--players", type=int, default=50, help="concurrent virtual players")
+    parser.add_argument("--games", type=int, default=500, help="games to play per target")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    targets = ["asgi", "uvicorn"] if args.target == "both" else [args.target]
+    runners = {"asgi": run_asgi, "uvicorn": run_uvicorn}
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "players": args.players,
+        "games": args.games,
+        "seed": args.seed,
+        "targets": {
+            target: asyncio.run(runners[target](args.players, args.games, args.seed))
+            for target in targets
+        },
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            found = regressions(report, json.load(handle), args.tolerance)
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,285 @@
+"""Micro-benchmarks for the engine and content loader hot paths.
+
+Every case runs against each bundled scenario and a synthetic scenario with
+thousands of stages and injections. For each (case, subject) the report gives
+calls per second (best of several timed runs) and the tracemalloc high-water
+mark of a single call, i.e. how much memory the call allocates at its peak.
+
+``--baseline`` compares against an earlier ``--output`` report and exits
+non-zero when a case got slower, or allocates more, by over ``--threshold``
+percent.
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --baseline micro.json --threshold 15
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import yaml
+
+from app.domain.models import Scenario
+from app.services import content_cache
+from app.services.content_cache import parse_yaml
+from app.services.scenario_loader import (
+    _load_global_injections,
+    _parse_scenario,
+    load_scenario,
+    load_scenarios,
+    read_header,
+    scenario_paths,
+)
+from app.services.simulation import SimulationEngine
+from app.services.stage_cache import serialize_stage
+from app.services.team_loader import ROSTER_PATH, _build_roster, load_roster
+
+# prepare(n) does any untimed setup and returns a callable making n calls.
+Prepare = Callable[[int], Callable[[], None]]
+
+
+def synthetic_payload(stages: int, injections: int, challenges: int = 2, options: int = 3) -> Dict:
+    """A scenario pack shaped like the bundled ones, only much larger."""
+    skills = ("analysis", "comms", "engineering", "leadership")
+
+    def option(prefix: str, index: int, next_stage) -> Dict:
+        return {
+            "id": f"{prefix}-o{index}",
+            "label": f"Option {index}",
+            "narrative": "Synthetic option used for benchmarking.",
+            "difficulty": 40 + 20 * index,
+            "skill": skills[index % len(skills)],
+            "outcome": {
+                "description": "It works.",
+                "budget_delta": -2,
+                "reputation_delta": 1,
+                "risk_delta": -3,
+                "next_stage": next_stage,
+            },
+            "failure": {"description": "It does not.", "budget_delta": -4, "risk_delta": 4},
+        }
+
+    return {
+        "id": f"synthetic-{stages}x{injections}",
+        "name": "Synthetic",
+        "briefing": "Generated for benchmarks.",
+        "starting_stage": "s0",
+        "stages": [
+            {
+                "id": f"s{s}",
+                "title": f"Stage {s}",
+                "summary": "Synthetic stage.",
+                "challenges": [
+                    {
+                        "id": f"s{s}-c{c}",
+                        "title": f"Challenge {c}",
+                        "prompt": "Choose.",
+                        "options": [
+                            option(f"s{s}-c{c}", o, f"s{s + 1}" if s + 1 < stages else None)
+                            for o in range(options)
+                        ],
+                    }
+                    for c in range(challenges)
+                ],
+            }
+            for s in range(stages)
+        ],
+        "injections": [
+            {
+                "id": f"inj{i}",
+                "title": f"Injection {i}",
+                "prompt": "Something happened.",
+                "weight": 1 + i % 9,
+                "options": [option(f"inj{i}", o, None) for o in range(options)],
+            }
+            for i in range(injections)
+        ],
+    }
+
+
+def loader_cases(paths: Dict[str, pathlib.Path]) -> Iterator[Tuple[str, str, Prepare]]:
+    yield "load_scenarios", "bundled", lambda n: lambda: [load_scenarios() for _ in range(n)]
+    yield "load_roster", "bundled", lambda n: lambda: [load_roster() for _ in range(n)]
+    yield "build_roster", "bundled", lambda n: lambda: [
+        _build_roster(parse_yaml(ROSTER_PATH)) for _ in range(n)
+    ]
+    for subject, path in paths.items():
+        yield "load_scenario", subject, lambda n, path=path: lambda: [
+            load_scenario(path) for _ in range(n)
+        ]
+        yield "parse_scenario", subject, lambda n, path=path: lambda: [
+            _parse_scenario(path, _load_global_injections) for _ in range(n)
+        ]
+        yield "read_header", subject, lambda n, path=path: lambda: [read_header(path) for _ in range(n)]
+
+
+def engine_cases(scenario: Scenario, team: List[Dict]) -> Iterator[Tuple[str, Prepare]]:
+    first = scenario.stages[scenario.starting_stage].challenges[0].options[0].id
+
+    def engines(n: int) -> List[SimulationEngine]:
+        return [SimulationEngine(scenario, team, seed=seed) for seed in range(n)]
+
+    def init(n: int):
+        return lambda: [SimulationEngine(scenario, team, seed=0) for _ in range(n)]
+
+    def build_team(n: int):
+        engine = SimulationEngine(scenario, team, seed=0)
+        return lambda: [engine._build_team(team) for _ in range(n)]
+
+    def current_presentable(n: int):
+        engine = SimulationEngine(scenario, team, seed=0)
+        return lambda: [engine.current_presentable() for _ in range(n)]
+
+    def apply_option(n: int):
+        batch = engines(n)
+        return lambda: [engine.apply_option(first) for engine in batch]
+
+    def recalculate(n: int):
+        engine = SimulationEngine(scenario, team, seed=0)
+        return lambda: [engine._recalculate_team_stats() for _ in range(n)]
+
+    def serialize(n: int):
+        presentable = SimulationEngine(scenario, team, seed=0).current_presentable()
+        return lambda: [serialize_stage(presentable) for _ in range(n)]
+
+    yield "engine_init", init
+    yield "build_team", build_team
+    yield "current_presentable", current_presentable
+    yield "apply_option", apply_option
+    yield "recalculate_team_stats", recalculate
+    yield "serialize_stage", serialize
+
+
+def measure(prepare: Prepare, min_time: float, repeats: int) -> Dict:
+    calls = 1
+    while True:
+        run = prepare(calls)
+        began = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - began
+        if elapsed >= min_time or calls >= 1 << 24:
+            break
+        calls *= 2 if elapsed * 4 >= min_time else 8
+    best = elapsed
+    for _ in range(repeats - 1):
+        run = prepare(calls)
+        began = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - began)
+
+    run = prepare(1)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return {
+        "calls": calls,
+        "ops_per_sec": calls / best,
+        "us_per_call": best / calls * 1e6,
+        "peak_alloc_bytes": peak,
+    }
+
+
+def regressions(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    found = []
+    limit = threshold / 100
+    for key, current in results.items():
+        before = baseline.get("results", {}).get(key)
+        if before is None:
+            continue
+        if current["ops_per_sec"] < before["ops_per_sec"] * (1 - limit):
+            found.append(
+                f"{key}: {current['ops_per_sec']:.0f} ops/s (baseline {before['ops_per_sec']:.0f})"
+            )
+        # Ignore a few hundred bytes of noise from interpreter caches.
+        grown = current["peak_alloc_bytes"] - before["peak_alloc_bytes"]
+        if grown > 256 and current["peak_alloc_bytes"] > before["peak_alloc_bytes"] * (1 + limit):
+            found.append(
+                f"{key}: {current['peak_alloc_bytes']} bytes allocated "
+                f"(baseline {before['peak_alloc_bytes']})"
+            )
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only run cases whose key contains this")
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per timed run")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--huge-stages", type=int, default=2000, help="0 skips the synthetic scenario")
+    parser.add_argument("--huge-injections", type=int, default=2000)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep cache entries for the synthetic pack out of app/data/.cache.
+        content_cache.CACHE_DIR = pathlib.Path(tmp) / "cache"
+        paths = {}
+        for path in scenario_paths():
+            scenario = load_scenario(path)
+            if scenario is not None:
+                paths[scenario.id] = path
+        if args.huge_stages:
+            payload = synthetic_payload(args.huge_stages, args.huge_injections)
+            path = pathlib.Path(tmp) / "synthetic.yaml"
+            path.write_text(yaml.safe_dump(payload, sort_keys=False), encoding="utf-8")
+            paths[payload["id"]] = path
+
+        team = [
+            {"name": m.name, "role": m.role, "cost": m.cost, "stats": asdict(m.stats)}
+            for m in load_roster()[:3]
+        ]
+        cases = [(f"{case}[{subject}]", case, subject, prepare) for case, subject, prepare in loader_cases(paths)]
+        for subject, path in paths.items():
+            scenario = load_scenario(path)
+            cases.extend(
+                (f"{case}[{subject}]", case, subject, prepare)
+                for case, prepare in engine_cases(scenario, team)
+            )
+
+        results = {}
+        for key, case, subject, prepare in cases:
+            if args.filter not in key:
+                continue
+            results[key] = {"case": case, "subject": subject, **measure(prepare, args.min_time, args.repeats)}
+            print(
+                f"{key:60} {results[key]['ops_per_sec']:>12.1f} ops/s "
+                f"{results[key]['peak_alloc_bytes']:>12} B",
+                file=sys.stderr,
+            )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            found = regressions(results, json.load(handle), args.threshold)
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
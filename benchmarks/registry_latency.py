@@ -0,0 +1,106 @@
+"""Decision latency of the session registry backends.
+
+Fills each backend with N live sessions, then times random decisions the way
+the decision endpoint performs them (get, apply_option, save). Finished games
+are replaced so the session count stays constant.
+
+    python -m benchmarks.registry_latency --sessions 10000 --decisions 20000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from dataclasses import asdict
+from typing import Dict, List
+
+from app.services.scenario_loader import load_scenarios
+from app.services.simulation import SimulationRegistry
+from app.services.sqlite_registry import SQLiteSimulationRegistry
+from app.services.team_loader import load_roster
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def run(registry: SimulationRegistry, sessions: int, decisions: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    scenarios = list(load_scenarios().values())
+    team = [
+        {"name": m.name, "role": m.role, "cost": m.cost, "stats": asdict(m.stats)}
+        for m in load_roster()[:3]
+    ]
+
+    ids = []
+    start = time.perf_counter()
+    for _ in range(sessions):
+        game_id = uuid.uuid4().hex
+        registry.create(game_id, rng.choice(scenarios), team, seed=rng.getrandbits(64))
+        ids.append(game_id)
+    create_seconds = time.perf_counter() - start
+
+    samples = []
+    start = time.perf_counter()
+    for _ in range(decisions):
+        slot = rng.randrange(sessions)
+        game_id = ids[slot]
+        began = time.perf_counter()
+        engine = registry.get(game_id)
+        option = rng.choice(engine.current_presentable()["challenges"][0].options)
+        result = engine.apply_option(option.id)
+        if result["finished"]:
+            registry.delete(game_id)
+        else:
+            registry.save(game_id, engine)
+        samples.append(time.perf_counter() - began)
+        if result["finished"]:
+            ids[slot] = uuid.uuid4().hex
+            registry.create(ids[slot], rng.choice(scenarios), team, seed=rng.getrandbits(64))
+    elapsed = time.perf_counter() - start
+    samples.sort()
+    return {
+        "sessions": sessions,
+        "decisions": decisions,
+        "create_per_sec": sessions / create_seconds,
+        "decisions_per_sec": decisions / elapsed,
+        "latency_us": {
+            "p50": _percentile(samples, 0.50) * 1e6,
+            "p95": _percentile(samples, 0.95) * 1e6,
+            "p99": _percentile(samples, 0.99) * 1e6,
+            "max": samples[-1] * 1e6,
+        },
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--decisions", type=int, default=20_000)
+    parser.add_argument("--hot-sessions", type=int, default=1_000, help="sqlite hot-tier size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    memory = SimulationRegistry(idle_ttl=0, max_sessions=0, max_bytes=0)
+    report = {"memory": run(memory, args.sessions, args.decisions, args.seed)}
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = SQLiteSimulationRegistry(
+            os.path.join(tmp, "sessions.sqlite3"), hot_sessions=args.hot_sessions
+        )
+        try:
+            report["sqlite"] = run(registry, args.sessions, args.decisions, args.seed)
+            began = time.perf_counter()
+            registry.flush()
+            report["sqlite"]["final_flush_ms"] = (time.perf_counter() - began) * 1e3
+        finally:
+            registry.close()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,13 @@
+import pytest
+
+from app.services import scenario_loader
+
+
+@pytest.fixture
+def build_scenario():
+    """Compile a scenario payload as the loader would, without the global injections."""
+
+    def build(payload):
+        return scenario_loader._build_scenario(payload, [], version="test")
+
+    return build
@@ -0,0 +1,47 @@
+import pytest
+
+from app.domain.models import ScenarioHeader
+from app.services.catalog_index import CatalogIndex, decode_cursor, encode_cursor
+
+
+def _pages(index, **query):
+    ids, cursor = [], None
+    while True:
+        page = index.search(cursor=cursor, limit=2, **query)
+        ids.extend(header.id for header in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.fixture
+def index():
+    index = CatalogIndex()
+    for number in range(9):
+        tags = ("cloud",) if number % 3 else ("cloud", "ransomware")
+        index.put(ScenarioHeader(f"pack-{number}", f"Pack {number}", "Breach at a vendor" * (number % 2), tags))
+    return index
+
+
+def test_cursor_round_trips_any_id():
+    for scenario_id in ("pack-1", "ünïcode/id", "a" * 40):
+        assert decode_cursor(encode_cursor(scenario_id)) == scenario_id
+
+
+@pytest.mark.parametrize("query", [{}, {"tag": "ransomware"}, {"q": "vend"}, {"q": "breach", "tag": "cloud"}])
+def test_pages_cover_every_match_once_in_id_order(index, query):
+    everything = [header.id for header in index.search(limit=100, **query)["items"]]
+    assert everything == sorted(everything)
+    assert _pages(index, **query) == everything
+
+
+def test_removed_ids_do_not_break_an_open_cursor(index):
+    page = index.search(limit=2)
+    index.remove(page["items"][-1].id)
+    following = index.search(cursor=page["next_cursor"], limit=2)["items"]
+    assert following[0].id == "pack-2"
+
+
+def test_bad_cursor_raises_value_error(index):
+    with pytest.raises(ValueError):
+        index.search(cursor="%%%")
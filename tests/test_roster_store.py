@@ -0,0 +1,54 @@
+import pytest
+
+from app.domain.models import SKILLS
+from app.services.roster_store import RosterStore
+
+ROWS = [
+    (f"member-{number:02}", "Analyst" if number % 2 else "Engineer", 10 + number * 7 % 50, tuple(
+        (number * (k + 3)) % 100 for k in range(len(SKILLS))
+    ))
+    for number in range(23)
+]
+
+
+def _pages(store, **query):
+    names, cursor = [], None
+    while True:
+        page = store.query(cursor=cursor, limit=4, **query)
+        names.extend(member.name for member in page["members"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return names
+
+
+def _expected(sort, role=None, min_cost=None, max_cost=None):
+    rows = [
+        row for row in ROWS
+        if (role is None or row[1].casefold() == role.casefold())
+        and (min_cost is None or row[2] >= min_cost)
+        and (max_cost is None or row[2] <= max_cost)
+    ]
+    if sort == "name":
+        rows.sort(key=lambda row: row[0])
+    elif sort == "cost":
+        rows.sort(key=lambda row: (row[2], row[0]))
+    elif sort != "roster":
+        column = SKILLS.index(sort)
+        rows.sort(key=lambda row: (-row[3][column], row[0]))
+    return [row[0] for row in rows]
+
+
+@pytest.mark.parametrize("sort", ["roster", "name", "cost", SKILLS[0]])
+@pytest.mark.parametrize(
+    "filters", [{}, {"role": "analyst"}, {"min_cost": 20, "max_cost": 40}, {"role": "Engineer", "max_cost": 30}]
+)
+def test_pages_match_a_full_filtered_sort(sort, filters):
+    assert _pages(RosterStore(ROWS), sort=sort, **filters) == _expected(sort, **filters)
+
+
+def test_bad_sort_or_cursor_raises_value_error():
+    store = RosterStore(ROWS)
+    with pytest.raises(ValueError):
+        store.query(sort="height")
+    with pytest.raises(ValueError):
+        store.query(cursor="bm8tc3VjaC1tZW1iZXI")  # "no-such-member"
@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+
+from app.services.scenario_loader import ScenarioError
+
+
+def _option(option_id, **outcome):
+    return {"id": option_id, "label": option_id, "narrative": "", "outcome": {"description": "ok", **outcome}}
+
+
+def _stage(stage_id, *challenges):
+    return {"id": stage_id, "title": stage_id, "summary": "", "challenges": list(challenges)}
+
+
+def _challenge(challenge_id, *options):
+    return {"id": challenge_id, "title": challenge_id, "prompt": "", "options": list(options)}
+
+
+def _payload(stages, starting_stage="start", injections=()):
+    return {
+        "id": "pack",
+        "name": "Pack",
+        "briefing": "",
+        "starting_stage": starting_stage,
+        "stages": stages,
+        "injections": list(injections),
+    }
+
+
+def _linear():
+    return [
+        _stage("start", _challenge("c1", _option("go", next_stage="end"))),
+        _stage("end", _challenge("c2", _option("finish", action="end"))),
+    ]
+
+
+def test_valid_pack_compiles(build_scenario):
+    scenario = build_scenario(_payload(_linear()))
+    assert scenario.graph.successors == {"start": ("end",), "end": ()}
+    assert scenario.graph.reachable == {"start", "end"}
+
+
+@pytest.mark.parametrize(
+    "payload, message",
+    [
+        (_payload(_linear(), starting_stage="nowhere"), "starting_stage 'nowhere' does not exist"),
+        (
+            _payload([_stage("start", _challenge("c1", _option("go", next_stage="missing")))]),
+            "next_stage 'missing' does not exist",
+        ),
+        (
+            _payload([_stage("start", _challenge("c1", _option("go", action="explode")))]),
+            "unknown action 'explode'",
+        ),
+        (_payload([*_linear(), _stage("empty")]), "stage empty has no challenges"),
+        (_payload([_stage("start", _challenge("c1"))]), "challenge c1 has no options"),
+        (
+            _payload(_linear(), injections=[{"id": "inj", "title": "", "prompt": "", "options": []}]),
+            "injection inj has no options",
+        ),
+    ],
+    ids=["starting-stage", "next-stage", "action", "empty-stage", "no-options", "empty-injection"],
+)
+def test_broken_packs_raise_scenario_error(build_scenario, payload, message):
+    with pytest.raises(ScenarioError, match=message):
+        build_scenario(payload)
+
+
+def test_every_problem_is_reported_at_once(build_scenario):
+    payload = _payload(
+        [_stage("start", _challenge("c1", _option("go", next_stage="missing", action="explode")))],
+        starting_stage="nowhere",
+    )
+    with pytest.raises(ScenarioError) as raised:
+        build_scenario(payload)
+    assert str(raised.value).count(";") == 2
+
+
+def test_next_stage_is_only_checked_where_the_engine_follows_it(build_scenario):
+    stages = _linear()
+    stages[0]["challenges"].insert(0, _challenge("note", _option("aside", next_stage="appendix")))
+    assert build_scenario(_payload(stages)).graph.successors["start"] == ("end",)
+
+
+def test_unreachable_and_cyclic_stages_only_warn(build_scenario, caplog):
+    stages = [
+        _stage("start", _challenge("c1", _option("loop", next_stage="again"), _option("stop", action="end"))),
+        _stage("again", _challenge("c2", _option("back", next_stage="start"))),
+        _stage("orphan", _challenge("c3", _option("finish", action="end"))),
+    ]
+    with caplog.at_level(logging.WARNING, logger="app.services.scenario_loader"):
+        scenario = build_scenario(_payload(stages))
+    assert scenario.graph.reachable == {"start", "again"}
+    assert scenario.graph.cycles == (("start", "again"),)
+    assert "never reached from start: orphan" in caplog.text
+    assert "can loop" in caplog.text
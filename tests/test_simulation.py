@@ -0,0 +1,72 @@
+import pytest
+
+from app.services.content_library import ContentLibrary
+from app.services.montecarlo import GreedyPolicy
+from app.services.simulation import SimulationEngine, _footprint, apply_state_delta
+from app.services.team_loader import raw_members
+
+
+def _played_game(decisions: int) -> SimulationEngine:
+    scenario = ContentLibrary().scenario("cloud-ransom")
+    team = [raw_members()["intel-analyst"], raw_members()["Priya Singh"]]
+    engine = SimulationEngine(scenario, team, seed=7)
+    policy = GreedyPolicy()
+    for _ in range(decisions):
+        if engine.apply_option(policy.choose(engine.current_presentable(), engine.rng))["finished"]:
+            break
+    return engine
+
+
+def _play_one(engine: SimulationEngine) -> None:
+    engine.apply_option(GreedyPolicy().choose(engine.current_presentable(), engine.rng))
+
+
+def test_seek_is_repeatable_and_matches_replay():
+    engine = _played_game(8)
+    assert len(engine.events) > 5  # past the first checkpoint
+    for round_number in (2, len(engine.events) - 1):
+        journal = {**engine.journal(), "events": engine.events[:round_number]}
+        expected = SimulationEngine.replay(engine.scenario, journal).state
+        first = engine.seek(round_number).state
+        second = engine.seek(round_number).state
+        assert first == expected
+        assert second == expected
+        assert len(second.history) == round_number
+
+
+def test_restored_engine_can_keep_playing():
+    engine = _played_game(3)
+    restored = SimulationEngine.restore(engine.scenario, engine.snapshot())
+    assert restored.session_id is None
+    option = restored.current_presentable()["challenges"][0].options[0]
+    restored.apply_option(option.id)
+    assert len(restored.state.history) == len(engine.state.history) + 1
+
+
+def test_state_delta_brings_a_client_copy_up_to_date():
+    engine = _played_game(2)
+    client = engine.state_snapshot()
+    previous = engine.state_fields()
+    _play_one(engine)
+    delta = engine.state_delta(client["version"], previous)
+    assert set(delta["changes"]) <= set(previous)
+    assert all(previous[name] != value for name, value in delta["changes"].items())
+    assert apply_state_delta(client, delta) == engine.state_snapshot()
+
+
+def test_state_delta_rejects_versions_that_do_not_line_up():
+    engine = _played_game(3)
+    client = engine.state_snapshot()
+    with pytest.raises(ValueError):
+        apply_state_delta(client, engine.state_delta(1))
+    with pytest.raises(ValueError):
+        engine.state_delta(engine.round + 1)
+
+
+def test_checkpoints_share_history_and_count_in_the_footprint():
+    engine = _played_game(8)
+    assert len(engine.checkpoints) > 1
+    assert all(checkpoint["state"]["history"] == [] for checkpoint in engine.checkpoints.values())
+    fewer = _footprint(engine)
+    engine.checkpoints.popitem()
+    assert _footprint(engine) < fewer
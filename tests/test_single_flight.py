@@ -0,0 +1,32 @@
+import threading
+
+from app.services.single_flight import SingleFlightCache
+
+
+def test_concurrent_misses_compute_once_and_lru_evicts():
+    cache = SingleFlightCache(lambda: 2)
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a", compute))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len({id(value) for value in results}) == 1
+    assert cache.computing() == 0
+
+    cache.get("b", object)
+    cache.get("a", compute)  # hit: "a" becomes most recent
+    cache.get("c", object)
+    assert len(cache) == 2
+    assert cache.get("a", compute) is results[0]
+    assert len(calls) == 1
@@ -0,0 +1,202 @@
+import random
+
+import pytest
+
+from app.config import settings
+from app.services import solver
+from app.services.simulation import SimulationEngine
+
+
+def _option(option_id, skill, difficulty, success, failure):
+    return {
+        "id": option_id,
+        "label": option_id,
+        "narrative": option_id,
+        "skill": skill,
+        "difficulty": difficulty,
+        "outcome": {"description": "ok", **success},
+        "failure": {"description": "bad", **failure},
+    }
+
+
+SMALL = {
+    "id": "small",
+    "name": "Small",
+    "briefing": "Small enough to enumerate every game.",
+    "starting_stage": "detect",
+    "stages": [
+        {
+            "id": "detect",
+            "title": "Detect",
+            "summary": "",
+            "challenges": [
+                {
+                    "id": "triage",
+                    "title": "Triage",
+                    "prompt": "",
+                    "options": [
+                        _option("logs", "analysis", 60, {"budget_delta": -5, "reputation_delta": 2, "risk_delta": 10},
+                                {"budget_delta": -10, "reputation_delta": -3, "risk_delta": 20}),
+                        _option("brief", "comms", 40, {"reputation_delta": 1},
+                                {"reputation_delta": -2, "action": "damage-morale"}),
+                    ],
+                },
+                {
+                    "id": "decide",
+                    "title": "Decide",
+                    "prompt": "",
+                    "options": [
+                        _option("contain", "engineering", 50, {"next_stage": "recover"},
+                                {"budget_delta": -8, "next_stage": "recover"}),
+                        _option("close", "leadership", 70, {"reputation_delta": 1, "action": "end"},
+                                {"next_stage": "recover", "action": "remove-member"}),
+                    ],
+                },
+            ],
+        },
+        {
+            "id": "recover",
+            "title": "Recover",
+            "summary": "",
+            "challenges": [
+                {
+                    "id": "restore",
+                    "title": "Restore",
+                    "prompt": "",
+                    "options": [
+                        _option("rebuild", "engineering", 60, {"reputation_delta": 1, "action": "double-budget"},
+                                {"reputation_delta": -2, "action": "burn-budget"}),
+                        _option("rally", "leadership", 50, {"reputation_delta": 2, "action": "boost-morale"},
+                                {"budget_delta": -4, "reputation_delta": -4}),
+                    ],
+                }
+            ],
+        },
+    ],
+    "injections": [
+        {
+            "id": "leak",
+            "title": "Leak",
+            "prompt": "",
+            "weight": 3,
+            "options": [
+                _option("deny", "comms", 50, {"budget_delta": -3}, {"reputation_delta": -3, "action": "remove-member"}),
+            ],
+        },
+        {
+            "id": "audit",
+            "title": "Audit",
+            "prompt": "",
+            "weight": 1,
+            "options": [
+                _option("comply", "analysis", 40, {"reputation_delta": 1}, {"budget_delta": -6}),
+                _option("stall", "leadership", 60, {}, {"reputation_delta": -5}),
+            ],
+        },
+    ],
+}
+
+TEAM = [
+    {"name": "Ana", "role": "Analyst", "cost": 10, "stats": {"analysis": 70, "comms": 40, "engineering": 50, "leadership": 30}},
+    {"name": "Ben", "role": "Engineer", "cost": 10, "stats": {"analysis": 30, "comms": 20, "engineering": 80, "leadership": 40}},
+]
+
+
+class _Rolls:
+    """Stands in for the engine's rng: every roll and draw is chosen by the test."""
+
+    def __init__(self, rolls, injection=None):
+        self.rolls = list(rolls)
+        self.injection = injection
+
+    def random(self):
+        return self.rolls.pop(0)
+
+    def choices(self, population, weights, k):
+        return [self.injection]
+
+    def getstate(self):  # snapshots record it
+        return random.Random(0).getstate()
+
+
+def _played(engine, option, success, injection=None):
+    after = SimulationEngine.restore(engine.scenario, engine.snapshot())
+    after.metered = False
+    after.rng = _Rolls([0.0 if success else 1.0, 0.0 if injection else 1.0], injection)
+    return after, after.apply_option(option.id)
+
+
+def _option_value(engine, option):
+    """Expected survival of ``option`` by enumerating every roll and injection."""
+    chance = engine.chances[option.index]
+    total = 0.0
+    for success, weight in ((True, chance), (False, 1 - chance)):
+        after, result = _played(engine, option, success)
+        value = _settle(after, result)
+        if not engine.active_injection and engine.pending_injections:
+            # The injection roll comes after the decision is applied, at the new risk.
+            draw = min(
+                settings.injection_base_chance + after.state.risk * settings.injection_risk_factor,
+                settings.injection_max_chance,
+            )
+            weights = sum(injection.weight for injection in engine.pending_injections)
+            value *= 1 - draw
+            for injection in engine.pending_injections:
+                drawn, drawn_result = _played(engine, option, success, injection)
+                value += draw * injection.weight / weights * _settle(drawn, drawn_result)
+        total += weight * value
+    return total
+
+
+def _settle(engine, result):
+    if result["finished"]:
+        return 1.0 if engine.state.budget > 0 and engine.state.reputation > 0 else 0.0
+    return _brute_force(engine)
+
+
+def _brute_force(engine):
+    options = engine.current_presentable()["challenges"][0].options
+    return max(_option_value(engine, option) for option in options)
+
+
+@pytest.fixture(params=[(100, 50), (25, 5), (12, 3)], ids=["comfortable", "tight", "desperate"])
+def engine(request, build_scenario, monkeypatch):
+    budget, reputation = request.param
+    monkeypatch.setattr(settings, "default_budget", budget)
+    monkeypatch.setattr(settings, "base_reputation", reputation)
+    monkeypatch.setattr(settings, "max_rounds", 5)
+    engine = SimulationEngine(build_scenario(SMALL), TEAM, seed=1)
+    engine.metered = False
+    return engine
+
+
+def test_solver_matches_brute_force(engine):
+    game = solver.ScenarioSolver(engine.scenario, engine.initial_members)
+    assert game.solve() == pytest.approx(_brute_force(engine), abs=1e-9)
+    # After a couple of decisions too, including states the solve pruned.
+    for option_id in ("logs", "close"):
+        key = game.key_for(engine)
+        options = engine.current_presentable()["challenges"][0].options
+        expected = {option.id: _option_value(engine, option) for option in options}
+        assert game.option_values(key) == pytest.approx(expected, abs=1e-9)
+        assert game.value(key) == pytest.approx(max(expected.values()), abs=1e-9)
+        option = next(option for option in engine.scenario.options if option.id == option_id)
+        engine, result = _played(engine, option, success=False)
+        if result["finished"]:
+            break
+
+
+def test_games_too_large_to_solve_fall_back_to_success_chances(engine, monkeypatch):
+    monkeypatch.setattr(settings, "solver_max_states", 3)
+    advice = solver.advise(engine, wait=30)
+    assert advice["exact"] is False
+    assert advice["expected_survival"] is None
+    chances = {option["id"]: option["success"] for option in advice["options"]}
+    assert advice["best_option"] == max(chances, key=chances.get)
+
+
+def test_solved_tables_are_kept_per_setting(engine, monkeypatch):
+    first = solver.get_solver(engine.scenario, engine.initial_members)
+    assert solver.get_solver(engine.scenario, engine.initial_members) is first
+    monkeypatch.setattr(settings, "max_rounds", 4)
+    assert solver.get_solver(engine.scenario, engine.initial_members) is not first